@@ -1,17 +1,108 @@
-from google.adk.agents import LlmAgent
-from google.adk.sessions.sqlite_session_service import SqliteSessionService
-from app.prompts.root_agent import SYSTEM_PROMPT
-from dotenv import load_dotenv
+"""
+Root agent factory.
+
+Nothing heavy happens at import time: google.adk, the prompt and the .env
+file are loaded, and the session store is opened, the first time
+`root_agent` / `session_service` is accessed (or the get_* factories are
+called). Each object is built once and reused.
+"""
+from functools import cache
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from google.adk.agents import BaseAgent, LlmAgent
+    from google.adk.sessions.sqlite_session_service import SqliteSessionService
 
-load_dotenv()
 db_url = "../database/agent_sessions.db"
 
-session_service = SqliteSessionService(db_url)
-root_agent = LlmAgent(
+
+@cache
+def load_environment():
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+
+@cache
+def get_session_service() -> "SqliteSessionService":
+    from google.adk.sessions.sqlite_session_service import SqliteSessionService
+
+    load_environment()
+    return SqliteSessionService(db_url)
+
+
+def instrument_agent(agent: "BaseAgent") -> "BaseAgent":
+    """
+    Times every run of the agent and its sub-agents as `agent.<name>` spans, attributed
+    to the invocation (one user turn). Spans are only recorded while telemetry is enabled.
+
+    The timing callbacks are added alongside any callbacks the agents already have.
+    ADK does not call after_agent_callback when a run raises, so a span left open by a
+    failed run is finished as an error by the next callback that finds it still current.
+    """
+    from weakref import WeakValueDictionary
+    from app.utils.metrics import telemetry
+
+    # (invocation_id, agent_name) -> span; a run that failed in a finished task drops out
+    # with the task's context instead of staying here
+    open_spans = WeakValueDictionary()
+
+    def unwind(until, invocation_id: str):
+        # Finishes agent spans above `until` that never reached their after callback;
+        # with until=None, only those left over from other invocations
+        while (active := telemetry.current()) is not None and active is not until:
+            key = next((key for key, span in open_spans.items() if span is active), None)
+            if key is None or (until is None and key[0] == invocation_id):
+                return
+            del open_spans[key]
+            telemetry.finish(active, error=True)
+
+    def before(callback_context):
+        unwind(None, callback_context.invocation_id)
+        if telemetry.enabled:
+            span = telemetry.start(f"agent.{callback_context.agent_name}", turn_id=callback_context.invocation_id)
+            open_spans[(callback_context.invocation_id, callback_context.agent_name)] = span
+
+    def after(callback_context):
+        span = open_spans.pop((callback_context.invocation_id, callback_context.agent_name), None)
+        if span is not None:
+            unwind(span, callback_context.invocation_id)
+            telemetry.finish(span)
+
+    # The first truthy callback in each list ends it. Existing before callbacks run
+    # first, so if one skips the agent no span is opened; the after callback runs first
+    # so the span is closed even when an existing one replaces the agent's reply.
+    def attach(agent: "BaseAgent"):
+        agent.before_agent_callback = [*agent.canonical_before_agent_callbacks, before]
+        agent.after_agent_callback = [after, *agent.canonical_after_agent_callbacks]
+        for sub_agent in agent.sub_agents:
+            attach(sub_agent)
+
+    attach(agent)
+    return agent
+
+
+@cache
+def get_root_agent() -> "LlmAgent":
+    from google.adk.agents import LlmAgent
+    from app.prompts.root_agent import SYSTEM_PROMPT
+
+    load_environment()
+    return instrument_agent(LlmAgent(
                         name= "orchestrator_agent",
                         description= "An AI assistant that helps to find and evaluate products online.",
-                        instructions=SYSTEM_PROMPT,
+                        instruction=SYSTEM_PROMPT,
                         model= "",
                         tools= [],
                         sub_agents= [],
-                    )
+                    ))
+
+
+_FACTORIES = {"root_agent": get_root_agent, "session_service": get_session_service}
+
+
+def __getattr__(name: str):
+    # `adk api_server` looks up root_agent by attribute, which builds it here on first use
+    if name in _FACTORIES:
+        return _FACTORIES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,237 @@
+import json
+import os
+import re
+from typing import Any
+
+from pydantic import BaseModel, Field
+
+from app.memory.cache import LRUCache
+
+CATEGORIES = {
+    "Monitors": ("monitor", "monitors", "display", "screen"),
+    "Inverters": ("inverter", "inverters"),
+    "Laptops": ("laptop", "laptops", "notebook", "macbook"),
+    "Phones": ("phone", "phones", "smartphone", "smartphones", "iphone"),
+    "Televisions": ("tv", "tvs", "television", "televisions"),
+    "Refrigerators": ("fridge", "fridges", "refrigerator", "refrigerators", "freezer"),
+    "Generators": ("generator", "generators", "gen set"),
+    "Power Banks": ("power bank", "power banks", "powerbank"),
+    "Audio": ("headphones", "earbuds", "speaker", "speakers", "soundbar"),
+}
+
+BRANDS = (
+    "LG", "Samsung", "Dell", "HP", "Lenovo", "Asus", "Acer", "AOC", "Apple", "Sony", "Hisense",
+    "TCL", "Tecno", "Infinix", "Itel", "Xiaomi", "Redmi", "Nokia", "Oraimo", "Anker",
+    "Luminous", "Felicity", "Sukam", "Mercury", "Firman", "Elepaq", "Haier", "Thermocool", "Nexus", "Scanfrost",
+)
+
+LOCATIONS = ("Lagos", "Abuja", "Port Harcourt", "Ibadan", "Kano", "Enugu", "Benin", "Kaduna")
+
+# unit -> constraint key
+UNITS = {
+    "inch": "size_inches", "inches": "size_inches", "in": "size_inches", '"': "size_inches",
+    "hz": "refresh_rate_hz",
+    "kva": "capacity_kva",
+    "w": "power_watts", "watts": "power_watts",
+    "mah": "battery_mah",
+    "gb": "memory_gb",
+    "tb": "storage_tb",
+    "l": "capacity_litres", "litres": "capacity_litres", "liters": "capacity_litres",
+}
+
+STOPWORDS = {
+    "a", "an", "the", "for", "with", "and", "or", "of", "in", "at", "to", "i", "need", "want", "looking",
+    "find", "me", "buy", "good", "best", "cheap", "new", "price", "prices", "how", "much", "is", "some",
+    "please", "show", "naira", "budget", "my", "around", "about",
+}
+
+# Bumped whenever the grammar changes what it extracts; memoised grammar results from older versions are dropped
+GRAMMAR_VERSION = 2
+
+_NUMBER = r"(\d+(?:[.,]\d+)*)"
+_AMOUNT = rf"(?:₦|ngn|n)?\s*{_NUMBER}\s*(k|m|million|thousand)?"
+_RANGE = re.compile(rf"(?:between\s+)?{_AMOUNT}\s*(?:-|to|and)\s*{_AMOUNT}(?=\s|$)")
+# Negated comparators flip the bound ("not over 150k" is a ceiling) and are matched first
+_NOT_ABOVE = re.compile(rf"\b(?:no|not)\s+(?:more than|over|above|higher than|greater than|exceeding)\s+{_AMOUNT}")
+_NOT_BELOW = re.compile(rf"\b(?:no|not)\s+(?:less than|under|below|lower than)\s+{_AMOUNT}")
+_UPPER = re.compile(rf"\b(?:under|below|less than|max(?:imum)?|at most|within|budget(?: of)?)\s+{_AMOUNT}")
+_LOWER = re.compile(rf"\b(?:above|over|more than|min(?:imum)?|at least|from)\s+{_AMOUNT}")
+_AROUND = re.compile(rf"\b(?:around|about|roughly|approx(?:imately)?)\s+{_AMOUNT}")
+# A bare "250k" or "₦250,000" is read as the budget ceiling
+_BARE_PRICE = re.compile(rf"(?:₦|\bngn)\s*{_NUMBER}\s*(k|m|million|thousand)?\b|\b{_NUMBER}\s*(k|m|million|thousand)\b")
+_QUANTITY = re.compile(
+    rf"{_NUMBER}\s*(" + "|".join(sorted((re.escape(u) for u in UNITS), key=len, reverse=True)) + r")(?=[\s,.]|$)"
+)
+_BRAND_NAMES = {b.casefold(): b for b in BRANDS}
+_BRANDS = re.compile(r"\b(" + "|".join(re.escape(b) for b in _BRAND_NAMES) + r")\b")
+_LOCATION_NAMES = {l.casefold(): l for l in LOCATIONS}
+_LOCATIONS = re.compile(r"\b(" + "|".join(re.escape(l) for l in _LOCATION_NAMES) + r")\b")
+_CATEGORY_TERMS = {term: category for category, terms in CATEGORIES.items() for term in terms}
+_CATEGORIES = re.compile(r"\b(" + "|".join(sorted((re.escape(t) for t in _CATEGORY_TERMS), key=len, reverse=True)) + r")\b")
+_WORD = re.compile(r"[a-z0-9₦]+")
+
+
+def normalize_query(query: str) -> str:
+    """Memo key: case, spacing and trailing punctuation do not change the intent."""
+    return " ".join(query.casefold().replace("?", " ").replace("!", " ").split()).strip(" .")
+
+
+def parse_amount(number: str, suffix: str | None) -> float:
+    value = float(number.replace(",", ""))
+    if suffix in ("k", "thousand"):
+        value *= 1_000
+    elif suffix in ("m", "million"):
+        value *= 1_000_000
+    return value
+
+
+class QueryIntent(BaseModel):
+    category: str = Field(..., description="The product category, as used for Episode.category")
+    constraints: dict[str, Any] = Field(default_factory=dict, description="Structured constraints for Episode.extracted_constraints")
+    confidence: float = Field(..., ge=0.0, le=1.0, description="Share of the query the grammar could explain")
+    source: str = Field("grammar", description="'grammar', 'llm' or 'memo'")
+
+
+class QueryNormalizer:
+    """
+    Deterministic first pass over user queries, run before the LLM.
+
+    A precompiled grammar extracts category, brand, location, sized quantities
+    (27 inch, 3kVA, 144Hz, ...) and Naira price bounds (under 200k, ₦150,000-250,000).
+    Results are memoised by normalised query. Queries the grammar cannot explain
+    confidently return None and should go to the LLM, whose answer can be
+    stored with remember() so the next identical phrasing skips it.
+    """
+
+    def __init__(self, memo_path: str | None = None, memo_size: int = 5000, min_confidence: float = 0.6):
+        self.memo_path = memo_path
+        self.min_confidence = min_confidence
+        self.memo = LRUCache(memo_size)
+        self.parsed = 0
+        self.fallbacks = 0
+
+        if memo_path and os.path.exists(memo_path):
+            with open(memo_path) as f:
+                data = json.load(f)
+            # Grammar results saved by another grammar version may no longer be what it parses
+            for key, intent in data["entries"]:
+                if intent.get("source") == "grammar" and data["grammar_version"] != GRAMMAR_VERSION:
+                    continue
+                self.memo.set(key, QueryIntent(**intent))
+
+    def parse(self, query: str) -> QueryIntent | None:
+        """Runs the grammar only. Returns None when no category is recognised."""
+        text = normalize_query(query)
+        constraints: dict[str, Any] = {}
+        explained = []
+
+        def claim(match: re.Match):
+            explained.append(match.span())
+
+        def claimed(match: re.Match) -> bool:
+            return any(start <= match.start() < end for start, end in explained)
+
+        for match in _RANGE.finditer(text):
+            low, high = parse_amount(*match.group(1, 2)), parse_amount(*match.group(3, 4))
+            # "27 to 32" without any money marker is not a price range
+            if max(low, high) >= 1_000:
+                constraints["min_price"], constraints["max_price"] = min(low, high), max(low, high)
+                claim(match)
+        bounds = (
+            (_NOT_ABOVE, "max_price"),
+            (_NOT_BELOW, "min_price"),
+            (_UPPER, "max_price"),
+            (_LOWER, "min_price"),
+            (_AROUND, "target_price"),
+        )
+        for pattern, key in bounds:
+            for match in pattern.finditer(text):
+                # e.g. "more than 200k" inside an already read "not more than 200k"
+                if claimed(match):
+                    continue
+                constraints.setdefault(key, parse_amount(*match.group(1, 2)))
+                claim(match)
+
+        for match in _BARE_PRICE.finditer(text):
+            if claimed(match):
+                continue
+            number, suffix = (match.group(1), match.group(2)) if match.group(1) else (match.group(3), match.group(4))
+            constraints.setdefault("max_price", parse_amount(number, suffix))
+            claim(match)
+
+        for match in _QUANTITY.finditer(text):
+            if claimed(match):
+                continue
+            key = UNITS[match.group(2)]
+            if key == "memory_gb" and re.match(r"\s*(ssd|hdd|storage|rom)", text[match.end():]):
+                key = "storage_gb"
+            constraints.setdefault(key, float(match.group(1).replace(",", "")))
+            claim(match)
+
+        brands = []
+        for match in _BRANDS.finditer(text):
+            if _BRAND_NAMES[match.group(1)] not in brands:
+                brands.append(_BRAND_NAMES[match.group(1)])
+            claim(match)
+        if brands:
+            constraints["brand"] = brands[0] if len(brands) == 1 else brands
+
+        for match in _LOCATIONS.finditer(text):
+            constraints.setdefault("location", _LOCATION_NAMES[match.group(1)])
+            claim(match)
+
+        category = None
+        for match in _CATEGORIES.finditer(text):
+            category = category or _CATEGORY_TERMS[match.group(1)]
+            claim(match)
+        if category is None:
+            return None
+
+        # Confidence = share of meaningful words covered by some grammar rule
+        words = [m for m in _WORD.finditer(text) if m.group() not in STOPWORDS]
+        covered = sum(any(start <= w.start() < end for start, end in explained) for w in words)
+        confidence = covered / len(words) if words else 1.0
+        return QueryIntent(category=category, constraints=constraints, confidence=round(confidence, 4))
+
+    def normalize(self, query: str) -> QueryIntent | None:
+        """
+        Structured intent for the query, or None if it should fall through to the LLM.
+        Memoised results come back with source='memo'.
+        """
+        key = normalize_query(query)
+        cached = self.memo.get(key)
+        if cached is not None:
+            return cached.model_copy(update={"source": "memo"})
+
+        intent = self.parse(query)
+        if intent is None or intent.confidence < self.min_confidence:
+            self.fallbacks += 1
+            return None
+
+        self.parsed += 1
+        self.memo.set(key, intent)
+        return intent
+
+    def remember(self, query: str, category: str, constraints: dict[str, Any]):
+        """Stores an intent the LLM produced for a query the grammar could not handle."""
+        self.memo.set(normalize_query(query), QueryIntent(category=category, constraints=constraints, confidence=1.0, source="llm"))
+
+    def save(self):
+        """Persists the memo, least recently used first so reloading keeps the LRU order."""
+        if not self.memo_path:
+            return
+        entries = [[key, intent.model_dump(mode="json")] for key, intent in self.memo.entries.items()]
+        with open(self.memo_path + ".tmp", "w") as f:
+            json.dump({"grammar_version": GRAMMAR_VERSION, "entries": entries}, f)
+        os.replace(self.memo_path + ".tmp", self.memo_path)
+
+    def stats(self) -> dict[str, float]:
+        lookups = self.memo.hits + self.memo.misses
+        return {
+            "lookups": lookups,
+            "memo_hits": self.memo.hits,
+            "parsed": self.parsed,
+            "fallbacks": self.fallbacks,
+            "hit_rate": round(self.memo.hits / lookups, 4) if lookups else 0.0,
+            "fallback_rate": round(self.fallbacks / lookups, 4) if lookups else 0.0,
+        }
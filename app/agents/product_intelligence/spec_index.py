@@ -0,0 +1,142 @@
+import re
+from typing import Any, Iterable
+
+from app.schemas.product import Product, ProductSnapshot
+
+# Different sources name the same spec differently
+KEY_ALIASES = {
+    "panel": "panel_type",
+    "display_panel": "panel_type",
+    "panel_technology": "panel_type",
+    "chip": "chipset",
+    "soc": "chipset",
+    "processor": "chipset",
+    "cpu": "chipset",
+    "gen": "generation",
+    "model_generation": "generation",
+    "screen_size": "size",
+    "display_size": "size",
+    "refresh": "refresh_rate",
+}
+
+UNIT_ALIASES = {
+    '"': "in", "''": "in", "inch": "in", "inches": "in", "in": "in",
+    "hz": "hz", "hertz": "hz",
+    "gb": "gb", "tb": "tb", "mb": "mb",
+    "mah": "mah", "w": "w", "watts": "w", "kva": "kva", "va": "va",
+    "ms": "ms", "nits": "nits", "mp": "mp", "ghz": "ghz",
+}
+
+# Specs that make two products "the same underneath" (Phase 4 equivalence reasoning)
+EQUIVALENCE_KEYS = ("panel_type", "chipset", "generation")
+
+_QUANTITY = re.compile(r"^(\d+(?:\.\d+)?)\s*(\"|''|[a-z]+)?$")
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_spec_key(key: str) -> str:
+    canonical = _NON_WORD.sub("_", key.strip().casefold()).strip("_")
+    return KEY_ALIASES.get(canonical, canonical)
+
+
+def _number(text: str | float) -> str:
+    number = float(text)
+    return str(int(number)) if number.is_integer() else str(number)
+
+
+def normalize_spec_value(value: Any) -> str:
+    """Canonical text for a spec value: '27 Inches' and 27" both become '27in', 'IPS ' becomes 'ips'."""
+    if isinstance(value, bool):
+        return str(value).casefold()
+    if isinstance(value, (int, float)):
+        return _number(value)
+
+    text = " ".join(str(value).replace("™", "").replace("®", "").casefold().split())
+    quantity = _QUANTITY.match(text)
+    if quantity:
+        number, unit = quantity.groups()
+        if unit is None:
+            return _number(number)
+        if unit in UNIT_ALIASES:
+            return _number(number) + UNIT_ALIASES[unit]
+    return text
+
+
+def normalize_specs(snapshot: ProductSnapshot) -> dict[str, str]:
+    specs = {normalize_spec_key(k): normalize_spec_value(v) for k, v in snapshot.specifications.data.items() if v is not None}
+    specs.setdefault("brand", normalize_spec_value(snapshot.brand))
+    return specs
+
+
+class SpecIndex:
+    """
+    Inverted index from canonical spec key -> value -> product ids.
+
+    Candidate equivalents are found by blocking on EQUIVALENCE_KEYS: only
+    products sharing at least one of those values with the query product are
+    compared, so nothing is ever compared all-pairs. Products can be added or
+    re-added at any time.
+    """
+
+    def __init__(self, equivalence_keys: Iterable[str] = EQUIVALENCE_KEYS):
+        self.equivalence_keys = tuple(equivalence_keys)
+        self.specs: dict[int, dict[str, str]] = {}
+        self.postings: dict[str, dict[str, set[int]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.specs)
+
+    def add(self, product_id: int, snapshots: ProductSnapshot | Iterable[ProductSnapshot]):
+        """Indexes a product, replacing what was indexed for it before. Earlier snapshots win on conflicting keys."""
+        if isinstance(snapshots, ProductSnapshot):
+            snapshots = [snapshots]
+
+        merged: dict[str, str] = {}
+        for snapshot in snapshots:
+            for key, value in normalize_specs(snapshot).items():
+                merged.setdefault(key, value)
+
+        self.remove(product_id)
+        self.specs[product_id] = merged
+        for key, value in merged.items():
+            self.postings.setdefault(key, {}).setdefault(value, set()).add(product_id)
+
+    def add_product(self, product: Product):
+        self.add(product.id, product.snapshot)
+
+    def remove(self, product_id: int):
+        for key, value in self.specs.pop(product_id, {}).items():
+            ids = self.postings[key][value]
+            ids.discard(product_id)
+            if not ids:
+                del self.postings[key][value]
+
+    def lookup(self, key: str, value: Any) -> set[int]:
+        """Products with exactly this spec, e.g. lookup("panel", "IPS")."""
+        return set(self.postings.get(normalize_spec_key(key), {}).get(normalize_spec_value(value), ()))
+
+    def group_by(self, key: str) -> dict[str, set[int]]:
+        """All products grouped by their value for a spec key."""
+        return {value: set(ids) for value, ids in self.postings.get(normalize_spec_key(key), {}).items()}
+
+    def equivalents(self, product_id: int, min_shared: int = 1) -> list[tuple[int, list[str]]]:
+        """
+        Products sharing at least `min_shared` equivalence specs with this one,
+        with the keys they share. Most shared first, then by overall spec overlap, then id.
+        """
+        specs = self.specs[product_id]
+        shared: dict[int, list[str]] = {}
+        for key in self.equivalence_keys:
+            if key not in specs:
+                continue
+            for other in self.postings[key][specs[key]]:
+                if other != product_id:
+                    shared.setdefault(other, []).append(key)
+
+        def overlap(other: int) -> float:
+            mine, theirs = specs.items(), self.specs[other].items()
+            return len(mine & theirs) / len(mine | theirs)
+
+        matches = [(other, keys) for other, keys in shared.items() if len(keys) >= min_shared]
+        matches.sort(key=lambda m: (-len(m[1]), -overlap(m[0]), m[0]))
+        return matches
@@ -0,0 +1,225 @@
+from typing import Any, Sequence
+
+import numpy as np
+
+from app.schemas.memory import Preference
+from app.schemas.ranking import ComparisonCriterion, NormalizedFeature, ProductComparison, RankedProduct, Tradeoff
+
+# Scores are rounded so the output is identical across runs and platforms
+SCORE_DECIMALS = 6
+
+
+class ScoreMatrix:
+    """
+    The numeric core of a ranking: one row per product (sorted by id), one column
+    per criterion that has a matching feature in the grid.
+    """
+
+    def __init__(
+        self,
+        product_ids: np.ndarray,
+        criteria: list[ComparisonCriterion],
+        features: list[NormalizedFeature],
+        raw: np.ndarray,
+        scores: np.ndarray,
+        weights: np.ndarray,
+    ):
+        self.product_ids = product_ids
+        self.criteria = criteria
+        self.features = features
+        self.raw = raw
+        # Per-criterion scores in [0, 1], 1 being ideal. Missing values score 0.
+        self.scores = scores
+        # Normalised to sum to 1, so totals are also in [0, 1]
+        self.weights = weights
+
+    @property
+    def totals(self) -> np.ndarray:
+        return np.round((self.scores * self.weights).sum(axis=1), SCORE_DECIMALS)
+
+    def order(self) -> np.ndarray:
+        """Row indices best-first. Ties go to the lower product id."""
+        return np.lexsort((self.product_ids, -self.totals))
+
+    def impact_matrix(self) -> np.ndarray:
+        """impact[i, j] = how much better product i scores than product j, in [-1, 1]."""
+        totals = self.totals
+        return np.round(totals[:, None] - totals[None, :], SCORE_DECIMALS)
+
+
+def _to_float(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _normalize_column(raw: np.ndarray, values: list[Any], criterion: ComparisonCriterion) -> np.ndarray:
+    present = ~np.isnan(raw)
+
+    if criterion.intent == "target":
+        if criterion.target_value is None:
+            raise ValueError(f"Criterion '{criterion.name}' has intent 'target' but no target_value")
+        target = _to_float(criterion.target_value)
+        if np.isnan(target):
+            # Categorical target, e.g. panel type "IPS": exact matches score 1
+            wanted = str(criterion.target_value).strip().casefold()
+            return np.array([float(v is not None and str(v).strip().casefold() == wanted) for v in values])
+
+        distance = np.abs(raw - target)
+        worst = np.nanmax(distance) if present.any() else 0.0
+        scores = np.ones_like(raw) if worst == 0 else 1.0 - distance / worst
+    else:
+        if not present.any():
+            return np.zeros_like(raw)
+        low, high = np.nanmin(raw), np.nanmax(raw)
+        if high == low:
+            scores = np.ones_like(raw)
+        elif criterion.intent == "maximize":
+            scores = (raw - low) / (high - low)
+        else:
+            scores = (high - raw) / (high - low)
+
+    return np.where(present, scores, 0.0)
+
+
+# Preference types that say a criterion matters; dislikes and dealbreakers rule values out instead
+WEIGHTING_PREFERENCE_TYPES = ("like", "must_have")
+
+
+def preference_weights(criteria: Sequence[ComparisonCriterion], preferences: Sequence[Preference]) -> np.ndarray:
+    """
+    Weight multipliers derived from memory. A criterion's weight is scaled by
+    (1 + confidence) of the most confident "like" or "must_have" preference on its
+    feature. Several preferences on one feature do not stack, and other types are ignored.
+    """
+    best = np.zeros(len(criteria))
+    positions = {c.name.strip().casefold(): i for i, c in enumerate(criteria)}
+    for pref in preferences:
+        if pref.preference_type not in WEIGHTING_PREFERENCE_TYPES:
+            continue
+        i = positions.get(pref.feature.strip().casefold())
+        if i is not None:
+            best[i] = max(best[i], pref.confidence)
+    return 1.0 + best
+
+
+def build_score_matrix(
+    criteria: Sequence[ComparisonCriterion],
+    feature_grid: Sequence[NormalizedFeature],
+    product_ids: Sequence[int],
+    preferences: Sequence[Preference] = (),
+) -> ScoreMatrix:
+    """Builds the products x criteria matrix and normalises every column per its intent."""
+    ids = np.array(sorted(set(product_ids)), dtype=np.int64)
+    by_name = {f.feature_name.strip().casefold(): f for f in feature_grid}
+
+    # Criteria without data in the grid cannot separate products and are left out
+    used = sorted(
+        (c for c in criteria if c.name.strip().casefold() in by_name),
+        key=lambda c: c.name.strip().casefold(),
+    )
+    features = [by_name[c.name.strip().casefold()] for c in used]
+
+    raw = np.full((len(ids), len(used)), np.nan)
+    scores = np.zeros((len(ids), len(used)))
+    for j, (criterion, feature) in enumerate(zip(used, features)):
+        values = [feature.values.get(int(pid)) for pid in ids]
+        raw[:, j] = [_to_float(v) for v in values]
+        scores[:, j] = _normalize_column(raw[:, j], values, criterion)
+
+    weights = np.array([c.weight for c in used], dtype=float) * preference_weights(used, preferences)
+    if weights.sum() > 0:
+        weights = weights / weights.sum()
+    return ScoreMatrix(ids, used, features, raw, scores, weights)
+
+
+def _describe(matrix: ScoreMatrix, product_id: int, col: int) -> str:
+    feature = matrix.features[col]
+    unit = f" {feature.unit}" if feature.unit else ""
+    return f"{matrix.criteria[col].name} {feature.values.get(product_id)}{unit}"
+
+
+def _tradeoff_table(matrix: ScoreMatrix, references: np.ndarray, limit: int):
+    """
+    For every product at once, pairs its biggest weighted gains with its biggest
+    losses against its reference product. Returns (gain cols, loss cols, impact, valid),
+    each shaped products x limit.
+    """
+    deltas = (matrix.scores - matrix.scores[references]) * matrix.weights
+    order = np.argsort(-deltas, axis=1, kind="stable")
+    ranked = np.take_along_axis(deltas, order, axis=1)
+
+    gains, gain_deltas = order[:, :limit], ranked[:, :limit]
+    losses, loss_deltas = order[:, ::-1][:, :limit], ranked[:, ::-1][:, :limit]
+    # Pairing stops at the first product that has no gain or no loss left
+    valid = (gain_deltas > 0) & (loss_deltas < 0)
+    impact = np.clip(np.round(gain_deltas + loss_deltas, SCORE_DECIMALS), -1.0, 1.0)
+    return gains, losses, impact, valid
+
+
+def rank_products(
+    criteria: Sequence[ComparisonCriterion],
+    feature_grid: Sequence[NormalizedFeature],
+    product_ids: Sequence[int],
+    preferences: Sequence[Preference] = (),
+    max_tradeoffs: int = 2,
+    limit: int | None = None,
+) -> list[RankedProduct]:
+    """
+    Deterministic weighted ranking. The same inputs always produce the same
+    scores, ranks, reasoning text and tradeoffs, whatever their order.
+    Tradeoffs are computed against the top product (the runner-up for the top product itself).
+    Every product is scored; only the best `limit` are materialised as RankedProduct.
+    """
+    matrix = build_score_matrix(criteria, feature_grid, product_ids, preferences)
+    if len(matrix.product_ids) == 0:
+        return []
+
+    ids = matrix.product_ids.tolist()
+    totals = matrix.totals
+    order = matrix.order()
+    best = np.argmax(matrix.scores * matrix.weights, axis=1) if matrix.criteria else None
+
+    leader = order[0]
+    references = np.full(len(ids), leader)
+    references[leader] = order[1] if len(order) > 1 else leader
+    gains, losses, impact, valid = _tradeoff_table(matrix, references, max_tradeoffs)
+
+    ranked = []
+    for rank, row in enumerate(order[:limit].tolist(), start=1):
+        pid, ref = ids[row], ids[references[row]]
+        if matrix.criteria:
+            reasoning = (
+                f"Weighted score {totals[row]:.{SCORE_DECIMALS}f} across {len(matrix.criteria)} criteria; "
+                f"strongest on {_describe(matrix, pid, best[row])}."
+            )
+        else:
+            reasoning = "No criteria had comparable data; ordered by product id."
+
+        tradeoffs = []
+        for gain, loss, score in zip(gains[row][valid[row]].tolist(), losses[row][valid[row]].tolist(), impact[row][valid[row]].tolist()):
+            tradeoffs.append(Tradeoff(
+                description=(
+                    f"Compared with product {ref}: better {matrix.criteria[gain].name}, "
+                    f"worse {matrix.criteria[loss].name}"
+                ),
+                advantage=f"{_describe(matrix, pid, gain)} vs {_describe(matrix, ref, gain)}",
+                sacrificed=f"{_describe(matrix, pid, loss)} vs {_describe(matrix, ref, loss)}",
+                impact_score=score,
+            ))
+
+        ranked.append(RankedProduct(
+            product_id=pid,
+            rank=rank,
+            total_score=float(totals[row]),
+            match_reasoning=reasoning,
+            key_tradeoffs=tradeoffs,
+        ))
+    return ranked
+
+
+def rank_comparison(comparison: ProductComparison, preferences: Sequence[Preference] = ()) -> ProductComparison:
+    """Returns a copy of the comparison with ranked_results filled in from its criteria and feature grid."""
+    ranked = rank_products(comparison.criteria, comparison.feature_grid, comparison.product_ids, preferences)
+    return comparison.model_copy(update={"ranked_results": ranked})
@@ -0,0 +1,209 @@
+import asyncio
+import sqlite3
+import time
+from typing import Callable
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from app.agents.vendor_discovery.pipeline import VendorDiscoveryPipeline
+from app.schemas.product import VendorOfferings
+
+DEFAULT_TTL = 6 * 3600
+MAX_STALE = 7 * 24 * 3600
+# Dropped from listing URLs: utm_* campaign tags and these exact parameter names
+TRACKING_PREFIXES = ("utm_",)
+TRACKING_PARAMS = frozenset({"gclid", "fbclid", "ref", "ref_"})
+
+
+def normalize_listing_url(url: str) -> str:
+    """Canonical cache key for a listing: lowercase host without www, no tracking params, fragment or trailing slash."""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower().removeprefix("www.")
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not (k.lower().startswith(TRACKING_PREFIXES) or k.lower() in TRACKING_PARAMS)
+    )
+    return urlunsplit((parts.scheme.lower() or "https", host, parts.path.rstrip("/") or "/", urlencode(query), ""))
+
+
+class CachedListing:
+    """An offering read from the cache. `stale` means its platform's TTL has passed."""
+
+    __slots__ = ("offering", "platform", "fetched_at", "stale")
+
+    def __init__(self, offering: VendorOfferings, platform: str, fetched_at: float, stale: bool):
+        self.offering = offering
+        self.platform = platform
+        self.fetched_at = fetched_at
+        self.stale = stale
+
+
+class ListingCache:
+    """
+    Disk-backed cache of vendor offerings, stored per (product id, platform) fetch.
+
+    Offerings keep their original timestamp; freshness is judged from when the
+    platform was last fetched for that product, against a per-platform TTL.
+    Entries past their TTL are still served (marked stale) until `max_stale`.
+    When the cache grows past `max_bytes` the least recently read fetches are evicted.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttls: dict[str, float] | None = None,
+        default_ttl: float = DEFAULT_TTL,
+        max_stale: float = MAX_STALE,
+        max_bytes: int = 50 * 1024 * 1024,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.ttls = ttls or {}
+        self.default_ttl = default_ttl
+        self.max_stale = max_stale
+        self.max_bytes = max_bytes
+        self.clock = clock
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS fetches ("
+                "product_id INTEGER, platform TEXT, fetched_at REAL, last_access REAL, "
+                "PRIMARY KEY (product_id, platform))"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS listings ("
+                "product_id INTEGER, platform TEXT, url TEXT, vendor_name TEXT, doc TEXT NOT NULL, size INTEGER, "
+                "PRIMARY KEY (product_id, platform, url))"
+            )
+            # The same listing can turn up in several products' results, so it is stored once per fetch
+            self.conn.execute("CREATE INDEX IF NOT EXISTS ix_listings_url ON listings (url)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS ix_listings_vendor ON listings (product_id, vendor_name)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS ix_fetches_access ON fetches (last_access)")
+
+    def ttl(self, platform: str) -> float:
+        return self.ttls.get(platform, self.default_ttl)
+
+    def put(self, product_id: int, platform: str, offerings: list[VendorOfferings]):
+        """Replaces everything cached for this product on this platform with a fresh fetch."""
+        now = self.clock()
+        with self.conn:
+            self.conn.execute("DELETE FROM listings WHERE product_id = ? AND platform = ?", (product_id, platform))
+            for offering in offerings:
+                doc = offering.model_dump_json()
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO listings (product_id, platform, url, vendor_name, doc, size) VALUES (?, ?, ?, ?, ?, ?)",
+                    (product_id, platform, normalize_listing_url(offering.listing_url), offering.vendor_name, doc, len(doc)),
+                )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO fetches (product_id, platform, fetched_at, last_access) VALUES (?, ?, ?, ?)",
+                (product_id, platform, now, now),
+            )
+        self.evict()
+
+    def _entry(self, doc: str, platform: str, fetched_at: float, now: float) -> CachedListing:
+        stale = now - fetched_at >= self.ttl(platform)
+        return CachedListing(VendorOfferings.model_validate_json(doc), platform, fetched_at, stale)
+
+    def _lookup(self, where: str, params: tuple) -> list[CachedListing]:
+        now = self.clock()
+        rows = self.conn.execute(
+            "SELECT l.doc, l.platform, f.fetched_at, f.product_id FROM listings l "
+            "JOIN fetches f ON f.product_id = l.product_id AND f.platform = l.platform "
+            f"WHERE {where} AND f.fetched_at > ? ORDER BY l.rowid",
+            params + (now - self.max_stale,),
+        ).fetchall()
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE fetches SET last_access = ? WHERE product_id = ? AND platform = ?",
+                {(now, product_id, platform) for _, platform, _, product_id in rows},
+            )
+        return [self._entry(doc, platform, fetched_at, now) for doc, platform, fetched_at, _ in rows]
+
+    def get(self, listing_url: str) -> CachedListing | None:
+        """The most recently fetched copy of a listing, whichever product's search found it."""
+        entries = self._lookup("l.url = ?", (normalize_listing_url(listing_url),))
+        return max(entries, key=lambda e: e.fetched_at) if entries else None
+
+    def find(self, product_id: int, vendor_name: str) -> list[CachedListing]:
+        return self._lookup("l.product_id = ? AND l.vendor_name = ?", (product_id, vendor_name))
+
+    def get_product(self, product_id: int) -> list[CachedListing]:
+        return self._lookup("l.product_id = ?", (product_id,))
+
+    def fetch_ages(self, product_id: int) -> dict[str, float]:
+        """Seconds since each platform was fetched for this product (expired fetches excluded)."""
+        now = self.clock()
+        rows = self.conn.execute(
+            "SELECT platform, fetched_at FROM fetches WHERE product_id = ? AND fetched_at > ?",
+            (product_id, now - self.max_stale),
+        )
+        return {platform: now - fetched_at for platform, fetched_at in rows}
+
+    def size_bytes(self) -> int:
+        return self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM listings").fetchone()[0]
+
+    def evict(self) -> int:
+        """Drops least recently read fetches until the cache fits in max_bytes. Returns fetches evicted."""
+        evicted = 0
+        total = self.size_bytes()
+        while total > self.max_bytes:
+            oldest = self.conn.execute(
+                "SELECT product_id, platform FROM fetches ORDER BY last_access LIMIT 1"
+            ).fetchone()
+            if oldest is None:
+                break
+            with self.conn:
+                freed = self.conn.execute(
+                    "SELECT COALESCE(SUM(size), 0) FROM listings WHERE product_id = ? AND platform = ?", oldest
+                ).fetchone()[0]
+                self.conn.execute("DELETE FROM listings WHERE product_id = ? AND platform = ?", oldest)
+                self.conn.execute("DELETE FROM fetches WHERE product_id = ? AND platform = ?", oldest)
+            total -= freed
+            evicted += 1
+        return evicted
+
+    def close(self):
+        self.conn.close()
+
+
+class CachedVendorDiscovery:
+    """
+    Stale-while-revalidate front for VendorDiscoveryPipeline: fresh platforms are
+    served from cache, stale ones are served immediately and refreshed in the
+    background, and only platforms with nothing cached are fetched inline.
+    """
+
+    def __init__(self, pipeline: VendorDiscoveryPipeline, cache: ListingCache):
+        self.pipeline = pipeline
+        self.cache = cache
+        self.refreshing: set[asyncio.Task] = set()
+
+    async def _refresh(self, product_id: int, query: str, platforms: list[str]) -> list[VendorOfferings]:
+        offerings = []
+        async for result in self.pipeline.stream({product_id: query}, platforms=platforms):
+            # A failed fetch keeps whatever was cached before
+            if result.error is None:
+                self.cache.put(product_id, result.platform, result.offerings)
+                offerings.extend(result.offerings)
+        return offerings
+
+    async def discover(self, product_id: int, query: str) -> list[VendorOfferings]:
+        """Offerings for the product, ordered by price, without waiting on stale platforms."""
+        ages = self.cache.fetch_ages(product_id)
+        platforms = [a.name for a in self.pipeline.adapters]
+        missing = [p for p in platforms if p not in ages]
+        stale = [p for p in platforms if p in ages and ages[p] >= self.cache.ttl(p)]
+
+        offerings = [entry.offering for entry in self.cache.get_product(product_id) if entry.platform in platforms]
+        if stale:
+            task = asyncio.ensure_future(self._refresh(product_id, query, stale))
+            self.refreshing.add(task)
+            task.add_done_callback(self.refreshing.discard)
+        if missing:
+            offerings.extend(await self._refresh(product_id, query, missing))
+
+        return sorted(offerings, key=lambda o: (o.price, o.vendor_name, o.listing_url))
+
+    async def wait_for_refreshes(self):
+        """Waits for background revalidation, e.g. before shutting down."""
+        if self.refreshing:
+            await asyncio.gather(*self.refreshing, return_exceptions=True)
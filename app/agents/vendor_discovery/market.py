@@ -0,0 +1,271 @@
+import heapq
+import math
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Iterable, Literal
+
+from app.schemas.product import MarketSummary, PriceStats, VendorOfferings
+
+
+class LazyHeap:
+    """Min-heap that supports removing arbitrary values by deferring the pop until they surface."""
+
+    def __init__(self, sign: int = 1):
+        # sign=-1 turns it into a max-heap
+        self.sign = sign
+        self.heap: list[float] = []
+        self.delayed: Counter = Counter()
+        self.size = 0
+
+    def push(self, value: float):
+        heapq.heappush(self.heap, self.sign * value)
+        self.size += 1
+
+    def remove(self, value: float):
+        self.delayed[self.sign * value] += 1
+        self.size -= 1
+        self._prune()
+
+    def _prune(self):
+        while self.heap and self.delayed[self.heap[0]]:
+            self.delayed[self.heap[0]] -= 1
+            heapq.heappop(self.heap)
+
+    def top(self) -> float:
+        return self.sign * self.heap[0]
+
+    def pop(self) -> float:
+        value = self.sign * heapq.heappop(self.heap)
+        self.size -= 1
+        self._prune()
+        return value
+
+
+class StreamingMedian:
+    """Exact running median over a multiset with O(log n) insert and remove (two balanced heaps)."""
+
+    def __init__(self):
+        self.low = LazyHeap(sign=-1)
+        self.high = LazyHeap()
+
+    def __len__(self) -> int:
+        return self.low.size + self.high.size
+
+    def _balance(self):
+        if self.low.size > self.high.size + 1:
+            self.high.push(self.low.pop())
+        elif self.low.size < self.high.size:
+            self.low.push(self.high.pop())
+
+    def add(self, value: float):
+        if not self.low.size or value <= self.low.top():
+            self.low.push(value)
+        else:
+            self.high.push(value)
+        self._balance()
+
+    def remove(self, value: float):
+        if self.low.size and value <= self.low.top():
+            self.low.remove(value)
+        else:
+            self.high.remove(value)
+        self._balance()
+
+    def median(self) -> float:
+        if self.low.size > self.high.size:
+            return self.low.top()
+        return (self.low.top() + self.high.top()) / 2
+
+
+class PriceSketch:
+    """
+    Approximate quantiles for very large offer sets: prices fall into
+    log-spaced buckets with a bounded relative error, so memory depends on the
+    price range rather than the number of offerings.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.buckets: Counter = Counter()
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _bucket(self, value: float) -> int:
+        return math.ceil(math.log(max(value, 1e-9)) / self.log_gamma)
+
+    def _value(self, bucket: int) -> float:
+        # Midpoint of the bucket, within relative_accuracy of every value in it
+        return 2 * self.gamma ** bucket / (self.gamma + 1)
+
+    def add(self, value: float):
+        self.buckets[self._bucket(value)] += 1
+        self.count += 1
+
+    def remove(self, value: float):
+        bucket = self._bucket(value)
+        self.buckets[bucket] -= 1
+        if not self.buckets[bucket]:
+            del self.buckets[bucket]
+        self.count -= 1
+
+    def quantile(self, q: float) -> float:
+        rank = q * (self.count - 1)
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen > rank:
+                return self._value(bucket)
+        return self._value(max(self.buckets))
+
+    def median(self) -> float:
+        return self.quantile(0.5)
+
+    def min(self) -> float:
+        return self._value(min(self.buckets))
+
+    def max(self) -> float:
+        return self._value(max(self.buckets))
+
+
+class MarketAggregator:
+    """
+    Maintains MarketSummary statistics for one product as vendor offerings
+    stream in, instead of re-sorting every offering on each update.
+
+    An offering is identified by (vendor_name, listing_url); a newer observation
+    of the same listing replaces the old one. Only each listing's key, price and
+    timestamp are retained, never the VendorOfferings model, so memory is a small
+    constant per live listing. "exact" mode adds heaps for an exact median and
+    min/max; "sketch" mode keeps the price distribution in buckets bounded by the
+    price range instead.
+    """
+
+    def __init__(
+        self,
+        mode: Literal["exact", "sketch"] = "exact",
+        freshness_half_life: timedelta = timedelta(days=3),
+        relative_accuracy: float = 0.01,
+    ):
+        self.mode = mode
+        self.freshness_half_life = freshness_half_life
+        # (vendor_name, listing_url) -> (price, timestamp)
+        self.offerings: dict[tuple[str, str], tuple[float, float]] = {}
+        self.vendors: Counter = Counter()
+        self.total_price = 0.0
+        self.total_timestamp = 0.0
+
+        if mode == "exact":
+            self.prices = StreamingMedian()
+            self.min_heap = LazyHeap()
+            self.max_heap = LazyHeap(sign=-1)
+        else:
+            self.prices = PriceSketch(relative_accuracy)
+
+        # (timestamp, key) pairs for expiry; entries whose offering was replaced are skipped
+        self.expiry: list[tuple[float, tuple[str, str]]] = []
+
+    def __len__(self) -> int:
+        return len(self.offerings)
+
+    @staticmethod
+    def key(offering: VendorOfferings) -> tuple[str, str]:
+        return (offering.vendor_name, offering.listing_url)
+
+    def _track(self, key: tuple[str, str], price: float, timestamp: float, sign: int):
+        self.total_price += sign * price
+        self.total_timestamp += sign * timestamp
+        self.vendors[key[0]] += sign
+        if not self.vendors[key[0]]:
+            del self.vendors[key[0]]
+
+        if sign > 0:
+            self.prices.add(price)
+            if self.mode == "exact":
+                self.min_heap.push(price)
+                self.max_heap.push(price)
+        else:
+            self.prices.remove(price)
+            if self.mode == "exact":
+                self.min_heap.remove(price)
+                self.max_heap.remove(price)
+
+    def _discard(self, key: tuple[str, str]) -> bool:
+        previous = self.offerings.pop(key, None)
+        if previous is None:
+            return False
+        self._track(key, *previous, -1)
+        return True
+
+    def add(self, offering: VendorOfferings):
+        """Adds an offering, replacing a previous observation of the same listing. O(log n)."""
+        key = self.key(offering)
+        self._discard(key)
+
+        entry = (offering.price, offering.timestamp.timestamp())
+        self.offerings[key] = entry
+        self._track(key, *entry, 1)
+        heapq.heappush(self.expiry, (entry[1], key))
+        # Replaced listings leave stale entries behind; rebuild before they outnumber live ones
+        if len(self.expiry) > 2 * len(self.offerings) + 64:
+            self.expiry = [(timestamp, key) for key, (_, timestamp) in self.offerings.items()]
+            heapq.heapify(self.expiry)
+
+    def add_many(self, offerings: Iterable[VendorOfferings]):
+        for offering in offerings:
+            self.add(offering)
+
+    def remove(self, offering: VendorOfferings) -> bool:
+        return self._discard(self.key(offering))
+
+    def expire(self, older_than: datetime) -> int:
+        """Drops offerings observed before the cutoff. Returns how many were removed."""
+        cutoff = older_than.timestamp()
+        removed = 0
+        while self.expiry and self.expiry[0][0] < cutoff:
+            timestamp, key = heapq.heappop(self.expiry)
+            current = self.offerings.get(key)
+            # Skip heap entries left behind by a replaced or removed offering
+            if current is not None and current[1] == timestamp:
+                self._discard(key)
+                removed += 1
+        return removed
+
+    def price_stats(self) -> PriceStats:
+        if not self.offerings:
+            raise ValueError("No offerings to summarise")
+
+        if self.mode == "exact":
+            low, high = self.min_heap.top(), self.max_heap.top()
+        else:
+            low, high = self.prices.min(), self.prices.max()
+
+        return PriceStats(
+            average_price=self.total_price / len(self.offerings),
+            median_price=self.prices.median(),
+            min_price=low,
+            max_price=high,
+        )
+
+    def confidence(self, now: datetime | None = None) -> float:
+        """
+        Grows with the number of distinct vendors and decays with the mean age
+        of the offerings (halving every freshness_half_life).
+        """
+        if not self.offerings:
+            return 0.0
+
+        now = now or datetime.now()
+        sample = 1 - math.exp(-len(self.vendors) / 3)
+        mean_age = max(0.0, now.timestamp() - self.total_timestamp / len(self.offerings))
+        freshness = 0.5 ** (mean_age / self.freshness_half_life.total_seconds())
+        return round(sample * freshness, 4)
+
+    def snapshot(self, now: datetime | None = None) -> MarketSummary:
+        return MarketSummary(
+            price_stats=self.price_stats(),
+            vendors_count=len(self.vendors),
+            confidence_score=self.confidence(now),
+        )
@@ -0,0 +1,241 @@
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Iterator, get_args
+
+import numpy as np
+
+from app.schemas.product import VendorOfferings
+
+AVAILABILITY = get_args(VendorOfferings.model_fields["availability"].annotation)
+AVAILABILITY_CODES = {value: code for code, value in enumerate(AVAILABILITY)}
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+# tz_offset value for naive timestamps
+NAIVE = np.iinfo(np.int32).min
+
+
+class StringPool:
+    """Dictionary encoding: each distinct string is stored once and referenced by an int32 code."""
+
+    def __init__(self):
+        self.values: list[str] = []
+        self.codes: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def encode(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class OfferRow:
+    """Read-only view of one row. Holds no data of its own."""
+
+    __slots__ = ("table", "index")
+
+    def __init__(self, table: "OfferTable", index: int):
+        self.table = table
+        self.index = index
+
+    @property
+    def id(self) -> int:
+        return int(self.table.product_ids[self.index])
+
+    @property
+    def vendor_name(self) -> str:
+        return self.table.vendors.values[self.table.vendor_codes[self.index]]
+
+    @property
+    def price(self) -> float:
+        return float(self.table.prices[self.index])
+
+    @property
+    def listing_url(self) -> str:
+        return self.table.listing_urls[self.index]
+
+    @property
+    def availability(self) -> str:
+        return AVAILABILITY[self.table.availability_codes[self.index]]
+
+    @property
+    def warranty(self) -> str | None:
+        code = self.table.warranty_codes[self.index]
+        return None if code < 0 else self.table.warranties.values[code]
+
+    @property
+    def timestamp(self) -> datetime:
+        return self.table.timestamp_at(self.index)
+
+    def to_model(self) -> VendorOfferings:
+        return self.table.to_offering(self.index)
+
+
+class OfferTable:
+    """
+    Columnar store for large sets of VendorOfferings.
+
+    Prices, timestamps and product ids live in typed NumPy arrays; vendor names
+    and warranties are dictionary-encoded and availability is an int8 enum code.
+    The column properties are zero-copy views, ready for vectorized ranking and
+    statistics. Conversion back to VendorOfferings is lossless (aware
+    timestamps come back with a fixed-offset tzinfo for the same instant).
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.size = 0
+        self.vendors = StringPool()
+        self.warranties = StringPool()
+        self.listing_urls: list[str] = []
+        self._product_ids = np.empty(capacity, dtype=np.int64)
+        self._prices = np.empty(capacity, dtype=np.float64)
+        self._timestamps = np.empty(capacity, dtype=np.int64)
+        self._tz_offsets = np.empty(capacity, dtype=np.int32)
+        self._vendor_codes = np.empty(capacity, dtype=np.int32)
+        self._warranty_codes = np.empty(capacity, dtype=np.int32)
+        self._availability_codes = np.empty(capacity, dtype=np.int8)
+
+    _COLUMNS = ("_product_ids", "_prices", "_timestamps", "_tz_offsets", "_vendor_codes", "_warranty_codes", "_availability_codes")
+
+    @classmethod
+    def from_offerings(cls, offerings: Iterable[VendorOfferings]) -> "OfferTable":
+        offerings = list(offerings)
+        table = cls(capacity=max(len(offerings), 1))
+        table.extend(offerings)
+        return table
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, index: int) -> OfferRow:
+        if not -self.size <= index < self.size:
+            raise IndexError(index)
+        return OfferRow(self, index % self.size)
+
+    def __iter__(self) -> Iterator[OfferRow]:
+        return (OfferRow(self, i) for i in range(self.size))
+
+    def _reserve(self, needed: int):
+        capacity = len(self._prices)
+        if needed <= capacity:
+            return
+        # A table created with capacity=0 would never grow by doubling
+        capacity = max(capacity, 1)
+        while capacity < needed:
+            capacity *= 2
+        for name in self._COLUMNS:
+            column = getattr(self, name)
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            setattr(self, name, grown)
+
+    def append(self, offering: VendorOfferings):
+        self.extend((offering,))
+
+    def extend(self, offerings: Iterable[VendorOfferings]):
+        """Appends offerings, encoding them column by column in one pass."""
+        product_ids, prices, timestamps, tz_offsets, vendors, warranties, availability = [], [], [], [], [], [], []
+        for offering in offerings:
+            ts = offering.timestamp
+            offset = ts.utcoffset()
+            if offset is None:
+                timestamps.append((ts - EPOCH) // MICROSECOND)
+                tz_offsets.append(NAIVE)
+            else:
+                timestamps.append((ts.replace(tzinfo=None) - offset - EPOCH) // MICROSECOND)
+                tz_offsets.append(offset // timedelta(seconds=1))
+            product_ids.append(offering.id)
+            prices.append(offering.price)
+            vendors.append(self.vendors.encode(offering.vendor_name))
+            warranties.append(-1 if offering.warranty is None else self.warranties.encode(offering.warranty))
+            availability.append(AVAILABILITY_CODES[offering.availability])
+            self.listing_urls.append(offering.listing_url)
+
+        start, end = self.size, self.size + len(prices)
+        self._reserve(end)
+        self._product_ids[start:end] = product_ids
+        self._prices[start:end] = prices
+        self._timestamps[start:end] = timestamps
+        self._tz_offsets[start:end] = tz_offsets
+        self._vendor_codes[start:end] = vendors
+        self._warranty_codes[start:end] = warranties
+        self._availability_codes[start:end] = availability
+        self.size = end
+
+    # --- Zero-copy column views ---
+
+    @property
+    def product_ids(self) -> np.ndarray:
+        return self._product_ids[:self.size]
+
+    @property
+    def prices(self) -> np.ndarray:
+        return self._prices[:self.size]
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        """Microseconds since the epoch (UTC for aware timestamps, wall clock for naive ones)."""
+        return self._timestamps[:self.size]
+
+    @property
+    def vendor_codes(self) -> np.ndarray:
+        return self._vendor_codes[:self.size]
+
+    @property
+    def warranty_codes(self) -> np.ndarray:
+        return self._warranty_codes[:self.size]
+
+    @property
+    def availability_codes(self) -> np.ndarray:
+        return self._availability_codes[:self.size]
+
+    def in_stock(self) -> np.ndarray:
+        return self.availability_codes == AVAILABILITY_CODES["in_stock"]
+
+    def lowest_prices(self, in_stock_only: bool = True) -> tuple[np.ndarray, np.ndarray]:
+        """(product ids, lowest price per product), sorted by id - the price column ranking consumes."""
+        mask = self.in_stock() if in_stock_only else slice(None)
+        ids, prices = self.product_ids[mask], self.prices[mask]
+        if not len(ids):
+            return ids, prices
+        order = np.argsort(ids, kind="stable")
+        ids, prices = ids[order], prices[order]
+        starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+        return ids[starts], np.minimum.reduceat(prices, starts)
+
+    # --- Back to the schema models ---
+
+    def timestamp_at(self, index: int) -> datetime:
+        moment = EPOCH + int(self._timestamps[index]) * MICROSECOND
+        offset = int(self._tz_offsets[index])
+        if offset == NAIVE:
+            return moment
+        tz = timezone(timedelta(seconds=offset))
+        return (moment + timedelta(seconds=offset)).replace(tzinfo=tz)
+
+    def to_offering(self, index: int) -> VendorOfferings:
+        code = int(self._warranty_codes[index])
+        return VendorOfferings(
+            id=int(self._product_ids[index]),
+            vendor_name=self.vendors.values[self._vendor_codes[index]],
+            price=float(self._prices[index]),
+            listing_url=self.listing_urls[index],
+            availability=AVAILABILITY[self._availability_codes[index]],
+            warranty=None if code < 0 else self.warranties.values[code],
+            timestamp=self.timestamp_at(index),
+        )
+
+    def to_offerings(self, indices: Iterable[int] | np.ndarray | None = None) -> list[VendorOfferings]:
+        """Materialises rows as VendorOfferings, e.g. at an API boundary. All rows by default."""
+        if indices is None:
+            indices = range(self.size)
+        return [self.to_offering(int(i)) for i in indices]
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the table, including strings."""
+        arrays = sum(getattr(self, name)[:self.size].nbytes for name in self._COLUMNS)
+        strings = sum(len(s) + 49 for s in self.listing_urls) + 8 * len(self.listing_urls)
+        pools = sum(len(s) + 49 + 8 for pool in (self.vendors, self.warranties) for s in pool.values)
+        return arrays + strings + pools
@@ -0,0 +1,199 @@
+import asyncio
+import random
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import AsyncIterator, Iterable
+
+import httpx
+
+from app.schemas.product import Product, VendorOfferings
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Allows `rate` requests per second on average, with bursts of up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: int = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class PlatformAdapter(ABC):
+    """
+    One vendor platform (Jumia, Konga, ...). Adapters only know how to build a
+    search request and turn the response into offerings; the pipeline owns
+    concurrency, rate limiting, timeouts and retries.
+    """
+
+    name: str
+    rate_per_second: float = 2.0
+    burst: int = 2
+
+    @abstractmethod
+    def build_request(self, client: httpx.AsyncClient, query: str) -> httpx.Request:
+        ...
+
+    @abstractmethod
+    def parse(self, response: httpx.Response, product_id: int) -> list[VendorOfferings]:
+        ...
+
+
+class JSONListingAdapter(PlatformAdapter):
+    """
+    Adapter for endpoints that return a JSON list of listings, each with
+    vendor_name, price, listing_url, availability and optionally warranty.
+    """
+
+    def __init__(self, name: str, search_url: str, rate_per_second: float = 2.0, burst: int = 2):
+        self.name = name
+        self.search_url = search_url
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+
+    def build_request(self, client: httpx.AsyncClient, query: str) -> httpx.Request:
+        return client.build_request("GET", self.search_url, params={"q": query})
+
+    def parse(self, response: httpx.Response, product_id: int) -> list[VendorOfferings]:
+        observed = datetime.now()
+        return [
+            VendorOfferings(
+                id=product_id,
+                vendor_name=item["vendor_name"],
+                price=item["price"],
+                listing_url=item["listing_url"],
+                availability=item.get("availability", "in_stock"),
+                warranty=item.get("warranty"),
+                timestamp=observed,
+            )
+            for item in response.json()
+        ]
+
+
+class PlatformResult:
+    """What one platform returned for one product. `error` is set when every attempt failed."""
+
+    __slots__ = ("platform", "product_id", "offerings", "error", "attempts", "elapsed")
+
+    def __init__(self, platform: str, product_id: int, offerings: list[VendorOfferings], error: str | None, attempts: int, elapsed: float):
+        self.platform = platform
+        self.product_id = product_id
+        self.offerings = offerings
+        self.error = error
+        self.attempts = attempts
+        self.elapsed = elapsed
+
+
+class VendorDiscoveryPipeline:
+    """
+    Fetches and normalises listings from every platform concurrently.
+
+    A global semaphore bounds in-flight requests across all platforms and
+    products, each platform has its own token bucket, and failed requests
+    (network errors, timeouts, 429/5xx) are retried with jittered exponential
+    backoff. Results are streamed per platform as soon as they arrive, so
+    ranking can start before the slowest platform answers.
+    """
+
+    def __init__(
+        self,
+        adapters: Iterable[PlatformAdapter],
+        max_concurrency: int = 8,
+        timeout: float = 10.0,
+        retries: int = 2,
+        backoff: float = 0.5,
+        client: httpx.AsyncClient | None = None,
+    ):
+        self.adapters = list(adapters)
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.buckets = {a.name: TokenBucket(a.rate_per_second, a.burst) for a in self.adapters}
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.client = client
+
+    async def _fetch(self, client: httpx.AsyncClient, adapter: PlatformAdapter, product_id: int, query: str) -> PlatformResult:
+        started = time.monotonic()
+        error = None
+        for attempt in range(1, self.retries + 2):
+            # Wait for the platform's rate limit before taking a global slot
+            await self.buckets[adapter.name].acquire()
+            try:
+                async with self.semaphore:
+                    response = await asyncio.wait_for(
+                        client.send(adapter.build_request(client, query)), timeout=self.timeout
+                    )
+                if response.status_code not in RETRYABLE_STATUS:
+                    response.raise_for_status()
+                    try:
+                        offerings = adapter.parse(response, product_id)
+                    except Exception as exc:
+                        # An unexpected payload fails this platform only, never the whole stream
+                        error = f"{type(exc).__name__}: {exc}"
+                        return PlatformResult(adapter.name, product_id, [], error, attempt, time.monotonic() - started)
+                    return PlatformResult(adapter.name, product_id, offerings, None, attempt, time.monotonic() - started)
+                error = f"HTTP {response.status_code}"
+            except (httpx.TransportError, asyncio.TimeoutError) as exc:
+                error = f"{type(exc).__name__}: {exc}"
+            except (httpx.HTTPStatusError, ValueError, KeyError) as exc:
+                # Non-retryable: a 4xx, or a request the adapter could not build
+                error = f"{type(exc).__name__}: {exc}"
+                return PlatformResult(adapter.name, product_id, [], error, attempt, time.monotonic() - started)
+
+            if attempt <= self.retries:
+                await asyncio.sleep(self.backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+
+        return PlatformResult(adapter.name, product_id, [], error, self.retries + 1, time.monotonic() - started)
+
+    async def stream(self, queries: dict[int, str], platforms: Iterable[str] | None = None) -> AsyncIterator[PlatformResult]:
+        """
+        Yields one result per (product, platform) in completion order. `queries` maps
+        product id -> search query; `platforms` restricts the fetch to those adapters.
+        """
+        adapters = self.adapters
+        if platforms is not None:
+            wanted = set(platforms)
+            adapters = [a for a in self.adapters if a.name in wanted]
+        client = self.client or httpx.AsyncClient()
+        try:
+            tasks = [
+                asyncio.ensure_future(self._fetch(client, adapter, product_id, query))
+                for product_id, query in queries.items()
+                for adapter in adapters
+            ]
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    yield await next_done
+            finally:
+                for task in tasks:
+                    task.cancel()
+        finally:
+            if self.client is None:
+                await client.aclose()
+
+    async def discover(self, product_id: int, query: str) -> list[VendorOfferings]:
+        """All offerings for one product across platforms, ordered by price."""
+        offerings = []
+        async for result in self.stream({product_id: query}):
+            offerings.extend(result.offerings)
+        return sorted(offerings, key=lambda o: (o.price, o.vendor_name, o.listing_url))
+
+    async def attach(self, product: Product, query: str) -> Product:
+        """Returns a copy of the product with newly discovered offerings added to vendor_offerings."""
+        offerings = await self.discover(product.id, query)
+        return product.model_copy(update={"vendor_offerings": (product.vendor_offerings or []) + offerings})
@@ -0,0 +1,224 @@
+import argparse
+import gzip
+import json
+import os
+from contextlib import contextmanager
+from typing import Iterable, Iterator
+
+from app.memory.cache import LRUCache
+from app.memory.locking import FileLock
+
+INDEX_FILE = "index.json"
+LOCK_FILE = "archive.lock"
+
+
+class EpisodeArchive:
+    """
+    Cold storage for episodes that left the hot memory store.
+
+    Episodes are appended to gzip-compressed JSONL segment files that are never
+    modified once written. A small index (episode id -> segment, category) is
+    kept in index.json, and segments are only decompressed when a lookup needs
+    them. Records superseded or restored to the hot store stay in their segment
+    until compact() rewrites the live ones.
+
+    Several processes can share one archive directory. Changes hold an exclusive
+    lock on archive.lock and start from the latest index, and every instance
+    re-reads the index when the lock file's write counter shows someone else
+    changed it.
+    """
+
+    def __init__(self, directory: str, segment_max_records: int = 5000, cached_segments: int = 4):
+        self.directory = directory
+        self.segment_max_records = segment_max_records
+        self.segments = LRUCache(cached_segments)
+        os.makedirs(directory, exist_ok=True)
+        self.lock = FileLock(os.path.join(directory, LOCK_FILE))
+
+        self.index: dict[str, list[str]] = {}
+        self.next_segment = 1
+        self.categories: dict[str, set[str]] = {}
+        # Write counter the in-memory index reflects
+        self.version: int | None = None
+        with self._reading():
+            pass
+
+    def _refresh(self):
+        """Re-reads the index if it changed since we last did. Call while holding the lock."""
+        version = self.lock.version()
+        if version == self.version:
+            return
+        self.index = {}
+        self.next_segment = 1
+        index_path = os.path.join(self.directory, INDEX_FILE)
+        if os.path.exists(index_path):
+            with open(index_path) as f:
+                data = json.load(f)
+            self.index = data["episodes"]
+            self.next_segment = data["next_segment"]
+
+        self.categories = {}
+        for episode_id, (_, category) in self.index.items():
+            self.categories.setdefault(category, set()).add(episode_id)
+        self.version = version
+
+    @contextmanager
+    def _reading(self) -> Iterator[None]:
+        # Also keeps compact() from deleting segments while they are read
+        with self.lock.shared():
+            self._refresh()
+            yield
+
+    @contextmanager
+    def _writing(self) -> Iterator[None]:
+        with self.lock.exclusive():
+            self._refresh()
+            yield
+            self._write_index()
+            self.version = self.lock.bump_version()
+
+    def __contains__(self, episode_id: str) -> bool:
+        with self._reading():
+            return episode_id in self.index
+
+    def __len__(self) -> int:
+        with self._reading():
+            return len(self.index)
+
+    def _write_index(self):
+        # Written to a temp file first so a crash never leaves a truncated index
+        path = os.path.join(self.directory, INDEX_FILE)
+        with open(path + ".tmp", "w") as f:
+            json.dump({"next_segment": self.next_segment, "episodes": self.index}, f)
+        os.replace(path + ".tmp", path)
+
+    def _write_segment(self, docs: list[dict]) -> str:
+        # A segment left behind by a crash before its index write is never reused
+        while True:
+            name = f"segment-{self.next_segment:06d}.jsonl.gz"
+            self.next_segment += 1
+            if not os.path.exists(os.path.join(self.directory, name)):
+                break
+        with gzip.open(os.path.join(self.directory, name), "wt", encoding="utf-8") as f:
+            for doc in docs:
+                f.write(json.dumps(doc) + "\n")
+        return name
+
+    def _load_segment(self, name: str) -> dict[str, dict]:
+        records = self.segments.get(name)
+        if records is None:
+            records = {}
+            with gzip.open(os.path.join(self.directory, name), "rt", encoding="utf-8") as f:
+                for line in f:
+                    doc = json.loads(line)
+                    records[doc["id"]] = doc
+            self.segments.set(name, records)
+        return records
+
+    def _segment_names(self) -> list[str]:
+        return sorted(n for n in os.listdir(self.directory) if n.startswith("segment-") and n.endswith(".jsonl.gz"))
+
+    def _forget(self, episode_id: str):
+        entry = self.index.pop(episode_id, None)
+        if entry is not None:
+            self.categories[entry[1]].discard(episode_id)
+
+    def _append(self, docs: list[dict]):
+        for start in range(0, len(docs), self.segment_max_records):
+            chunk = docs[start:start + self.segment_max_records]
+            name = self._write_segment(chunk)
+            for doc in chunk:
+                self._forget(doc["id"])
+                self.index[doc["id"]] = [name, doc["category"]]
+                self.categories.setdefault(doc["category"], set()).add(doc["id"])
+
+    def append(self, docs: Iterable[dict]):
+        """Writes episodes to new segments. A newer copy of an archived id replaces the old one."""
+        docs = list(docs)
+        if not docs:
+            return
+        with self._writing():
+            self._append(docs)
+
+    def discard(self, episode_id: str):
+        """Forgets an archived episode, e.g. when it is restored to the hot store."""
+        if episode_id not in self:
+            return
+        with self._writing():
+            self._forget(episode_id)
+
+    def get(self, episode_id: str) -> dict | None:
+        with self._reading():
+            entry = self.index.get(episode_id)
+            if entry is None:
+                return None
+            return self._load_segment(entry[0]).get(episode_id)
+
+    def get_by_category(self, category: str) -> list[dict]:
+        """Archived episodes for a category. Only the segments holding them are read."""
+        with self._reading():
+            by_segment: dict[str, list[str]] = {}
+            for episode_id in self.categories.get(category, ()):
+                by_segment.setdefault(self.index[episode_id][0], []).append(episode_id)
+
+            docs = []
+            for name in sorted(by_segment):
+                records = self._load_segment(name)
+                docs.extend(records[episode_id] for episode_id in by_segment[name])
+        docs.sort(key=lambda d: (d["created_at"], d["id"]))
+        return docs
+
+    def compact(self) -> dict[str, int]:
+        """
+        Rewrites live records into full segments and deletes the old files,
+        dropping superseded and discarded copies.
+        """
+        with self._writing():
+            old_segments = self._segment_names()
+            live_by_segment: dict[str, list[str]] = {}
+            for episode_id, (segment, _) in self.index.items():
+                live_by_segment.setdefault(segment, []).append(episode_id)
+
+            live = []
+            for name in sorted(live_by_segment):
+                records = self._load_segment(name)
+                live.extend(records[episode_id] for episode_id in live_by_segment[name])
+            live.sort(key=lambda d: (d["created_at"], d["id"]))
+
+            self.segments.clear()
+            self.index.clear()
+            self.categories.clear()
+            self._append(live)
+            # The new index must land before any old file is removed
+            self._write_index()
+            for name in old_segments:
+                os.remove(os.path.join(self.directory, name))
+
+        return {
+            "records": len(live),
+            "segments_before": len(old_segments),
+            "segments_after": len(self._segment_names()),
+        }
+
+
+if __name__ == "__main__":
+    from app.memory.service import MemoryService
+
+    parser = argparse.ArgumentParser(description="Move cold episodes out of the hot memory store, or compact the archive.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    run = subcommands.add_parser("run", help="Archive completed/abandoned and idle episodes")
+    run.add_argument("--db", default="database/memory.json", help="Hot memory store")
+    run.add_argument("--dir", default="database/archive", help="Archive directory")
+    run.add_argument("--idle-days", type=int, default=None, help="Also archive episodes idle this long")
+
+    compact = subcommands.add_parser("compact", help="Rewrite archive segments without stale records")
+    compact.add_argument("--dir", default="database/archive", help="Archive directory")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        service = MemoryService(args.db, archive_dir=args.dir)
+        print({"archived": service.archive_episodes(args.idle_days)})
+        service.db.close()
+    else:
+        print(EpisodeArchive(args.dir).compact())
@@ -0,0 +1,60 @@
+"""
+JSON codec for the memory stores.
+
+Uses orjson (a declared dependency) and falls back to a compact, preconfigured
+stdlib encoder where it is not installed. Both produce UTF-8 JSON that either
+one can read back.
+"""
+import io
+import json
+import os
+from typing import Any
+
+from tinydb.storages import JSONStorage
+
+from app.utils.metrics import telemetry
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+_encoder = json.JSONEncoder(ensure_ascii=False, check_circular=False, separators=(",", ":"))
+
+
+def dumps(obj: Any) -> str:
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    return _encoder.encode(obj)
+
+
+def loads(data: str | bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONStorage(JSONStorage):
+    """TinyDB JSONStorage that reads and writes the whole file with this codec."""
+
+    def __init__(self, path: str, **kwargs):
+        kwargs.setdefault("encoding", "utf-8")
+        super().__init__(path, **kwargs)
+
+    def read(self) -> dict[str, dict[str, Any]] | None:
+        self._handle.seek(0)
+        data = self._handle.read()
+        return loads(data) if data else None
+
+    def write(self, data: dict[str, dict[str, Any]]):
+        self._handle.seek(0)
+        serialized = dumps(data)
+        # The whole file is rewritten on every flush
+        telemetry.note(bytes_written=len(serialized))
+        try:
+            self._handle.write(serialized)
+        except io.UnsupportedOperation:
+            raise IOError(f'Cannot write to the database. Access mode is "{self._mode}"')
+        self._handle.flush()
+        os.fsync(self._handle.fileno())
+        self._handle.truncate()
@@ -0,0 +1,155 @@
+from typing import Any, Iterable
+
+from app.memory.storage import canonical_value
+from app.schemas.memory import Heuristic
+
+
+def normalize_condition_value(value: Any) -> Any:
+    """Case-insensitive strings; unhashable values compare by their canonical JSON."""
+    if isinstance(value, str):
+        return value.strip().casefold()
+    if isinstance(value, (dict, list, set)):
+        return canonical_value(value)
+    return value
+
+
+def _as_values(value: Any) -> list[Any]:
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return list(value)
+    return [value]
+
+
+def _is_range(value: Any) -> bool:
+    return isinstance(value, dict) and bool(value) and set(value) <= {"min", "max"}
+
+
+class CompiledHeuristic:
+    """
+    A heuristic's applicability dict split into discrete conditions
+    (scalar = equals, list = one of) and numeric ranges ({"min": .., "max": ..}, inclusive).
+    """
+
+    __slots__ = ("heuristic", "discrete", "ranges")
+
+    def __init__(self, heuristic: Heuristic):
+        self.heuristic = heuristic
+        self.discrete: dict[str, frozenset] = {}
+        self.ranges: list[tuple[str, float | None, float | None]] = []
+
+        for key, condition in heuristic.applicability.items():
+            if _is_range(condition):
+                self.ranges.append((key, condition.get("min"), condition.get("max")))
+            else:
+                self.discrete[key] = frozenset(normalize_condition_value(v) for v in _as_values(condition))
+
+    def matches_ranges(self, context: dict[str, Any]) -> bool:
+        for key, low, high in self.ranges:
+            value = context.get(key)
+            if not isinstance(value, (int, float)):
+                return False
+            if low is not None and value < low:
+                return False
+            if high is not None and value > high:
+                return False
+        return True
+
+
+class HeuristicIndex:
+    """
+    Matches heuristics against a context such as
+    {"category": "electronics", "price": 450000, "platform": "Jumia", "location": "Lagos"}.
+
+    Discrete conditions are kept in inverted postings (key -> value -> heuristics),
+    so a lookup only touches heuristics that share at least one value with the
+    context. Range conditions are checked on those candidates afterwards.
+    A context value may be a list (e.g. every location a vendor delivers to),
+    in which case any of its values can satisfy a condition.
+    """
+
+    def __init__(self, heuristics: Iterable[Heuristic] = ()):
+        self.compiled: list[CompiledHeuristic | None] = []
+        self.slots: dict[str, int] = {}
+        self.postings: dict[str, dict[Any, set[int]]] = {}
+        # Heuristics with no discrete condition cannot be reached through the postings
+        self.unkeyed: set[int] = set()
+
+        for heuristic in heuristics:
+            self.add(heuristic)
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def add(self, heuristic: Heuristic):
+        """Indexes a heuristic, replacing any previous version with the same id."""
+        self.remove(heuristic.id)
+
+        compiled = CompiledHeuristic(heuristic)
+        slot = len(self.compiled)
+        self.compiled.append(compiled)
+        self.slots[heuristic.id] = slot
+
+        if not compiled.discrete:
+            self.unkeyed.add(slot)
+        for key, values in compiled.discrete.items():
+            by_value = self.postings.setdefault(key, {})
+            for value in values:
+                by_value.setdefault(value, set()).add(slot)
+
+    def remove(self, heuristic_id: str):
+        slot = self.slots.pop(heuristic_id, None)
+        if slot is None:
+            return
+
+        compiled = self.compiled[slot]
+        self.compiled[slot] = None
+        self.unkeyed.discard(slot)
+        for key, values in compiled.discrete.items():
+            for value in values:
+                self.postings[key][value].discard(slot)
+
+    def _candidates(self, signature: tuple) -> list[int]:
+        """Slots whose discrete conditions are all satisfied by the context signature."""
+        hits: dict[int, int] = {}
+        for key, values in signature:
+            by_value = self.postings[key]
+            slots = set()
+            for value in values:
+                slots |= by_value.get(value, set())
+            for slot in slots:
+                hits[slot] = hits.get(slot, 0) + 1
+
+        candidates = [slot for slot, count in hits.items() if count == len(self.compiled[slot].discrete)]
+        candidates.extend(self.unkeyed)
+        return sorted(candidates)
+
+    def _signature(self, context: dict[str, Any]) -> tuple:
+        return tuple(
+            (key, frozenset(normalize_condition_value(v) for v in _as_values(context[key])))
+            for key in sorted(context)
+            if key in self.postings and context[key] is not None
+        )
+
+    def match(self, context: dict[str, Any]) -> list[Heuristic]:
+        """Heuristics applicable to the context, in insertion order."""
+        return self.match_many([context])[0]
+
+    def match_many(self, contexts: Iterable[dict[str, Any]]) -> list[list[Heuristic]]:
+        """
+        Matches a batch of contexts (e.g. one per product). Contexts that agree on
+        their discrete fields share a single postings lookup.
+        """
+        candidates_by_signature: dict[tuple, list[int]] = {}
+        results = []
+        for context in contexts:
+            signature = self._signature(context)
+            candidates = candidates_by_signature.get(signature)
+            if candidates is None:
+                candidates = self._candidates(signature)
+                candidates_by_signature[signature] = candidates
+
+            results.append([
+                self.compiled[slot].heuristic
+                for slot in candidates
+                if self.compiled[slot].matches_ranges(context)
+            ])
+        return results
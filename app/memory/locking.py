@@ -0,0 +1,96 @@
+import os
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows: locks only hold within the process
+    fcntl = None
+
+
+class FileLock:
+    """
+    Reader/writer lock shared by every process using the same memory file,
+    built on flock() over a sidecar `<path>.lock` file. Exclusive sections are
+    re-entrant within the thread or asyncio task that holds them. Another task
+    on the holder's thread cannot wait for the lock without blocking the event
+    loop the holder needs, so it gets a RuntimeError instead of sharing it.
+
+    The lock file also holds a write counter that writers bump while holding
+    the exclusive lock, so other processes can tell their cached view is stale
+    without relying on file timestamps.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        # flock() does not exclude threads sharing this fd, so they queue here first
+        self.mutex = threading.RLock()
+        # Thread holding the exclusive lock, and how deep the holding context is nested in it
+        self.owner: int | None = None
+        self.depth: ContextVar[int] = ContextVar(f"file_lock_depth_{id(self)}", default=0)
+
+    def _flock(self, operation: str):
+        if fcntl is not None:
+            fcntl.flock(self.fd, getattr(fcntl, operation))
+
+    def _held_here(self) -> bool:
+        # A task created inside the section inherits its depth, so the owner is checked too
+        return self.depth.get() > 0 and self.owner == threading.get_ident()
+
+    @contextmanager
+    def exclusive(self) -> Iterator[None]:
+        if self._held_here():
+            token = self.depth.set(self.depth.get() + 1)
+            try:
+                yield
+            finally:
+                self.depth.reset(token)
+            return
+
+        if self.owner == threading.get_ident():
+            raise RuntimeError(f"{self.path} is held by another task on this thread; overlapping writes are not supported")
+        with self.mutex:
+            self._flock("LOCK_EX")
+            self.owner = threading.get_ident()
+            token = self.depth.set(1)
+            try:
+                yield
+            finally:
+                self.depth.reset(token)
+                self.owner = None
+                self._flock("LOCK_UN")
+
+    @contextmanager
+    def shared(self) -> Iterator[None]:
+        """
+        Blocks writers in other processes, but not other readers. A no-op on the
+        thread holding exclusive(), which already keeps writers out.
+        """
+        with self.mutex:
+            if self.owner == threading.get_ident():
+                yield
+                return
+            self._flock("LOCK_SH")
+            try:
+                yield
+            finally:
+                self._flock("LOCK_UN")
+
+    def version(self) -> int:
+        with self.mutex:
+            os.lseek(self.fd, 0, os.SEEK_SET)
+            return int.from_bytes(os.read(self.fd, 8), "little")
+
+    def bump_version(self) -> int:
+        """Records a write. Call while holding exclusive()."""
+        with self.mutex:
+            version = self.version() + 1
+            os.lseek(self.fd, 0, os.SEEK_SET)
+            os.write(self.fd, version.to_bytes(8, "little"))
+            return version
+
+    def close(self):
+        os.close(self.fd)
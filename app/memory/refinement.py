@@ -0,0 +1,250 @@
+"""
+Offline preference refinement.
+
+Folds the outcomes of episodes into preference memory in one batched pass,
+meant to run nightly (or on demand) next to the agent:
+
+    python -m app.memory.refinement database/memory.json
+
+Only episodes changed since the stored checkpoint are read. Each constraint
+of a completed episode (extracted_constraints, e.g. {"brand": "LG"}) counts
+as evidence for that preference in the episode's category; an abandoned
+episode counts against it. Each episode records the status it was credited
+at (refined_state), so saving it again changes nothing and a later status
+change only applies the difference. Preferences nobody reinforced lose
+confidence over time. Every change, and the new checkpoint, is committed in
+one write. archive_episodes() leaves closed episodes in the store until this
+job has credited them.
+"""
+import argparse
+import json
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING, Any
+
+from app.memory.storage import preference_key
+from app.schemas.memory import Episode, Preference
+from app.utils.config import PREFERENCE_CONFIDENCE_HALF_LIFE_DAYS
+from app.utils.metrics import traced
+
+if TYPE_CHECKING:
+    from app.memory.service import MemoryService
+
+CHECKPOINT_ID = "preference_refinement"
+# What an episode's outcome says about the constraints set in it; other states are still in progress
+OUTCOME_WEIGHTS = {"completed": 1.0, "abandoned": -0.5}
+# Same step as MemoryService.upsert_preference: each reinforcement closes 10% of the gap to 1
+CONFIDENCE_STEP = 0.9
+# Smaller confidence changes are not listed individually in the report
+REPORT_EPSILON = 1e-9
+
+
+def reinforce(confidence: float, weight: float) -> float:
+    """
+    Applies `weight` units of evidence at once. A positive weight equals that many
+    upsert_preference() bumps; a negative one shrinks confidence by the same factor.
+    """
+    if weight >= 0:
+        return 1.0 - (1.0 - confidence) * CONFIDENCE_STEP ** weight
+    return confidence * CONFIDENCE_STEP ** -weight
+
+
+class Evidence:
+    """Net outcome weight for one preference, summed over the episodes whose status changed since credited."""
+
+    __slots__ = ("category", "feature", "value", "weight", "count", "last_at")
+
+    def __init__(self, category: str, feature: str, value: Any):
+        self.category = category
+        self.feature = feature
+        self.value = value
+        self.weight = 0.0
+        # Net change in episodes that reinforce it, i.e. the evidence_count increment
+        self.count = 0
+        self.last_at: datetime | None = None
+
+
+class PreferenceRefiner:
+    def __init__(
+        self,
+        service: "MemoryService",
+        half_life_days: float | None = None,
+        outcome_weights: dict[str, float] | None = None,
+    ):
+        self.service = service
+        self.half_life_days = half_life_days if half_life_days is not None else PREFERENCE_CONFIDENCE_HALF_LIFE_DAYS
+        self.outcome_weights = outcome_weights if outcome_weights is not None else OUTCOME_WEIGHTS
+
+    def needs_credit(self, episode: Episode) -> bool:
+        """Whether the episode's status changed since it was credited, from one that counts or to one."""
+        if episode.refined_state == episode.status.state:
+            return False
+        return episode.refined_state is not None or episode.status.state in self.outcome_weights
+
+    def derive_evidence(self, episodes: list[Episode]) -> dict[str, Evidence]:
+        """
+        Evidence from the episodes that need credit: each one's new outcome weight
+        minus the weight it was credited with, so a completed episode that is
+        re-saved adds nothing and one reopened or abandoned later is taken back.
+        """
+        evidence: dict[str, Evidence] = {}
+        for episode in episodes:
+            if not self.needs_credit(episode):
+                continue
+            before = self.outcome_weights.get(episode.refined_state, 0.0)
+            after = self.outcome_weights.get(episode.status.state, 0.0)
+            weight = after - before
+            if not weight:
+                continue
+            for feature, value in episode.extracted_constraints.items():
+                if value is None:
+                    continue
+                key = preference_key(episode.category, feature, value)
+                item = evidence.get(key)
+                if item is None:
+                    item = evidence[key] = Evidence(episode.category, feature, value)
+                item.weight += weight
+                item.count += (after > 0) - (before > 0)
+                if item.last_at is None or episode.updated_at > item.last_at:
+                    item.last_at = episode.updated_at
+        return evidence
+
+    def _decay(self, pref: Preference, last_run: datetime | None, now: datetime) -> float:
+        # Decay already applied by the previous run is not applied again
+        since = max(pref.last_updated, last_run) if last_run else pref.last_updated
+        idle_days = max(0.0, (now - since).total_seconds() / 86400)
+        return pref.confidence * 0.5 ** (idle_days / self.half_life_days)
+
+    def apply(
+        self,
+        preferences: list[Preference],
+        evidence: dict[str, Evidence],
+        last_run: datetime | None,
+        now: datetime,
+    ) -> list[Preference]:
+        """Decays every preference, then applies the evidence. Returns the preferences that changed."""
+        changed = []
+        remaining = dict(evidence)
+        for pref in preferences:
+            item = remaining.pop(preference_key(pref.category, pref.feature, pref.value), None)
+            confidence = self._decay(pref, last_run, now)
+            updates: dict[str, Any] = {}
+            if item is not None:
+                confidence = reinforce(confidence, item.weight)
+                updates = {"evidence_count": max(0, pref.evidence_count + item.count), "last_updated": now}
+            if updates or confidence != pref.confidence:
+                updates["confidence"] = min(1.0, max(0.0, confidence))
+                changed.append(pref.model_copy(update=updates))
+
+        # Evidence for preferences memory does not hold yet; only a net positive outcome creates one
+        for item in remaining.values():
+            if item.weight <= 0:
+                continue
+            new = Preference(category=item.category, feature=item.feature, value=item.value, last_updated=now)
+            new.confidence = min(1.0, max(0.0, reinforce(new.confidence, item.weight - 1)))
+            new.evidence_count = max(0, item.count)
+            changed.append(new)
+        return changed
+
+    @traced("memory.refine_preferences")
+    def run(self, now: datetime | None = None, dry_run: bool = False) -> dict[str, Any]:
+        """
+        Refines preferences from the episodes changed since the last run and commits
+        the result together with the new checkpoint. With dry_run nothing is written.
+        Returns the report: checkpoint, counts, the before/after diff and phase timings in ms.
+        """
+        now = now or datetime.now()
+        timings: dict[str, float] = {}
+        started = phase = time.perf_counter()
+
+        def lap(name: str):
+            nonlocal phase
+            current = time.perf_counter()
+            timings[name] = round((current - phase) * 1000, 3)
+            phase = current
+
+        with self.service.transaction():
+            db = self.service.db
+            checkpoint = db.get("checkpoints", CHECKPOINT_ID) or {"id": CHECKPOINT_ID}
+            since = checkpoint.get("episodes_updated_at")
+            last_run = datetime.fromisoformat(checkpoint["refined_at"]) if checkpoint.get("refined_at") else None
+            episodes = db.find_models_updated_since("episodes", Episode, since)
+            preferences = db.find_models("preferences", Preference)
+            lap("read")
+
+            evidence = self.derive_evidence(episodes)
+            credited = [e for e in episodes if self.needs_credit(e)]
+            lap("derive")
+
+            changed = self.apply(preferences, evidence, last_run, now)
+            lap("apply")
+
+            if episodes:
+                since = max(e.updated_at for e in episodes).isoformat()
+            checkpoint = {"id": CHECKPOINT_ID, "episodes_updated_at": since, "refined_at": now.isoformat()}
+            if not dry_run:
+                ops = [("preferences", preference_key(p.category, p.feature, p.value), p.model_dump(mode="json")) for p in changed]
+                # updated_at is left alone, so recording the credit does not make the episode due again
+                ops += [("episodes", e.id, e.model_copy(update={"refined_state": e.status.state}).model_dump(mode="json")) for e in credited]
+                ops.append(("checkpoints", CHECKPOINT_ID, checkpoint))
+                db.write_batch(ops)
+            phase = time.perf_counter()
+        lap("commit")
+        timings["total"] = round((time.perf_counter() - started) * 1000, 3)
+
+        if not dry_run:
+            self.service.preference_cache.clear()
+
+        return {
+            "dry_run": dry_run,
+            "checkpoint": checkpoint,
+            "episodes_read": len(episodes),
+            "episodes_credited": len(credited),
+            "evidence": len(evidence),
+            "preferences_read": len(preferences),
+            "preferences_written": len(changed),
+            "diff": diff_preferences(preferences, changed, evidence),
+            "timings_ms": timings,
+        }
+
+
+def _snapshot(pref: Preference) -> dict[str, Any]:
+    return {"confidence": round(pref.confidence, 6), "evidence_count": pref.evidence_count}
+
+
+def diff_preferences(
+    before: list[Preference], changed: list[Preference], evidence: dict[str, Evidence]
+) -> dict[str, Any]:
+    """
+    Before/after view of a refinement. Preferences touched by evidence are listed as
+    added, reinforced or weakened; ones that only decayed are counted.
+    """
+    snapshot = {preference_key(p.category, p.feature, p.value): p for p in before}
+    diff: dict[str, Any] = {"added": [], "reinforced": [], "weakened": [], "decayed": 0}
+    for pref in changed:
+        key = preference_key(pref.category, pref.feature, pref.value)
+        old = snapshot.get(key)
+        entry = {"category": pref.category, "feature": pref.feature, "value": pref.value, "after": _snapshot(pref)}
+        if old is None:
+            diff["added"].append(entry)
+        elif key not in evidence:
+            diff["decayed"] += 1
+        elif abs(pref.confidence - old.confidence) > REPORT_EPSILON or pref.evidence_count != old.evidence_count:
+            entry["before"] = _snapshot(old)
+            diff["reinforced" if pref.confidence >= old.confidence else "weakened"].append(entry)
+    return diff
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refine preference memory from recent episode outcomes.")
+    parser.add_argument("path", help="Path to the memory store (memory.json or memory.db)")
+    parser.add_argument("--dry-run", action="store_true", help="Report the changes without writing them")
+    args = parser.parse_args()
+
+    from app.memory.service import MemoryService
+
+    service = MemoryService(args.path)
+    try:
+        print(json.dumps(PreferenceRefiner(service).run(dry_run=args.dry_run), indent=2, default=str))
+    finally:
+        service.db.close()
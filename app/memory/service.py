@@ -1,105 +1,437 @@
-from tinydb import TinyDB, Query
-from datetime import datetime
-from typing import List
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from typing import Any, Callable, Iterable, Iterator, List
 from app.schemas.memory import Episode, Preference, Heuristic
+from app.schemas.vendor import VendorProfile, VendorTrustSignal
+from app.memory.storage import MULTI_CATEGORY, MemoryStore, heuristic_categories, open_store, record_key
+from app.memory.unit_of_work import UnitOfWork
+from app.memory.cache import LRUCache
+from app.memory.heuristics import HeuristicIndex
+from app.memory.archive import EpisodeArchive
+from app.memory.vendors import WRITES_CHECKPOINT_ID, VendorEntry, VendorRegistry
+from app.utils.config import MEMORY_ARCHIVE_IDLE_DAYS, VENDOR_TRUST_HALF_LIFE_DAYS
+from app.utils.metrics import traced
 
 class MemoryService:
-    def __init__(self, db_path: str = "../database/memory.json"):
-        self.db = TinyDB(db_path)
-        self.episodes_table = self.db.table("episodes")
-        self.preferences_table = self.db.table("preferences")
-        self.heuristics_table = self.db.table("heuristics")
+    def __init__(
+        self,
+        db_path: str = "../database/memory.json",
+        store: MemoryStore | None = None,
+        cache_size: int = 128,
+        archive_dir: str | None = None,
+    ):
+        # The backend follows the file extension (memory.json -> TinyDB, memory.db -> SQLite).
+        # It is opened on first use so creating the service costs nothing at startup.
+        self.db_path = db_path
+        self._db = store
+        # The transaction open in the current thread/task, if any. Kept per context so
+        # other threads using this service never read or join its uncommitted writes.
+        self._unit_of_work: ContextVar[UnitOfWork | None] = ContextVar(f"memory_uow_{id(self)}", default=None)
+        # Cold episodes live here once archive_episodes() has moved them out of the store
+        self.archive = EpisodeArchive(archive_dir) if archive_dir else None
+
+        # Read-through caches keyed by the requested category
+        self.preference_cache = LRUCache(cache_size)
+        self.heuristic_cache = LRUCache(cache_size)
+        # Built on the first match_heuristics call
+        self.heuristic_index: HeuristicIndex | None = None
+        # Loaded from the "vendors" table on first use, at this many vendor writes
+        self.vendor_registry: VendorRegistry | None = None
+        self.vendor_writes = 0
+        # Set when another process wrote to the store; the registry is then checked before use
+        self.vendors_stale = False
+        # Store version the caches were filled at; another process writing invalidates them
+        self.cached_version = None
+
+    @property
+    def db(self) -> MemoryStore:
+        """The store, or the open transaction's buffer in front of it."""
+        uow = self._unit_of_work.get()
+        if uow is not None:
+            return uow
+        if self._db is None:
+            self._db = open_store(self.db_path)
+        return self._db
+
+    @db.setter
+    def db(self, store: MemoryStore):
+        self._db = store
+
+    @contextmanager
+    def transaction(self) -> Iterator["MemoryService"]:
+        """
+        Buffers every memory write made inside the block and commits them in one
+        write when it exits. Nothing is written if the block raises.
+        Other processes and threads cannot write to the store while the block runs,
+        so reads inside it stay valid until the commit. Nested calls join the outer
+        transaction. Another asyncio task on the same thread that writes meanwhile
+        gets a RuntimeError rather than interleaving with it.
+        """
+        if self._unit_of_work.get() is not None:
+            yield self
+            return
+
+        uow = UnitOfWork(self.db)
+        with uow.store.exclusive():
+            token = self._unit_of_work.set(uow)
+            try:
+                yield self
+            except BaseException:
+                uow.rollback()
+                raise
+            else:
+                self._commit(uow)
+            finally:
+                self._unit_of_work.reset(token)
+
+    @traced("memory.commit")
+    def _commit(self, uow: UnitOfWork):
+        uow.commit()
+
+    def _in_transaction(self) -> bool:
+        # Reads inside a transaction can see its uncommitted writes, so they never fill
+        # the caches other threads read from; cache updates wait for the commit instead
+        return self._unit_of_work.get() is not None
+
+    def _after_commit(self, callback: Callable[[], None]):
+        uow = self._unit_of_work.get()
+        if uow is not None:
+            uow.after_commit.append(callback)
+        else:
+            callback()
+
+    def _check_cache_version(self):
+        """Drops cached reads if another process has written to the store since they were made."""
+        version = self.db.data_version()
+        if version != self.cached_version:
+            self.preference_cache.clear()
+            self.heuristic_cache.clear()
+            self.heuristic_index = None
+            # Rebuilding the registry scans every vendor, so it waits until a vendor write shows up
+            self.vendors_stale = self.vendor_registry is not None
+            self.cached_version = version
 
     # --- Episodic Memory ---
 
+    @traced("memory.get_active_episode")
     def get_active_episode(self, category: str | None = None) -> Episode | None:
         """Finds the current active episode. Optionally filters by category."""
-        E = Query()
         if category:
-            result = self.episodes_table.get((E.status.state == "active") & (E.category == category))
+            results = self.db.find_models("episodes", Episode, limit=1, state="active", category=category)
         else:
-            result = self.episodes_table.get(E.status.state == "active")
-        
-        return Episode(**result) if result else None
+            results = self.db.find_models("episodes", Episode, limit=1, state="active")
 
+        return results[0] if results else None
+
+    @traced("memory.get_active_episode_state")
+    def get_active_episode_state(self, category: str | None = None) -> dict[str, str] | None:
+        """
+        {"id", "category", "state"} of the active episode without loading the episode itself,
+        for callers that only need to know whether (and where) one is running.
+        """
+        filters = {"category": category} if category else {}
+        results = self.db.project("episodes", ["id", "category", "state"], limit=1, state="active", **filters)
+        return results[0] if results else None
+
+    @traced("memory.create_episode")
     def create_episode(self, category: str, initial_query: str) -> Episode:
         """Creates a new episode and marks any other active episodes as paused."""
-        # Pause any existing active episode
-        self.pause_all_active_episodes()
-        
         episode = Episode(
             category=category,
             initial_query=initial_query
         )
-        self.episodes_table.insert(episode.model_dump(mode="json"))
+        with self.transaction():
+            # Pause any existing active episode
+            self.pause_all_active_episodes()
+            self.db.put("episodes", episode.model_dump(mode="json"))
         return episode
 
+    @traced("memory.get_episodes_by_category")
     def get_episodes_by_category(self, category: str) -> List[Episode]:
-        """Retrieve all episodes for a given category."""
-        E = Query()
-        results = self.episodes_table.search(E.category == category)
-        return [Episode(**r) for r in results]
-    
+        """Retrieve all episodes for a given category, archived ones first."""
+        results = self.db.find_models("episodes", Episode, category=category)
+        if self.archive is not None:
+            hot_ids = {e.id for e in results}
+            archived = [Episode.model_validate(r) for r in self.archive.get_by_category(category) if r["id"] not in hot_ids]
+            results = archived + results
+        return results
+
+    @traced("memory.get_episode_by_id")
     def get_episode_by_id(self, episode_id: str) -> Episode | None:
         """Retrieve an episode by its unique ID."""
-        E = Query()
-        result = self.episodes_table.get(E.id == episode_id)
-        return Episode(**result) if result else None
-
-    def pause_all_active_episodes(self):
-        """Pauses all currently active episodes."""
-        E = Query()
-        self.episodes_table.update(
-            {"status": {"state": "paused", "last_transition_reason": "New episode started"}},
-            E.status.state == "active"
-        )
+        episode = self.db.get_model("episodes", episode_id, Episode)
+        if episode is None and self.archive is not None:
+            result = self.archive.get(episode_id)
+            episode = Episode.model_validate(result) if result else None
+        return episode
 
+    @traced("memory.pause_all_active_episodes")
+    def pause_all_active_episodes(self, except_id: str | None = None, reason: str = "New episode started"):
+        """Pauses all currently active episodes, optionally leaving one of them active."""
+        active = [doc for doc in self.db.find("episodes", state="active") if doc["id"] != except_id]
+        if not active:
+            return
+
+        now = datetime.now().isoformat()
+        for doc in active:
+            doc["status"] = {"state": "paused", "last_transition_reason": reason}
+            doc["updated_at"] = now
+        self.db.write_batch(("episodes", doc["id"], doc) for doc in active)
+
+    @traced("memory.update_episode")
     def update_episode(self, episode: Episode):
-        E = Query()
-        episode.updated_at = datetime.now()
-        self.episodes_table.update(episode.model_dump(mode="json"), E.id == episode.id)
+        """
+        Saves the episode. A status the caller did not change since loading this copy
+        is not written back over a newer one in the store (say another worker paused
+        the episode to start a new one); the caller's other fields are saved.
+        """
+        with self.transaction():
+            # Stamped under the lock, so a refinement checkpoint taken meanwhile cannot skip it
+            episode.updated_at = datetime.now()
+            doc = episode.model_dump(mode="json")
+            stored = self.db.get("episodes", episode.id)
+            if stored is not None:
+                # Only the refinement job records what it credited; a copy loaded earlier must not undo it
+                doc["refined_state"] = stored.get("refined_state")
+                if episode.status.state == episode._saved_state and stored["status"]["state"] != episode.status.state:
+                    doc["status"] = stored["status"]
+            # Keeps a single active episode even when another worker started one meanwhile
+            if doc["status"]["state"] == "active":
+                self.pause_all_active_episodes(except_id=episode.id, reason="Another episode resumed")
+            self.db.put("episodes", doc)
+        if doc["status"] == episode.status.model_dump(mode="json"):
+            episode._saved_state = episode.status.state
+        # Updating an archived episode brings it back to the hot store
+        if self.archive is not None and episode.id in self.archive:
+            self.archive.discard(episode.id)
+
+    @traced("memory.archive_episodes")
+    def archive_episodes(self, max_idle_days: int | None = None, now: datetime | None = None) -> int:
+        """
+        Moves completed and abandoned episodes, plus paused ones idle for more than
+        max_idle_days (by last_interaction_at), from the store into the archive.
+        Closed episodes stay until preference refinement has credited their outcome
+        (see app/memory/refinement.py). Active episodes are never archived.
+        Returns the number of episodes moved.
+        """
+        if self.archive is None:
+            raise ValueError("MemoryService was created without an archive_dir")
+
+        if max_idle_days is None:
+            max_idle_days = MEMORY_ARCHIVE_IDLE_DAYS
+        cutoff = (now or datetime.now()) - timedelta(days=max_idle_days)
+
+        # One archiver at a time across processes
+        with self.transaction():
+            cold = [
+                doc for doc in self.db.find("episodes", state=["completed", "abandoned"])
+                if doc.get("refined_state") == doc["status"]["state"]
+            ]
+            cold += [
+                doc for doc in self.db.find("episodes", state="paused")
+                if datetime.fromisoformat(doc["last_interaction_at"]) < cutoff
+            ]
+            if not cold:
+                return 0
+
+            # Archive first: if the delete never lands, the hot copy simply wins on reads
+            self.archive.append(cold)
+            self.db.write_batch(("episodes", doc["id"], None) for doc in cold)
+        return len(cold)
 
     # --- Preference Memory ---
 
+    @traced("memory.upsert_preference")
     def upsert_preference(self, pref: Preference):
         """
         Updates preference if it exists (increasing confidence/evidence),
         otherwise inserts new preference.
         """
-        P = Query()
-        existing = self.preferences_table.get(
-            (P.category == pref.category) & 
-            (P.feature == pref.feature) & 
-            (P.value == pref.value)
-        )
+        doc = pref.model_dump(mode="json")
+        # Read and write under one lock so concurrent workers cannot lose an increment
+        with self.transaction():
+            existing = self.db.get("preferences", record_key("preferences", doc))
+
+            if existing:
+                # Update logic: increase evidence, bump confidence slightly
+                new_evidence_count = existing['evidence_count'] + 1
+                # Simple asymptotic confidence boost: 1 - (1-old)*0.9
+                new_confidence = min(1.0, existing['confidence'] + (1.0 - existing['confidence']) * 0.1)
+
+                existing.update({
+                    "evidence_count": new_evidence_count,
+                    "confidence": new_confidence,
+                    "last_updated": datetime.now().isoformat()
+                })
+                doc = existing
+
+            self.db.put("preferences", doc)
 
-        if existing:
-            # Update logic: increase evidence, bump confidence slightly
-            new_evidence_count = existing['evidence_count'] + 1
-            # Simple asymptotic confidence boost: 1 - (1-old)*0.9
-            new_confidence = min(1.0, existing['confidence'] + (1.0 - existing['confidence']) * 0.1)
-            
-            self.preferences_table.update({
-                "evidence_count": new_evidence_count,
-                "confidence": new_confidence,
-                "last_updated": datetime.now().isoformat()
-            }, doc_ids=[existing.doc_id])
+        # Global preferences are merged into every category's cached result
+        if pref.category == "global":
+            self._after_commit(self.preference_cache.clear)
         else:
-            self.preferences_table.insert(pref.model_dump(mode="json"))
+            self._after_commit(lambda: self.preference_cache.invalidate(pref.category))
 
+    @traced("memory.get_preferences")
     def get_preferences(self, category: str) -> List[Preference]:
-        P = Query()
-        results = self.preferences_table.search((P.category == category) | (P.category == "global"))
-        return [Preference(**r) for r in results]
+        """Preferences for a category merged with global ones. Served from cache when possible."""
+        if self._in_transaction():
+            return self.db.find_models("preferences", Preference, category=[category, "global"])
+        self._check_cache_version()
+        prefs = self.preference_cache.get(category)
+        if prefs is None:
+            prefs = self.db.find_models("preferences", Preference, category=[category, "global"])
+            self.preference_cache.set(category, prefs)
+        # Copies, so a caller changing one does not change what later hits return
+        return [p.model_copy(deep=True) for p in prefs]
 
     # --- Heuristic Memory ---
 
+    @traced("memory.get_heuristics")
     def get_heuristics(self, category: str) -> List[Heuristic]:
-        H = Query()
-        
-        results = self.heuristics_table.search(H.applicability.category == category)
-        return [Heuristic(**r) for r in results]
+        """Heuristics whose category condition is the category, or a list that includes it."""
+        def load() -> List[Heuristic]:
+            return [
+                h for h in self.db.find_models("heuristics", Heuristic, category=[category, MULTI_CATEGORY])
+                if category in heuristic_categories(h.applicability)
+            ]
 
+        if self._in_transaction():
+            return load()
+        self._check_cache_version()
+        heuristics = self.heuristic_cache.get(category)
+        if heuristics is None:
+            heuristics = load()
+            self.heuristic_cache.set(category, heuristics)
+        return [h.model_copy(deep=True) for h in heuristics]
+
+    @traced("memory.add_heuristic")
     def add_heuristic(self, heuristic: Heuristic):
         """Seed heuristics (usually manual or system-level)"""
-        self.heuristics_table.insert(heuristic.model_dump(mode="json"))
+        self.db.put("heuristics", heuristic.model_dump(mode="json"))
+        stored = heuristic.model_copy(deep=True)
+
+        def publish():
+            for category in heuristic_categories(stored.applicability):
+                self.heuristic_cache.invalidate(category)
+            if self.heuristic_index is not None:
+                self.heuristic_index.add(stored)
+
+        self._after_commit(publish)
+
+    def _get_heuristic_index(self) -> HeuristicIndex:
+        if self._in_transaction():
+            return HeuristicIndex(self.db.find_models("heuristics", Heuristic))
+        self._check_cache_version()
+        if self.heuristic_index is None:
+            self.heuristic_index = HeuristicIndex(self.db.find_models("heuristics", Heuristic))
+        return self.heuristic_index
+
+    @traced("memory.match_heuristics")
+    def match_heuristics(self, context: dict[str, Any]) -> List[Heuristic]:
+        """
+        Heuristics whose applicability conditions all hold for the context,
+        e.g. {"category": "electronics", "price": 450000, "platform": "Jumia", "location": "Lagos"}.
+        """
+        return [h.model_copy(deep=True) for h in self._get_heuristic_index().match(context)]
+
+    @traced("memory.match_heuristics_batch")
+    def match_heuristics_batch(self, contexts: Iterable[dict[str, Any]]) -> List[List[Heuristic]]:
+        """match_heuristics for many contexts at once, e.g. one per product being ranked."""
+        return [[h.model_copy(deep=True) for h in matched] for matched in self._get_heuristic_index().match_many(contexts)]
+
+    def cache_stats(self) -> dict[str, dict[str, int]]:
+        return {
+            "preferences": self.preference_cache.stats(),
+            "heuristics": self.heuristic_cache.stats(),
+        }
+
+    # --- Vendor Memory ---
+
+    def _count_vendor_writes(self) -> int:
+        checkpoint = self.db.get("checkpoints", WRITES_CHECKPOINT_ID)
+        return checkpoint["writes"] if checkpoint else 0
+
+    def _load_vendor_registry(self) -> VendorRegistry:
+        registry = VendorRegistry(half_life_days=VENDOR_TRUST_HALF_LIFE_DAYS)
+        for doc in self.db.find("vendors"):
+            registry.load_doc(doc)
+        return registry
+
+    def _get_vendor_registry(self) -> VendorRegistry:
+        if self._in_transaction():
+            return self._load_vendor_registry()
+        self._check_cache_version()
+        if self.vendors_stale:
+            if self._count_vendor_writes() != self.vendor_writes:
+                self.vendor_registry = None
+            self.vendors_stale = False
+        if self.vendor_registry is None:
+            self.vendor_writes = self._count_vendor_writes()
+            self.vendor_registry = self._load_vendor_registry()
+        return self.vendor_registry
+
+    def _update_vendor(self, name: str, platform: str, change: Callable[[VendorRegistry], VendorEntry]) -> VendorProfile:
+        """
+        Applies `change` to the stored vendor and saves it with a bumped write count. The
+        shared registry takes the new record only after the commit.
+        """
+        with self.transaction():
+            key = record_key("vendors", {"name": name, "platform": platform})
+            scratch = VendorRegistry(half_life_days=VENDOR_TRUST_HALF_LIFE_DAYS)
+            stored = self.db.get("vendors", key)
+            if stored is not None:
+                scratch.load_doc(stored)
+            entry = change(scratch)
+            doc = scratch.to_doc(name, platform)
+            writes = self._count_vendor_writes() + 1
+            self.db.write_batch([
+                ("vendors", key, doc),
+                ("checkpoints", WRITES_CHECKPOINT_ID, {"id": WRITES_CHECKPOINT_ID, "writes": writes}),
+            ])
+
+            def publish():
+                # Up to date apart from this write: take it in. Otherwise reload on next use.
+                if self.vendor_registry is not None and self.vendor_writes == writes - 1:
+                    self.vendor_registry.discard(name, platform)
+                    self.vendor_registry.load_doc(doc)
+                    self.vendor_writes = writes
+                else:
+                    self.vendor_registry = None
+
+            self._after_commit(publish)
+        return scratch.profile(entry, datetime.now())
+
+    @traced("memory.record_vendor_signal")
+    def record_vendor_signal(
+        self, name: str, platform: str, signal: VendorTrustSignal, locations: Iterable[str] = ()
+    ) -> VendorProfile:
+        """Adds a trust signal (e.g. a late delivery) to the vendor, creating it if unseen."""
+        return self._update_vendor(name, platform, lambda registry: registry.observe(name, platform, signal, locations))
+
+    @traced("memory.upsert_vendor")
+    def upsert_vendor(self, profile: VendorProfile) -> VendorProfile:
+        """Merges a vendor profile into memory; its observations count as new trust signals."""
+        return self._update_vendor(profile.name, profile.platform, lambda registry: registry.upsert(profile))
+
+    @traced("memory.get_vendor")
+    def get_vendor(self, name: str, platform: str, now: datetime | None = None) -> VendorProfile | None:
+        """The vendor with its trust score decayed to `now` (the present by default)."""
+        return self._get_vendor_registry().get(name, platform, now or datetime.now())
+
+    @traced("memory.find_vendors")
+    def find_vendors(
+        self,
+        location: str | None = None,
+        platform: str | None = None,
+        min_trust: float | None = None,
+        now: datetime | None = None,
+    ) -> List[VendorProfile]:
+        """
+        Vendors matching every given filter, most trusted first, e.g.
+        find_vendors(location="Abuja", min_trust=0.7). Scores are decayed to `now`, the
+        present by default, so vendors known only from old signals drift back to neutral.
+        """
+        return self._get_vendor_registry().find(location, platform, min_trust, now or datetime.now())
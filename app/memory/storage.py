@@ -0,0 +1,448 @@
+import argparse
+import json
+import os
+import sqlite3
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Iterable, Iterator, TypeVar
+
+from pydantic import BaseModel
+from tinydb import TinyDB, Query
+from tinydb.middlewares import CachingMiddleware
+
+from app.memory import codec
+from app.memory.locking import FileLock
+from app.utils.metrics import telemetry
+
+TABLES = ("episodes", "preferences", "heuristics", "vendors", "checkpoints")
+SQLITE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+
+# A write operation is (table, key, doc). A doc of None deletes the record.
+WriteOp = tuple[str, str, dict | None]
+Model = TypeVar("Model", bound=BaseModel)
+
+
+def canonical_value(value: Any) -> str:
+    """Stable JSON encoding used to compare free-form preference values."""
+    return json.dumps(value, sort_keys=True, separators=(",", ":"))
+
+
+def preference_key(category: str, feature: str, value: Any) -> str:
+    return canonical_value([category, feature, value])
+
+
+def record_key(table: str, doc: dict) -> str:
+    """Primary key of a stored record. Preferences are keyed by (category, feature, value), vendors by (name, platform)."""
+    if table == "preferences":
+        return preference_key(doc["category"], doc["feature"], doc["value"])
+    if table == "vendors":
+        return canonical_value([doc["name"], doc["platform"]])
+    return doc["id"]
+
+
+# Indexed category of heuristics that apply to several categories ({"category": ["tv", "phones"]})
+MULTI_CATEGORY = "*"
+
+
+def heuristic_categories(applicability: dict[str, Any]) -> list[Any]:
+    """The categories a heuristic applies to. Range or missing conditions name none."""
+    category = applicability.get("category")
+    if isinstance(category, (list, tuple, set)):
+        return list(category)
+    if category is None or isinstance(category, dict):
+        return []
+    return [category]
+
+
+def heuristic_category(applicability: dict[str, Any]) -> Any:
+    """The scalar stored in the heuristics category index: the category itself, or MULTI_CATEGORY."""
+    category = applicability.get("category")
+    if isinstance(category, (list, tuple, set, dict)):
+        return MULTI_CATEGORY
+    return category
+
+
+def index_fields(table: str, doc: dict) -> dict[str, Any]:
+    """The fields a table can be filtered on, extracted from a stored record."""
+    if table == "episodes":
+        return {
+            "id": doc["id"],
+            "category": doc["category"],
+            "state": doc["status"]["state"],
+            "updated_at": doc["updated_at"],
+        }
+    if table == "preferences":
+        return {"category": doc["category"], "feature": doc["feature"], "value": canonical_value(doc["value"])}
+    if table == "vendors":
+        # Vendors are looked up by key; location/platform filtering lives in VendorRegistry
+        return {}
+    if table == "checkpoints":
+        return {"id": doc["id"]}
+    return {"id": doc["id"], "category": heuristic_category(doc.get("applicability", {}))}
+
+
+def matches(table: str, doc: dict, filters: dict[str, Any]) -> bool:
+    """Evaluates find() filters against a record in Python. Lists/tuples/sets mean "one of"."""
+    fields = index_fields(table, doc)
+    for name, expected in filters.items():
+        if isinstance(expected, (list, tuple, set)):
+            if fields[name] not in expected:
+                return False
+        elif fields[name] != expected:
+            return False
+    return True
+
+
+class MemoryStore(ABC):
+    """
+    Storage backend behind MemoryService.
+
+    Records are the JSON dumps of the memory schemas, addressed by (table, key)
+    and filterable on the fields returned by index_fields().
+    """
+
+    @abstractmethod
+    def get(self, table: str, key: str) -> dict | None:
+        ...
+
+    @abstractmethod
+    def find(self, table: str, limit: int | None = None, **filters) -> list[dict]:
+        """Records matching all filters, in insertion order."""
+        ...
+
+    @abstractmethod
+    def write_batch(self, ops: Iterable[WriteOp]) -> None:
+        """Applies inserts/replacements/deletes as a single write."""
+        ...
+
+    def get_model(self, table: str, key: str, model: type[Model]) -> Model | None:
+        """get() decoded into a schema model. Backends may skip the intermediate dict."""
+        doc = self.get(table, key)
+        return model.model_validate(doc) if doc is not None else None
+
+    def find_models(self, table: str, model: type[Model], limit: int | None = None, **filters) -> list[Model]:
+        """find() decoded into schema models. Backends may skip the intermediate dicts."""
+        return [model.model_validate(doc) for doc in self.find(table, limit=limit, **filters)]
+
+    def project(self, table: str, fields: Iterable[str], limit: int | None = None, **filters) -> list[dict[str, Any]]:
+        """
+        Only the given index_fields() of each matching record, e.g. project("episodes", ["id", "state"]).
+        Backends that store index fields separately answer without decoding documents.
+        """
+        fields = list(fields)
+        projected = []
+        for doc in self.find(table, limit=limit, **filters):
+            values = index_fields(table, doc)
+            projected.append({name: values.get(name) for name in fields})
+        return projected
+
+    def find_models_updated_since(
+        self, table: str, model: type[Model], since: str | None, **filters
+    ) -> list[Model]:
+        """
+        find_models() limited to records whose "updated_at" index field is later than
+        `since` (an ISO timestamp; None means every record). Backends with an index on
+        it only read the changed records.
+        """
+        docs = self.find(table, **filters)
+        if since is not None:
+            docs = [doc for doc in docs if index_fields(table, doc)["updated_at"] > since]
+        return [model.model_validate(doc) for doc in docs]
+
+    @contextmanager
+    def exclusive(self) -> Iterator[None]:
+        """
+        Holds off writers in other processes and threads for the duration of the
+        block, so a read-modify-write inside it cannot lose a concurrent update.
+        Re-entrant within the holding thread or task; see FileLock.
+        """
+        yield
+
+    def data_version(self) -> Any:
+        """Changes whenever another process has written to the store. None if that cannot happen."""
+        return None
+
+    def put(self, table: str, doc: dict):
+        self.write_batch([(table, record_key(table, doc), doc)])
+
+    def delete(self, table: str, key: str):
+        self.write_batch([(table, key, None)])
+
+    def close(self):
+        pass
+
+
+class TinyDBStore(MemoryStore):
+    """
+    The original single JSON file store. Lookups are full table scans.
+
+    Several processes can share the file: writes hold an exclusive file lock
+    and start from the latest file contents, and each process reloads its
+    in-memory copy when the lock file's write counter shows another process
+    has written since.
+    """
+
+    def __init__(self, path: str):
+        # The caching middleware lets a batch of writes land in one file rewrite.
+        self.db = TinyDB(path, storage=CachingMiddleware(codec.FastJSONStorage))
+        self.tables = {name: self.db.table(name) for name in TABLES}
+        self.lock = FileLock(str(path) + ".lock")
+        # Write counter our in-memory copy reflects, and how often it was reloaded
+        self.version = self.lock.version()
+        self.reloads = 0
+
+    def _drop_cache(self):
+        self.db.storage.cache = None
+        for t in self.tables.values():
+            t.clear_cache()
+            # TinyDB caches the next document id per table
+            t._next_id = None
+
+    def _refresh(self):
+        if self.lock.version() == self.version:
+            return
+        with self.lock.shared():
+            self._drop_cache()
+            self.db.storage.read()
+            self.version = self.lock.version()
+        self.reloads += 1
+
+    @contextmanager
+    def exclusive(self) -> Iterator[None]:
+        with self.lock.exclusive():
+            self._refresh()
+            yield
+
+    def data_version(self) -> int:
+        self._refresh()
+        return self.reloads
+
+    def _condition(self, table: str, filters: dict[str, Any]):
+        q = Query()
+        condition = None
+        for name, expected in filters.items():
+            if name == "state":
+                field = q.status.state
+            elif name == "category" and table == "heuristics":
+                # Compared through the same index value the other backends store
+                allowed = list(expected) if isinstance(expected, (list, tuple, set)) else [expected]
+                part = q.applicability.test(lambda applicability, allowed=allowed: heuristic_category(applicability) in allowed)
+                condition = part if condition is None else condition & part
+                continue
+            else:
+                field = q[name]
+
+            if isinstance(expected, (list, tuple, set)):
+                part = field.one_of(list(expected))
+            else:
+                part = field == expected
+            condition = part if condition is None else condition & part
+        return condition
+
+    def _key_condition(self, table: str, key: str):
+        if table == "preferences":
+            category, feature, value = json.loads(key)
+            return self._condition(table, {"category": category, "feature": feature, "value": value})
+        if table == "vendors":
+            name, platform = json.loads(key)
+            return self._condition(table, {"name": name, "platform": platform})
+        return self._condition(table, {"id": key})
+
+    def get(self, table: str, key: str) -> dict | None:
+        self._refresh()
+        result = self.tables[table].get(self._key_condition(table, key))
+        # Every lookup is a full table scan
+        telemetry.note(records_scanned=len(self.tables[table]))
+        return dict(result) if result else None
+
+    def find(self, table: str, limit: int | None = None, **filters) -> list[dict]:
+        self._refresh()
+        if filters:
+            results = self.tables[table].search(self._condition(table, filters))
+        else:
+            results = self.tables[table].all()
+        telemetry.note(records_scanned=len(self.tables[table]))
+        return [dict(r) for r in results[:limit]]
+
+    def write_batch(self, ops: Iterable[WriteOp]) -> None:
+        with self.exclusive():
+            try:
+                for table, key, doc in ops:
+                    condition = self._key_condition(table, key)
+                    if doc is None:
+                        self.tables[table].remove(condition)
+                    else:
+                        self.tables[table].upsert(doc, condition)
+                self.db.storage.flush()
+            except Exception:
+                # Drop the half-applied in-memory state; the next read reloads the file.
+                self._drop_cache()
+                raise
+            self.version = self.lock.bump_version()
+
+    def close(self):
+        self.db.close()
+        self.lock.close()
+
+
+class SQLiteStore(MemoryStore):
+    """
+    Indexed store. Each table keeps the JSON document next to its key and
+    index fields, so point lookups and upserts do not depend on history size.
+    """
+
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # SQLite serialises individual writes itself; this lock covers read-modify-write sections
+        self.lock = FileLock(str(path) + ".lock")
+        with self.conn:
+            for table in TABLES:
+                self.conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {table} ("
+                    "key TEXT PRIMARY KEY, id TEXT, category TEXT, state TEXT, "
+                    "feature TEXT, value TEXT, updated_at TEXT, doc TEXT NOT NULL)"
+                )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS ix_episodes_category ON episodes (category)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS ix_episodes_state ON episodes (state)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS ix_episodes_updated_at ON episodes (updated_at)")
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_preferences_key ON preferences (category, feature, value)"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS ix_heuristics_category ON heuristics (category)")
+
+    def get(self, table: str, key: str) -> dict | None:
+        row = self.conn.execute(f"SELECT doc FROM {table} WHERE key = ?", (key,)).fetchone()
+        telemetry.note(records_scanned=row is not None)
+        return codec.loads(row[0]) if row else None
+
+    def get_model(self, table: str, key: str, model: type[Model]) -> Model | None:
+        row = self.conn.execute(f"SELECT doc FROM {table} WHERE key = ?", (key,)).fetchone()
+        telemetry.note(records_scanned=row is not None)
+        return model.model_validate_json(row[0]) if row else None
+
+    def _select(
+        self, table: str, columns: str, limit: int | None, filters: dict[str, Any], since: str | None = None
+    ) -> sqlite3.Cursor:
+        clauses, params = [], []
+        if since is not None:
+            clauses.append("updated_at > ?")
+            params.append(since)
+        for name, expected in filters.items():
+            if isinstance(expected, (list, tuple, set)):
+                expected = list(expected)
+                clauses.append(f"{name} IN ({', '.join('?' * len(expected))})")
+                params.extend(expected)
+            else:
+                clauses.append(f"{name} = ?")
+                params.append(expected)
+
+        sql = f"SELECT {columns} FROM {table}"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY rowid"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return self.conn.execute(sql, params)
+
+    def find(self, table: str, limit: int | None = None, **filters) -> list[dict]:
+        docs = [codec.loads(doc) for doc, in self._select(table, "doc", limit, filters)]
+        # Filters are answered from indexes, so only returned rows are read
+        telemetry.note(records_scanned=len(docs))
+        return docs
+
+    def find_models(self, table: str, model: type[Model], limit: int | None = None, **filters) -> list[Model]:
+        # pydantic-core parses the stored JSON straight into the model
+        models = [model.model_validate_json(doc) for doc, in self._select(table, "doc", limit, filters)]
+        telemetry.note(records_scanned=len(models))
+        return models
+
+    def find_models_updated_since(
+        self, table: str, model: type[Model], since: str | None, **filters
+    ) -> list[Model]:
+        models = [model.model_validate_json(doc) for doc, in self._select(table, "doc", None, filters, since)]
+        telemetry.note(records_scanned=len(models))
+        return models
+
+    def project(self, table: str, fields: Iterable[str], limit: int | None = None, **filters) -> list[dict[str, Any]]:
+        fields = list(fields)
+        rows = [dict(zip(fields, row)) for row in self._select(table, ", ".join(fields), limit, filters)]
+        telemetry.note(records_scanned=len(rows))
+        return rows
+
+    def write_batch(self, ops: Iterable[WriteOp]) -> None:
+        written = 0
+        with self.conn:
+            for table, key, doc in ops:
+                if doc is None:
+                    self.conn.execute(f"DELETE FROM {table} WHERE key = ?", (key,))
+                    continue
+                fields = index_fields(table, doc)
+                encoded = codec.dumps(doc)
+                written += len(encoded)
+                self.conn.execute(
+                    f"INSERT INTO {table} (key, id, category, state, feature, value, updated_at, doc) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET id = excluded.id, category = excluded.category, "
+                    "state = excluded.state, feature = excluded.feature, value = excluded.value, "
+                    "updated_at = excluded.updated_at, doc = excluded.doc",
+                    (
+                        key,
+                        fields.get("id"),
+                        fields.get("category"),
+                        fields.get("state"),
+                        fields.get("feature"),
+                        fields.get("value"),
+                        fields.get("updated_at"),
+                        encoded,
+                    ),
+                )
+        telemetry.note(bytes_written=written)
+
+    @contextmanager
+    def exclusive(self) -> Iterator[None]:
+        with self.lock.exclusive():
+            yield
+
+    def data_version(self) -> int:
+        # Changes only when another connection commits
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+        self.lock.close()
+
+
+def open_store(path: str) -> MemoryStore:
+    """Picks the backend from the file extension: .db/.sqlite -> SQLite, anything else -> TinyDB."""
+    if str(path).endswith(SQLITE_SUFFIXES):
+        return SQLiteStore(path)
+    return TinyDBStore(path)
+
+
+def migrate_tinydb_to_sqlite(source_path: str, target_path: str) -> dict[str, int]:
+    """Copies every record from a TinyDB memory file into a SQLite store. Returns counts per table."""
+    if not os.path.exists(source_path):
+        raise FileNotFoundError(source_path)
+
+    source = TinyDBStore(source_path)
+    target = SQLiteStore(target_path)
+    counts = {}
+    try:
+        for table in TABLES:
+            docs = source.find(table)
+            target.write_batch((table, record_key(table, doc), doc) for doc in docs)
+            counts[table] = len(docs)
+    finally:
+        source.close()
+        target.close()
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate a TinyDB memory file to the SQLite backend.")
+    parser.add_argument("source", help="Path to the TinyDB memory.json")
+    parser.add_argument("target", help="Path to the SQLite database to create or fill")
+    args = parser.parse_args()
+    print(migrate_tinydb_to_sqlite(args.source, args.target))
@@ -0,0 +1,66 @@
+import copy
+from typing import Any, Callable, Iterable
+
+from app.memory.storage import MemoryStore, WriteOp, matches, record_key
+
+
+class UnitOfWork(MemoryStore):
+    """
+    Buffers writes in front of another store and applies them with a single
+    write_batch() on commit. Repeated writes to the same record are coalesced,
+    and reads see the buffered state (read-your-writes).
+    """
+
+    def __init__(self, store: MemoryStore):
+        self.store = store
+        self.pending: dict[tuple[str, str], dict | None] = {}
+        # Run once the writes have landed, e.g. to invalidate caches other threads read
+        self.after_commit: list[Callable[[], None]] = []
+
+    def get(self, table: str, key: str) -> dict | None:
+        if (table, key) in self.pending:
+            return copy.deepcopy(self.pending[(table, key)])
+        return self.store.get(table, key)
+
+    def find(self, table: str, limit: int | None = None, **filters) -> list[dict]:
+        buffered = {key: doc for (t, key), doc in self.pending.items() if t == table}
+        if not buffered:
+            return self.store.find(table, limit=limit, **filters)
+
+        results = []
+        for doc in self.store.find(table, **filters):
+            key = record_key(table, doc)
+            if key in buffered:
+                doc = buffered.pop(key)
+                if doc is None or not matches(table, doc, filters):
+                    continue
+                doc = copy.deepcopy(doc)
+            results.append(doc)
+
+        # Buffered records the store has not seen yet (or that only match after the change)
+        for doc in buffered.values():
+            if doc is not None and matches(table, doc, filters):
+                results.append(copy.deepcopy(doc))
+        return results[:limit]
+
+    def write_batch(self, ops: Iterable[WriteOp]) -> None:
+        for table, key, doc in ops:
+            self.pending[(table, key)] = doc
+
+    def exclusive(self):
+        return self.store.exclusive()
+
+    def data_version(self) -> Any:
+        return self.store.data_version()
+
+    def commit(self):
+        if self.pending:
+            self.store.write_batch([(table, key, doc) for (table, key), doc in self.pending.items()])
+        self.pending.clear()
+        callbacks, self.after_commit = self.after_commit, []
+        for callback in callbacks:
+            callback()
+
+    def rollback(self):
+        self.pending.clear()
+        self.after_commit.clear()
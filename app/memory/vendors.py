@@ -0,0 +1,203 @@
+from collections import deque
+from datetime import datetime
+from typing import Iterable
+
+from app.schemas.vendor import VendorProfile, VendorTrustSignal
+
+NEUTRAL_TRUST = 0.5
+# How many signals' worth of weight the neutral prior carries
+PRIOR_WEIGHT = 1.0
+# "checkpoints" record counting writes to the vendors table, so readers in other
+# processes can tell whether a write touched vendors before rescanning them
+WRITES_CHECKPOINT_ID = "vendor_writes"
+
+
+def vendor_key(name: str, platform: str) -> tuple[str, str]:
+    return name.strip().casefold(), platform.strip().casefold()
+
+
+def local_time(moment: datetime) -> datetime:
+    """Naive local time, the convention of the schemas' datetime.now() defaults."""
+    return moment.astimezone().replace(tzinfo=None) if moment.tzinfo is not None else moment
+
+
+class TrustAggregate:
+    """
+    Exponentially time-decayed mean of trust signals, updated in O(1).
+
+    Each signal's weight halves every `half_life` seconds. The running sums are
+    kept relative to `as_of`, the newest signal time, so adding a signal never
+    revisits older ones. With little or old evidence the score drifts back
+    towards neutral.
+    """
+
+    __slots__ = ("weighted_score", "weight", "as_of")
+
+    def __init__(self, weighted_score: float = 0.0, weight: float = 0.0, as_of: float | None = None):
+        self.weighted_score = weighted_score
+        self.weight = weight
+        self.as_of = as_of
+
+    def add(self, score: float, at: float, half_life: float):
+        if self.as_of is None or at >= self.as_of:
+            decay = 0.5 ** ((at - self.as_of) / half_life) if self.as_of is not None else 1.0
+            self.weighted_score = self.weighted_score * decay + score
+            self.weight = self.weight * decay + 1.0
+            self.as_of = at
+        else:
+            # A late, older signal counts for what it would be worth today
+            age_weight = 0.5 ** ((self.as_of - at) / half_life)
+            self.weighted_score += score * age_weight
+            self.weight += age_weight
+
+    def value(self, now: float | None, half_life: float) -> float:
+        if self.as_of is None:
+            return NEUTRAL_TRUST
+        decay = 0.5 ** (max(0.0, now - self.as_of) / half_life) if now is not None else 1.0
+        score = (self.weighted_score * decay + NEUTRAL_TRUST * PRIOR_WEIGHT) / (self.weight * decay + PRIOR_WEIGHT)
+        return min(1.0, max(0.0, score))
+
+    def to_dict(self) -> dict:
+        return {"weighted_score": self.weighted_score, "weight": self.weight, "as_of": self.as_of}
+
+
+class VendorEntry:
+    """A vendor's profile (without observations), its trust aggregate and its latest observations."""
+
+    __slots__ = ("profile", "trust", "observations")
+
+    def __init__(self, profile: VendorProfile, max_observations: int):
+        self.profile = profile.model_copy(update={"observations": [], "operating_locations": set(profile.operating_locations)})
+        self.trust = TrustAggregate()
+        self.observations: deque[VendorTrustSignal] = deque(maxlen=max_observations)
+
+
+class VendorRegistry:
+    """
+    Vendors keyed by (name, platform), case-insensitively.
+
+    trust_score is maintained incrementally from each VendorTrustSignal (see
+    TrustAggregate); only the newest `max_observations` raw signals are kept.
+    Vendors are indexed by operating location and platform, so
+    find(location="Abuja", min_trust=0.7) touches only Abuja's vendors.
+    """
+
+    def __init__(self, half_life_days: float = 90.0, max_observations: int = 50):
+        self.half_life = half_life_days * 86400
+        self.max_observations = max_observations
+        self.entries: dict[tuple[str, str], VendorEntry] = {}
+        self.by_location: dict[str, set[tuple[str, str]]] = {}
+        self.by_platform: dict[str, set[tuple[str, str]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, key: tuple[str, str]) -> bool:
+        return vendor_key(*key) in self.entries
+
+    def _entry(self, name: str, platform: str) -> VendorEntry:
+        key = vendor_key(name, platform)
+        entry = self.entries.get(key)
+        if entry is None:
+            # last_seen only moves forward from here, to the newest signal or profile seen
+            profile = VendorProfile(name=name, platform=platform, last_seen=datetime.min)
+            entry = self.entries[key] = VendorEntry(profile, self.max_observations)
+            self.by_platform.setdefault(key[1], set()).add(key)
+        return entry
+
+    def discard(self, name: str, platform: str):
+        key = vendor_key(name, platform)
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        self.by_platform[key[1]].discard(key)
+        for location in entry.profile.operating_locations:
+            self.by_location[location.strip().casefold()].discard(key)
+
+    def _index_locations(self, entry: VendorEntry, locations: Iterable[str]):
+        key = vendor_key(entry.profile.name, entry.profile.platform)
+        for location in locations:
+            entry.profile.operating_locations.add(location)
+            self.by_location.setdefault(location.strip().casefold(), set()).add(key)
+
+    def observe(self, name: str, platform: str, signal: VendorTrustSignal, locations: Iterable[str] = ()) -> VendorEntry:
+        """Records one trust signal (and any locations it revealed) for the vendor."""
+        entry = self._entry(name, platform)
+        entry.trust.add(signal.score, signal.timestamp.timestamp(), self.half_life)
+        entry.observations.append(signal)
+        entry.profile.last_seen = max(entry.profile.last_seen, local_time(signal.timestamp))
+        self._index_locations(entry, locations)
+        return entry
+
+    def upsert(self, profile: VendorProfile) -> VendorEntry:
+        """Merges a profile: locations are added, known details overwrite unknown ones, observations are recorded."""
+        entry = self._entry(profile.name, profile.platform)
+        updates = {"last_seen": max(entry.profile.last_seen, local_time(profile.last_seen))}
+        if profile.domain_url:
+            updates["domain_url"] = profile.domain_url
+        if profile.delivery_reliability != "unknown":
+            updates["delivery_reliability"] = profile.delivery_reliability
+        for field, value in updates.items():
+            setattr(entry.profile, field, value)
+
+        self._index_locations(entry, profile.operating_locations)
+        for signal in profile.observations:
+            self.observe(profile.name, profile.platform, signal)
+        return entry
+
+    def trust_score(self, name: str, platform: str, now: datetime | None = None) -> float:
+        entry = self.entries.get(vendor_key(name, platform))
+        if entry is None:
+            return NEUTRAL_TRUST
+        return entry.trust.value(now.timestamp() if now else None, self.half_life)
+
+    def profile(self, entry: VendorEntry, now: datetime | None = None) -> VendorProfile:
+        return entry.profile.model_copy(update={
+            "trust_score": entry.trust.value(now.timestamp() if now else None, self.half_life),
+            "observations": list(entry.observations),
+            "operating_locations": set(entry.profile.operating_locations),
+        })
+
+    def get(self, name: str, platform: str, now: datetime | None = None) -> VendorProfile | None:
+        entry = self.entries.get(vendor_key(name, platform))
+        return self.profile(entry, now) if entry else None
+
+    def find(
+        self,
+        location: str | None = None,
+        platform: str | None = None,
+        min_trust: float | None = None,
+        now: datetime | None = None,
+    ) -> list[VendorProfile]:
+        """Vendors matching every given filter, most trusted first. Scores decay to `now` when given."""
+        keys: set[tuple[str, str]] | None = None
+        for index, value in ((self.by_location, location), (self.by_platform, platform)):
+            if value is None:
+                continue
+            matched = index.get(value.strip().casefold(), set())
+            keys = matched if keys is None else keys & matched
+        if keys is None:
+            keys = set(self.entries)
+
+        profiles = [self.profile(self.entries[key], now) for key in keys]
+        if min_trust is not None:
+            profiles = [p for p in profiles if p.trust_score >= min_trust]
+        profiles.sort(key=lambda p: (-p.trust_score, p.name.casefold(), p.platform.casefold()))
+        return profiles
+
+    # --- Persistence as "vendors" memory records ---
+
+    def to_doc(self, name: str, platform: str) -> dict:
+        entry = self.entries[vendor_key(name, platform)]
+        doc = self.profile(entry).model_dump(mode="json")
+        doc["operating_locations"] = sorted(doc["operating_locations"])
+        doc["trust_aggregate"] = entry.trust.to_dict()
+        return doc
+
+    def load_doc(self, doc: dict) -> VendorEntry:
+        """Restores a vendor from to_doc() output."""
+        profile = VendorProfile.model_validate(doc)
+        entry = self.upsert(profile.model_copy(update={"observations": []}))
+        entry.trust = TrustAggregate(**doc["trust_aggregate"])
+        entry.observations.extend(profile.observations)
+        return entry
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 from typing import Literal, Any
 from datetime import datetime
 import uuid
@@ -19,12 +19,22 @@ class Episode(BaseModel):
     # References
     product_ids: list[int] = Field(default_factory=list, description="IDs of products explored in this episode")
     comparison_id: str | None = Field(None, description="Link to the ProductComparison schema if one was generated")
+
+    # Set by the preference refinement job only
+    refined_state: str | None = Field(None, description="Status whose outcome preference refinement last credited")
     
     # Temporal Data
     created_at: datetime = Field(default_factory=datetime.now)
     updated_at: datetime = Field(default_factory=datetime.now)
     last_interaction_at: datetime = Field(default_factory=datetime.now)
 
+    # Status as last loaded from or saved to memory. MemoryService.update_episode compares
+    # against it to tell a deliberate status change from a copy that is merely out of date.
+    _saved_state: str | None = PrivateAttr(None)
+
+    def model_post_init(self, __context: Any) -> None:
+        self._saved_state = self.status.state
+
 class Preference(BaseModel):
     category: str = Field(..., description="The category this preference applies to (or 'global')")
     feature: str = Field(..., description="The specific attribute (e.g., 'brand', 'warranty_length', 'vendor_reliability')")
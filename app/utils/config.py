@@ -0,0 +1,14 @@
+import os
+
+# Paused episodes untouched for this many days are moved to the episode archive
+MEMORY_ARCHIVE_IDLE_DAYS = int(os.getenv("MEMORY_ARCHIVE_IDLE_DAYS", "30"))
+
+# Preferences no episode has reinforced lose half their confidence after this many days (see app/memory/refinement.py)
+PREFERENCE_CONFIDENCE_HALF_LIFE_DAYS = float(os.getenv("PREFERENCE_CONFIDENCE_HALF_LIFE_DAYS", "180"))
+
+# Vendor trust signals lose half their weight after this many days (see app/memory/vendors.py)
+VENDOR_TRUST_HALF_LIFE_DAYS = float(os.getenv("VENDOR_TRUST_HALF_LIFE_DAYS", "90"))
+
+# Span timing and counters for memory and agent calls (see app/utils/metrics.py)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "0").lower() in ("1", "true", "yes")
+METRICS_SAMPLE_RATE = float(os.getenv("METRICS_SAMPLE_RATE", "1.0"))
@@ -1,8 +1,6 @@
 from datetime import datetime, timezone
 import json
-from utils.logger import setup_logger
-
-logger = setup_logger("error_utils")
+from app.utils.logger import setup_logger
 
 
 class AppError(Exception):
@@ -41,8 +39,8 @@ def format_error(source: str, error: Exception | str, data: dict | None = None,
     """
     app_error = AppError(source, error, data)
 
-    # Always log the dict form
-    logger.error(json.dumps(app_error.to_dict()))
+    # Always log the dict form. The logger is set up on the first error, not at import.
+    setup_logger("error_utils").error(json.dumps(app_error.to_dict()))
 
     if raise_exc:
         raise app_error
@@ -2,7 +2,6 @@
 import logging
 from logging.handlers import RotatingFileHandler
 import os
-from rich.logging import RichHandler
 
 ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 LOGS_DIR = os.path.join(ROOT_DIR, "logs")
@@ -14,13 +13,17 @@ def setup_logger(name: str, level=logging.DEBUG) -> logging.Logger:
     logger.setLevel(level)
 
     if not logger.handlers:
+        # Rich is only needed once a logger is actually set up
+        from rich.logging import RichHandler
+
         os.makedirs(LOGS_DIR, exist_ok=True)
 
-        # File handler (single log file)
+        # File handler (single log file), opened on the first record
         file_handler = RotatingFileHandler(
             LOG_FILE_PATH,
             maxBytes=5 * 1024 * 1024,
-            backupCount=3         
+            backupCount=3,
+            delay=True,
         )
         file_handler.setLevel(level)
         file_formatter = logging.Formatter(
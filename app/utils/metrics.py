@@ -0,0 +1,267 @@
+"""
+Span timing and counters for memory and agent hot paths.
+
+Disabled by default (METRICS_ENABLED=1 turns it on). When disabled, a traced
+call costs one attribute check. When enabled, every traced call is counted;
+a sampled share of root spans (METRICS_SAMPLE_RATE) and everything nested
+under them is also timed, charged with the records it scanned and bytes it
+wrote, and aggregated per operation, per episode and per turn.
+
+    with telemetry.bind(episode_id=episode.id, turn_id=invocation_id):
+        service.get_preferences("Monitors")
+    telemetry.export_prometheus("logs/metrics.prom")
+    telemetry.export_jsonl("logs/spans.jsonl")
+"""
+import json
+import os
+import random
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, Iterator
+
+from app.utils.config import METRICS_ENABLED, METRICS_SAMPLE_RATE
+
+PREFIX = "product_hunt"
+
+
+class Span:
+    __slots__ = ("name", "parent", "sampled", "episode_id", "turn_id", "started_at", "started", "seconds", "records_scanned", "bytes_written", "error", "__weakref__")
+
+    def __init__(self, name: str, parent: "Span | None", sampled: bool, episode_id: str | None, turn_id: str | None, started: float):
+        self.name = name
+        self.parent = parent
+        self.sampled = sampled
+        self.episode_id = episode_id
+        self.turn_id = turn_id
+        self.started_at = time.time() if sampled else 0.0
+        self.started = started
+        self.seconds = 0.0
+        self.records_scanned = 0
+        self.bytes_written = 0
+        self.error = False
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "parent": self.parent.name if self.parent else None,
+            "episode_id": self.episode_id,
+            "turn_id": self.turn_id,
+            "started_at": self.started_at,
+            "seconds": self.seconds,
+            "records_scanned": self.records_scanned,
+            "bytes_written": self.bytes_written,
+            "error": self.error,
+        }
+
+
+class Stats:
+    """Running totals for one operation. Records and bytes include nested spans."""
+
+    __slots__ = ("count", "seconds", "max_seconds", "records_scanned", "bytes_written", "errors")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.records_scanned = 0
+        self.bytes_written = 0
+        self.errors = 0
+
+    def add(self, span: Span):
+        self.count += 1
+        self.seconds += span.seconds
+        self.max_seconds = max(self.max_seconds, span.seconds)
+        self.records_scanned += span.records_scanned
+        self.bytes_written += span.bytes_written
+        self.errors += span.error
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class Telemetry:
+    def __init__(
+        self,
+        enabled: bool = False,
+        sample_rate: float = 1.0,
+        max_buffered_spans: int = 10_000,
+        max_tracked_keys: int = 1_000,
+        clock: Callable[[], float] = time.perf_counter,
+        rng: Callable[[], float] = random.random,
+    ):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.clock = clock
+        self.rng = rng
+        self._active: ContextVar[Span | None] = ContextVar("active_span", default=None)
+        self._labels: ContextVar[tuple[str | None, str | None]] = ContextVar("span_labels", default=(None, None))
+
+        self.calls: dict[str, int] = {}
+        self.operations: dict[str, Stats] = {}
+        # Per-episode and per-turn totals for the most recently active max_tracked_keys of each
+        self.max_tracked_keys = max_tracked_keys
+        self.episodes: OrderedDict[str, dict[str, Stats]] = OrderedDict()
+        self.turns: OrderedDict[str, dict[str, Stats]] = OrderedDict()
+        # Sampled spans waiting for export_jsonl()
+        self.spans: deque[Span] = deque(maxlen=max_buffered_spans)
+
+    def configure(self, enabled: bool | None = None, sample_rate: float | None = None):
+        if enabled is not None:
+            self.enabled = enabled
+        if sample_rate is not None:
+            self.sample_rate = sample_rate
+
+    def reset(self):
+        self.calls.clear()
+        self.operations.clear()
+        self.episodes.clear()
+        self.turns.clear()
+        self.spans.clear()
+
+    @contextmanager
+    def bind(self, episode_id: str | None = None, turn_id: str | None = None) -> Iterator[None]:
+        """Attributes spans started inside the block to this episode and/or turn."""
+        current_episode, current_turn = self._labels.get()
+        token = self._labels.set((episode_id or current_episode, turn_id or current_turn))
+        try:
+            yield
+        finally:
+            self._labels.reset(token)
+
+    # --- Spans ---
+
+    def start(self, name: str, episode_id: str | None = None, turn_id: str | None = None) -> Span:
+        """
+        Opens a span and makes it current. Nested spans follow their root's sampling
+        decision and inherit its episode and turn unless bound to others.
+        """
+        self.calls[name] = self.calls.get(name, 0) + 1
+        parent = self._active.get()
+        sampled = parent.sampled if parent is not None else self.rng() < self.sample_rate
+        if not sampled:
+            span = Span(name, parent, False, None, None, 0.0)
+        else:
+            bound_episode, bound_turn = self._labels.get()
+            episode_id = episode_id or bound_episode or (parent.episode_id if parent else None)
+            turn_id = turn_id or bound_turn or (parent.turn_id if parent else None)
+            span = Span(name, parent, True, episode_id, turn_id, self.clock())
+        self._active.set(span)
+        return span
+
+    def current(self) -> Span | None:
+        return self._active.get()
+
+    def finish(self, span: Span, error: bool = False):
+        """Closes a span from start() and restores its parent as the current span."""
+        self._active.set(span.parent)
+        if not span.sampled:
+            return
+
+        span.seconds = self.clock() - span.started
+        span.error = error
+        if span.parent is not None:
+            span.parent.records_scanned += span.records_scanned
+            span.parent.bytes_written += span.bytes_written
+
+        self.operations.setdefault(span.name, Stats()).add(span)
+        if span.episode_id is not None:
+            self._charge(self.episodes, span.episode_id, span)
+        if span.turn_id is not None:
+            self._charge(self.turns, span.turn_id, span)
+        self.spans.append(span)
+
+    def _charge(self, groups: OrderedDict[str, dict[str, Stats]], key: str, span: Span):
+        ops = groups.get(key)
+        if ops is None:
+            ops = groups[key] = {}
+            # A long-running server sees a new turn id per invocation; forget the least recent
+            if len(groups) > self.max_tracked_keys:
+                groups.popitem(last=False)
+        else:
+            groups.move_to_end(key)
+        ops.setdefault(span.name, Stats()).add(span)
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[Span]:
+        span = self.start(name)
+        try:
+            yield span
+        except BaseException:
+            self.finish(span, error=True)
+            raise
+        else:
+            self.finish(span)
+
+    def note(self, records_scanned: int = 0, bytes_written: int = 0):
+        """Charges work to the current span. Called from the storage layer."""
+        if not self.enabled:
+            return
+        span = self._active.get()
+        if span is not None and span.sampled:
+            span.records_scanned += records_scanned
+            span.bytes_written += bytes_written
+
+    # --- Export ---
+
+    def summary(self) -> dict:
+        return {
+            "calls": dict(self.calls),
+            "operations": {name: s.to_dict() for name, s in self.operations.items()},
+            "episodes": {key: {name: s.to_dict() for name, s in ops.items()} for key, ops in self.episodes.items()},
+            "turns": {key: {name: s.to_dict() for name, s in ops.items()} for key, ops in self.turns.items()},
+        }
+
+    def prometheus_text(self) -> str:
+        lines = [f"# TYPE {PREFIX}_calls_total counter"]
+        lines += [f'{PREFIX}_calls_total{{op="{name}"}} {count}' for name, count in sorted(self.calls.items())]
+
+        series = (
+            ("span_seconds_total", "counter", "seconds"),
+            ("span_seconds_max", "gauge", "max_seconds"),
+            ("sampled_spans_total", "counter", "count"),
+            ("records_scanned_total", "counter", "records_scanned"),
+            ("bytes_written_total", "counter", "bytes_written"),
+            ("errors_total", "counter", "errors"),
+        )
+        for metric, kind, field in series:
+            lines.append(f"# TYPE {PREFIX}_{metric} {kind}")
+            for name, stats in sorted(self.operations.items()):
+                lines.append(f'{PREFIX}_{metric}{{op="{name}"}} {getattr(stats, field)}')
+        return "\n".join(lines) + "\n"
+
+    def export_prometheus(self, path: str):
+        """Writes the current totals in Prometheus text format (for node_exporter's textfile collector)."""
+        with open(path + ".tmp", "w") as f:
+            f.write(self.prometheus_text())
+        os.replace(path + ".tmp", path)
+
+    def export_jsonl(self, path: str) -> int:
+        """Appends buffered sampled spans to a JSONL file and drops them from the buffer. Returns spans written."""
+        written = 0
+        with open(path, "a") as f:
+            while self.spans:
+                f.write(json.dumps(self.spans.popleft().to_dict()) + "\n")
+                written += 1
+        return written
+
+
+telemetry = Telemetry(enabled=METRICS_ENABLED, sample_rate=METRICS_SAMPLE_RATE)
+
+
+def traced(name: str):
+    """Times the decorated function as a span called `name` when telemetry is enabled."""
+
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not telemetry.enabled:
+                return fn(*args, **kwargs)
+            with telemetry.span(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,83 @@
+"""
+Cold-start benchmark: how long a fresh interpreter takes to import each entry
+point, and to build the root agent on first use.
+
+Every sample runs in a new process, so nothing is shared between runs.
+
+    python -m benchmarks.cold_start_bench --runs 5 --output cold_start.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime
+
+TARGETS = {
+    "app.agents": "import app.agents",
+    "app.agents.vendor_discovery.pipeline": "import app.agents.vendor_discovery.pipeline",
+    "app.memory.service": "import app.memory.service",
+    "app.utils.error": "import app.utils.error",
+    "root_agent (first use)": "from app.agents.agent import root_agent",
+}
+
+# Runs in the child: times the statement and reports which heavy packages it pulled in
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+exec({statement!r})
+elapsed = time.perf_counter() - started
+print(json.dumps({{
+    "seconds": elapsed,
+    "modules": len(sys.modules),
+    "loaded": [name for name in ("google.adk", "rich", "dotenv") if name in sys.modules],
+}}))
+"""
+
+
+def sample(statement: str, cwd: str) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE.format(statement=statement)],
+        cwd=cwd, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        return {"error": result.stderr.strip().splitlines()[-1]}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run_suite(runs: int, cwd: str) -> dict:
+    results = {}
+    for name, statement in TARGETS.items():
+        samples = [sample(statement, cwd) for _ in range(runs)]
+        if "error" in samples[-1]:
+            results[name] = samples[-1]
+            continue
+        seconds = [s["seconds"] for s in samples]
+        results[name] = {
+            "median_ms": round(statistics.median(seconds) * 1000, 1),
+            "max_ms": round(max(seconds) * 1000, 1),
+            "modules": samples[-1]["modules"],
+            "loaded": samples[-1]["loaded"],
+        }
+    return {
+        "generated_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "runs": runs,
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure import time and first-use cost of the app entry points.")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes per target")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    report = run_suite(args.runs, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
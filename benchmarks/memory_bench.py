@@ -0,0 +1,268 @@
+"""
+Scalability benchmark for the memory layer.
+
+Generates synthetic episode / preference / heuristic histories with the
+app.schemas.memory models, then times every public MemoryService method
+against each storage backend. Each (backend, size) case is generated in one
+fresh process and measured in another, so peak RSS and cold-open time are
+not polluted by the generator or by earlier cases.
+
+    python -m benchmarks.memory_bench --sizes 1000 10000 100000 --output bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from multiprocessing import get_context
+
+from app.memory.service import MemoryService
+from app.memory.storage import SQLiteStore, record_key
+from app.schemas.memory import Episode, EpisodeStatus, Preference, Heuristic
+
+BACKENDS = {"tinydb": "memory.json", "sqlite": "memory.db"}
+CATEGORIES = [f"category-{i}" for i in range(50)]
+LOCATIONS = ["Lagos", "Abuja", "Port Harcourt", "Ibadan", "Kano"]
+STATES = ["completed", "abandoned", "paused"]
+
+
+def generate_history(size: int, seed: int = 0) -> dict[str, list[dict]]:
+    """`size` episodes plus size/10 preferences and size/100 heuristics, as stored JSON docs."""
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1)
+
+    episodes = []
+    for i in range(size):
+        created = start + timedelta(minutes=i)
+        episodes.append(Episode(
+            id=f"episode-{i}",
+            status=EpisodeStatus(state=rng.choice(STATES)),
+            category=rng.choice(CATEGORIES),
+            initial_query=f"synthetic query {i}",
+            extracted_constraints={"budget": rng.randrange(10_000, 2_000_000)},
+            product_ids=[rng.randrange(100_000) for _ in range(5)],
+            created_at=created,
+            updated_at=created,
+            last_interaction_at=created,
+        ).model_dump(mode="json"))
+    # Exactly one active episode, like a real history
+    if episodes:
+        episodes[-1]["status"] = {"state": "active", "last_transition_reason": None}
+
+    preferences = [
+        Preference(
+            category=rng.choice(CATEGORIES + ["global"]),
+            feature=f"feature-{i % 40}",
+            value=f"value-{i}",
+            confidence=rng.random(),
+            evidence_count=rng.randrange(1, 20),
+        ).model_dump(mode="json")
+        for i in range(max(1, size // 10))
+    ]
+
+    heuristics = []
+    for i in range(max(1, size // 100)):
+        applicability = {"category": rng.choice(CATEGORIES)}
+        if rng.random() < 0.5:
+            applicability["location"] = rng.choice(LOCATIONS)
+        if rng.random() < 0.5:
+            applicability["price"] = {"min": rng.randrange(0, 500_000)}
+        heuristics.append(Heuristic(
+            id=f"heuristic-{i}",
+            name=f"heuristic {i}",
+            rule="synthetic rule",
+            applicability=applicability,
+            logic_hint="synthetic hint",
+        ).model_dump(mode="json"))
+
+    return {"episodes": episodes, "preferences": preferences, "heuristics": heuristics}
+
+
+def write_history(backend: str, path: str, history: dict[str, list[dict]]):
+    """Bulk-loads a history without going through per-record upserts."""
+    if backend == "tinydb":
+        # TinyDB's on-disk layout: {table: {doc_id: doc}}
+        data = {table: {str(i + 1): doc for i, doc in enumerate(docs)} for table, docs in history.items()}
+        with open(path, "w") as f:
+            json.dump(data, f)
+        return
+
+    store = SQLiteStore(path)
+    try:
+        for table, docs in history.items():
+            store.write_batch((table, record_key(table, doc), doc) for doc in docs)
+    finally:
+        store.close()
+
+
+def file_bytes(path: str) -> int:
+    # SQLite keeps recent writes in the -wal file until a checkpoint
+    return sum(os.path.getsize(p) for p in (path, path + "-wal") if os.path.exists(p))
+
+
+def percentiles(samples: list[float]) -> dict[str, float]:
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    return {
+        "n": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered), 4),
+        "p50_ms": round(pick(0.50), 4),
+        "p90_ms": round(pick(0.90), 4),
+        "p99_ms": round(pick(0.99), 4),
+        "max_ms": round(ordered[-1], 4),
+    }
+
+
+def time_calls(fn, args_list: list[tuple]) -> dict[str, float]:
+    samples = []
+    for args in args_list:
+        started = time.perf_counter()
+        fn(*args)
+        samples.append((time.perf_counter() - started) * 1000)
+    return percentiles(samples)
+
+
+def peak_rss_kb() -> int:
+    # ru_maxrss is reported in KiB on Linux and bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // (1024 if sys.platform == "darwin" else 1)
+
+
+def build_case(backend: str, size: int, path: str, seed: int = 0) -> dict:
+    """Generates a history and writes it to `path`. Returns record counts and load time."""
+    history = generate_history(size, seed)
+    started = time.perf_counter()
+    write_history(backend, path, history)
+    return {
+        "records": {table: len(docs) for table, docs in history.items()},
+        "load_seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def measure_case(path: str, iterations: int, cache_size: int = 0, seed: int = 0) -> dict:
+    """Measures cold open and every public MemoryService method against an existing history file."""
+    rng = random.Random(seed + 1)
+    size_before = file_bytes(path)
+    rss_before_open = peak_rss_kb()
+
+    started = time.perf_counter()
+    service = MemoryService(path, cache_size=cache_size)
+    service.get_active_episode()
+    cold_open_ms = (time.perf_counter() - started) * 1000
+
+    episode_ids = [row["id"] for row in service.db.project("episodes", ["id"])]
+    existing_prefs = service.db.find_models("preferences", Preference)
+    contexts = [
+        {"category": rng.choice(CATEGORIES), "location": rng.choice(LOCATIONS), "price": rng.randrange(1_000_000)}
+        for _ in range(iterations)
+    ]
+    sample_episodes = [service.get_episode_by_id(rng.choice(episode_ids)) for _ in range(iterations)]
+
+    def pick_category():
+        return (rng.choice(CATEGORIES),)
+
+    methods = {
+        "get_active_episode": (service.get_active_episode, [() for _ in range(iterations)]),
+        "get_active_episode(category)": (service.get_active_episode, [pick_category() for _ in range(iterations)]),
+        "get_active_episode_state(category)": (service.get_active_episode_state, [pick_category() for _ in range(iterations)]),
+        "get_episode_by_id": (service.get_episode_by_id, [(rng.choice(episode_ids),) for _ in range(iterations)]),
+        "get_episodes_by_category": (service.get_episodes_by_category, [pick_category() for _ in range(iterations)]),
+        "get_preferences": (service.get_preferences, [pick_category() for _ in range(iterations)]),
+        "get_heuristics": (service.get_heuristics, [pick_category() for _ in range(iterations)]),
+        "match_heuristics": (service.match_heuristics, [(c,) for c in contexts]),
+        "match_heuristics_batch": (service.match_heuristics_batch, [(contexts,)]),
+        "update_episode": (service.update_episode, [(ep,) for ep in sample_episodes]),
+        "upsert_preference(existing)": (
+            service.upsert_preference, [(rng.choice(existing_prefs),) for _ in range(iterations)]
+        ),
+        "upsert_preference(new)": (
+            service.upsert_preference,
+            [(Preference(category=rng.choice(CATEGORIES), feature="bench", value=f"new-{i}"),) for i in range(iterations)],
+        ),
+        "add_heuristic": (
+            service.add_heuristic,
+            [(Heuristic(name=f"bench {i}", rule="r", applicability={"category": rng.choice(CATEGORIES)}, logic_hint="h"),)
+             for i in range(iterations)],
+        ),
+        "pause_all_active_episodes": (service.pause_all_active_episodes, [() for _ in range(iterations)]),
+        "create_episode": (
+            service.create_episode, [(rng.choice(CATEGORIES), f"bench query {i}") for i in range(iterations)]
+        ),
+    }
+    latencies = {name: time_calls(fn, args) for name, (fn, args) in methods.items()}
+
+    size_after = file_bytes(path)
+    service.db.close()
+    peak = peak_rss_kb()
+
+    return {
+        "file_bytes": size_before,
+        "file_bytes_after_writes": size_after,
+        "cold_open_ms": round(cold_open_ms, 3),
+        "peak_rss_kb": peak,
+        # What opening and using the service added on top of the interpreter and imports
+        "rss_increase_kb": peak - rss_before_open,
+        "cache_size": cache_size,
+        "methods": latencies,
+    }
+
+
+def _call(isolate: bool, fn, *args):
+    if not isolate:
+        return fn(*args)
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+        return pool.submit(fn, *args).result()
+
+
+def run_case(
+    backend: str, size: int, iterations: int, cache_size: int = 0, seed: int = 0, isolate: bool = False
+) -> dict:
+    """
+    Builds one history, then measures it. With isolate, each step runs in a fresh process,
+    so peak RSS covers the store alone and not the generated history.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, BACKENDS[backend])
+        built = _call(isolate, build_case, backend, size, path, seed)
+        measured = _call(isolate, measure_case, path, iterations, cache_size, seed)
+    return {"backend": backend, "size": size, **built, **measured}
+
+
+def run_suite(backends: list[str], sizes: list[int], iterations: int, cache_size: int = 0, isolate: bool = True) -> dict:
+    results = []
+    for size in sizes:
+        for backend in backends:
+            results.append(run_case(backend, size, iterations, cache_size, isolate=isolate))
+    return {
+        "generated_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "iterations": iterations,
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark MemoryService across backends and history sizes.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000], help="Episode counts to generate (up to 1000000)")
+    parser.add_argument("--backends", nargs="+", choices=sorted(BACKENDS), default=sorted(BACKENDS))
+    parser.add_argument("--iterations", type=int, default=200, help="Calls timed per method")
+    parser.add_argument("--cache-size", type=int, default=0, help="MemoryService cache size (0 measures the storage path)")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    report = run_suite(args.backends, args.sizes, args.iterations, args.cache_size)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
@@ -0,0 +1,73 @@
+"""
+Memory footprint of OfferTable against a list of VendorOfferings models.
+
+Builds the same synthetic offers both ways and reports traced allocation
+bytes per 100k offers, plus the time to build each representation.
+
+    python -m benchmarks.offer_table_bench --sizes 100000
+"""
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from app.agents.vendor_discovery.offer_table import AVAILABILITY, OfferTable
+from app.schemas.product import VendorOfferings
+
+VENDORS = [f"vendor-{i}" for i in range(200)]
+WARRANTIES = [None, "6 months", "1 year", "2 years"]
+
+
+def generate_offers(size: int, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    return [
+        {
+            "id": rng.randrange(size // 10 + 1),
+            "vendor_name": rng.choice(VENDORS),
+            "price": round(rng.uniform(20_000, 2_000_000), 2),
+            "listing_url": f"https://shop.example/listing/{i}",
+            "availability": rng.choice(AVAILABILITY),
+            "warranty": rng.choice(WARRANTIES),
+            "timestamp": start + timedelta(seconds=i),
+        }
+        for i in range(size)
+    ]
+
+
+def measure(build) -> tuple[object, int, float]:
+    """Returns (result, bytes still allocated by build, seconds)."""
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - started
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, elapsed
+
+
+def run_case(size: int) -> dict:
+    raw = generate_offers(size)
+    models, model_bytes, model_seconds = measure(lambda: [VendorOfferings(**o) for o in raw])
+    table, table_bytes, table_seconds = measure(lambda: OfferTable.from_offerings(models))
+    assert table.to_offerings(range(min(size, 1000))) == models[:1000]
+
+    per_100k = 100_000 / size
+    return {
+        "offers": size,
+        "pydantic_bytes_per_100k": round(model_bytes * per_100k),
+        "table_bytes_per_100k": round(table_bytes * per_100k),
+        "ratio": round(model_bytes / table_bytes, 2),
+        "pydantic_build_ms": round(model_seconds * 1000, 1),
+        "table_build_ms": round(table_seconds * 1000, 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare OfferTable memory against VendorOfferings models.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000])
+    args = parser.parse_args()
+    json.dump([run_case(size) for size in args.sizes], sys.stdout, indent=2)
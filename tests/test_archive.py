@@ -0,0 +1,139 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from app.memory.archive import EpisodeArchive
+from app.memory.refinement import PreferenceRefiner
+from app.memory.service import MemoryService
+
+
+@pytest.fixture
+def memory_service(tmp_path):
+    service = MemoryService(str(tmp_path / "memory.db"), archive_dir=str(tmp_path / "archive"))
+    yield service
+    service.db.close()
+
+def finish(service, episode, state):
+    episode.status.state = state
+    service.update_episode(episode)
+    # Closed episodes are archived once preference refinement has credited them
+    PreferenceRefiner(service).run()
+
+def test_archive_moves_finished_and_idle_episodes(memory_service):
+    done = memory_service.create_episode(category="Monitors", initial_query="27 inch monitor")
+    finish(memory_service, done, "completed")
+    idle = memory_service.create_episode(category="Monitors", initial_query="32 inch monitor")
+    recent = memory_service.create_episode(category="Monitors", initial_query="24 inch monitor")
+    active = memory_service.create_episode(category="Inverters", initial_query="3kVA inverter")
+
+    idle.status.state = "paused"
+    idle.last_interaction_at = datetime.now() - timedelta(days=60)
+    memory_service.update_episode(idle)
+
+    moved = memory_service.archive_episodes(max_idle_days=30)
+
+    assert moved == 2
+    assert {d["id"] for d in memory_service.db.find("episodes")} == {recent.id, active.id}
+    assert memory_service.get_active_episode().id == active.id
+
+    # Archived episodes are still reachable through the normal read API
+    assert memory_service.get_episode_by_id(done.id).status.state == "completed"
+    monitors = memory_service.get_episodes_by_category("Monitors")
+    assert [ep.id for ep in monitors] == [done.id, idle.id, recent.id]
+
+def test_archive_survives_reopen_and_loads_lazily(tmp_path, memory_service):
+    ep = memory_service.create_episode(category="Monitors", initial_query="27 inch monitor")
+    finish(memory_service, ep, "abandoned")
+    memory_service.archive_episodes()
+
+    archive = EpisodeArchive(str(tmp_path / "archive"))
+    assert ep.id in archive
+    assert archive.segments.stats()["size"] == 0
+    assert archive.get_by_category("Inverters") == []
+    assert archive.segments.stats()["size"] == 0
+    assert archive.get(ep.id)["initial_query"] == "27 inch monitor"
+    assert archive.segments.stats()["size"] == 1
+
+def test_updating_archived_episode_restores_it(memory_service):
+    ep = memory_service.create_episode(category="Monitors", initial_query="27 inch monitor")
+    finish(memory_service, ep, "completed")
+    memory_service.archive_episodes()
+
+    restored = memory_service.get_episode_by_id(ep.id)
+    restored.status.state = "active"
+    memory_service.update_episode(restored)
+
+    assert ep.id not in memory_service.archive
+    assert memory_service.get_active_episode().id == ep.id
+    assert len(memory_service.get_episodes_by_category("Monitors")) == 1
+
+def test_compact_drops_stale_records_and_merges_segments(tmp_path):
+    archive = EpisodeArchive(str(tmp_path / "archive"), segment_max_records=10)
+    base = {"category": "Monitors", "created_at": "2025-01-01T00:00:00", "status": {"state": "completed"}}
+
+    for i in range(5):
+        archive.append([{**base, "id": f"ep-{i}", "initial_query": "first"}])
+    archive.append([{**base, "id": "ep-0", "initial_query": "second"}])
+    archive.discard("ep-1")
+
+    stats = archive.compact()
+
+    assert stats == {"records": 4, "segments_before": 6, "segments_after": 1}
+    reopened = EpisodeArchive(str(tmp_path / "archive"))
+    assert len(reopened) == 4
+    assert reopened.get("ep-0")["initial_query"] == "second"
+    assert reopened.get("ep-1") is None
+    # index.json, archive.lock and the merged segment
+    assert len(os.listdir(tmp_path / "archive")) == 3
+
+def test_archives_shared_by_two_instances_do_not_lose_episodes(tmp_path):
+    base = {"category": "Monitors", "created_at": "2025-01-01T00:00:00", "status": {"state": "completed"}}
+    first = EpisodeArchive(str(tmp_path / "archive"))
+    second = EpisodeArchive(str(tmp_path / "archive"))
+
+    first.append([{**base, "id": "ep-a"}])
+    # second was opened before ep-a existed; it must not reuse ep-a's segment or index
+    second.append([{**base, "id": "ep-b"}])
+    assert "ep-a" in second
+    assert first.get("ep-b")["id"] == "ep-b"
+
+    first.append([{**base, "id": "ep-c"}])
+    second.discard("ep-b")
+    assert first.compact()["records"] == 2
+    assert [d["id"] for d in second.get_by_category("Monitors")] == ["ep-a", "ep-c"]
+    assert {d["id"] for d in EpisodeArchive(str(tmp_path / "archive")).get_by_category("Monitors")} == {"ep-a", "ep-c"}
+
+def test_two_services_archiving_into_one_directory(tmp_path):
+    db, archive_dir = str(tmp_path / "memory.db"), str(tmp_path / "archive")
+    worker = MemoryService(db, archive_dir=archive_dir)
+    job = MemoryService(db, archive_dir=archive_dir)
+
+    a = worker.create_episode(category="Monitors", initial_query="27 inch monitor")
+    finish(worker, a, "completed")
+    assert worker.archive_episodes() == 1
+    b = job.create_episode(category="Monitors", initial_query="32 inch monitor")
+    finish(job, b, "completed")
+    assert job.archive_episodes() == 1
+
+    assert worker.get_episode_by_id(a.id) is not None
+    assert worker.get_episode_by_id(b.id) is not None
+    assert len(job.get_episodes_by_category("Monitors")) == 2
+    worker.db.close()
+    job.db.close()
+
+def test_closed_episodes_wait_for_refinement(memory_service):
+    ep = memory_service.create_episode(category="Monitors", initial_query="27 inch monitor")
+    ep.extracted_constraints = {"brand": "LG"}
+    ep.status.state = "completed"
+    memory_service.update_episode(ep)
+
+    assert memory_service.archive_episodes() == 0
+    PreferenceRefiner(memory_service).run()
+    assert memory_service.archive_episodes() == 1
+    assert memory_service.get_preferences("Monitors")[0].evidence_count == 1
+
+def test_archive_requires_archive_dir(tmp_path):
+    service = MemoryService(str(tmp_path / "memory.db"))
+    with pytest.raises(ValueError):
+        service.archive_episodes()
+    service.db.close()
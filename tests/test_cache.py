@@ -0,0 +1,71 @@
+import pytest
+from app.memory.cache import LRUCache
+from app.memory.service import MemoryService
+from app.schemas.memory import Preference, Heuristic
+
+
+@pytest.fixture
+def memory_service(tmp_path):
+    service = MemoryService(str(tmp_path / "memory.db"), cache_size=2)
+    yield service
+    service.db.close()
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats() == {"hits": 3, "misses": 1, "evictions": 1, "size": 2, "maxsize": 2}
+
+def test_repeated_preference_reads_hit_the_cache(memory_service):
+    memory_service.upsert_preference(Preference(category="Monitors", feature="brand", value="LG"))
+
+    first = memory_service.get_preferences("Monitors")
+    second = memory_service.get_preferences("Monitors")
+
+    assert first == second
+    assert memory_service.cache_stats()["preferences"]["hits"] == 1
+    assert memory_service.cache_stats()["preferences"]["misses"] == 1
+
+def test_upsert_invalidates_only_its_category(memory_service):
+    memory_service.upsert_preference(Preference(category="Monitors", feature="brand", value="LG"))
+    memory_service.upsert_preference(Preference(category="Inverters", feature="brand", value="Luminous"))
+    memory_service.get_preferences("Monitors")
+    memory_service.get_preferences("Inverters")
+
+    memory_service.upsert_preference(Preference(category="Monitors", feature="brand", value="LG"))
+
+    assert "Inverters" in memory_service.preference_cache.entries
+    assert "Monitors" not in memory_service.preference_cache.entries
+    assert memory_service.get_preferences("Monitors")[0].evidence_count == 2
+
+def test_global_upsert_invalidates_every_category(memory_service):
+    memory_service.upsert_preference(Preference(category="Monitors", feature="brand", value="LG"))
+    assert len(memory_service.get_preferences("Monitors")) == 1
+
+    memory_service.upsert_preference(Preference(category="global", feature="warranty", value="required"))
+
+    assert len(memory_service.get_preferences("Monitors")) == 2
+
+def test_add_heuristic_invalidates_cached_category(memory_service):
+    assert memory_service.get_heuristics("electronics") == []
+
+    memory_service.add_heuristic(
+        Heuristic(name="h", rule="r", applicability={"category": "electronics"}, logic_hint="l")
+    )
+
+    assert len(memory_service.get_heuristics("electronics")) == 1
+
+def test_rollback_drops_cached_uncommitted_reads(memory_service):
+    with pytest.raises(RuntimeError):
+        with memory_service.transaction():
+            memory_service.upsert_preference(Preference(category="Monitors", feature="brand", value="LG"))
+            assert len(memory_service.get_preferences("Monitors")) == 1
+            raise RuntimeError("task failed")
+
+    assert memory_service.get_preferences("Monitors") == []
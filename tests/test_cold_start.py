@@ -0,0 +1,43 @@
+import subprocess
+import sys
+
+import pytest
+
+from app.memory.service import MemoryService
+
+
+def imported_modules(statement: str) -> set[str]:
+    result = subprocess.run(
+        [sys.executable, "-c", f"import sys; {statement}; print('\\n'.join(sys.modules))"],
+        capture_output=True, text=True, check=True,
+    )
+    return set(result.stdout.split())
+
+
+@pytest.mark.parametrize("statement", ["import app.agents", "import app.utils.error", "import app.memory.service"])
+def test_imports_do_not_load_heavy_dependencies(statement):
+    modules = imported_modules(statement)
+
+    assert "google.adk" not in modules
+    assert "rich" not in modules
+    assert "dotenv" not in modules
+
+
+def test_root_agent_is_built_once_on_first_access():
+    from app.agents import agent
+
+    first = agent.root_agent
+    assert first.name == "orchestrator_agent"
+    assert agent.root_agent is first
+    with pytest.raises(AttributeError):
+        agent.not_an_attribute
+
+
+def test_memory_store_opens_on_first_use(tmp_path):
+    path = tmp_path / "memory.db"
+    service = MemoryService(str(path))
+    assert not path.exists()
+
+    assert service.get_active_episode() is None
+    assert path.exists()
+    service.db.close()
@@ -0,0 +1,57 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import pytest
+
+from app.memory.service import MemoryService
+from app.schemas.memory import Preference
+
+WORKERS = 4
+ITERATIONS = 15
+
+
+def worker(path: str, worker_id: int, iterations: int) -> list[str]:
+    service = MemoryService(path)
+    created = []
+    for i in range(iterations):
+        # Every worker reinforces the same preference: each increment must survive
+        service.upsert_preference(Preference(category="Monitors", feature="brand", value="LG"))
+        service.upsert_preference(Preference(category="Monitors", feature="worker", value=worker_id))
+        episode = service.create_episode(category="Monitors", initial_query=f"worker {worker_id} query {i}")
+        episode.product_ids.append(worker_id)
+        service.update_episode(episode)
+        created.append(episode.id)
+    service.db.close()
+    return created
+
+
+@pytest.mark.parametrize("filename", ["memory.json", "memory.db"])
+def test_concurrent_workers_lose_no_updates(tmp_path, filename):
+    path = str(tmp_path / filename)
+    with ProcessPoolExecutor(max_workers=WORKERS, mp_context=get_context("spawn")) as pool:
+        futures = [pool.submit(worker, path, w, ITERATIONS) for w in range(WORKERS)]
+        created = [episode_id for f in futures for episode_id in f.result()]
+
+    service = MemoryService(path)
+    prefs = {(p.feature, p.value): p for p in service.get_preferences("Monitors")}
+    assert prefs[("brand", "LG")].evidence_count == WORKERS * ITERATIONS
+    assert all(prefs[("worker", w)].evidence_count == ITERATIONS for w in range(WORKERS))
+
+    episodes = service.get_episodes_by_category("Monitors")
+    assert sorted(e.id for e in episodes) == sorted(created)
+    assert [e.status.state for e in episodes].count("active") == 1
+    assert all(len(e.product_ids) == 1 for e in episodes)
+    service.db.close()
+
+
+def test_cached_reads_see_other_processes_writes(tmp_path):
+    path = str(tmp_path / "memory.json")
+    reader = MemoryService(path)
+    writer = MemoryService(path)
+
+    assert reader.get_preferences("Monitors") == []
+    writer.upsert_preference(Preference(category="Monitors", feature="brand", value="LG"))
+    assert [p.value for p in reader.get_preferences("Monitors")] == ["LG"]
+
+    reader.db.close()
+    writer.db.close()
@@ -0,0 +1,76 @@
+import pytest
+from app.memory.heuristics import HeuristicIndex
+from app.memory.service import MemoryService
+from app.schemas.memory import Heuristic
+
+
+def make_heuristic(name, applicability):
+    return Heuristic(name=name, rule=name, applicability=applicability, logic_hint=name)
+
+@pytest.fixture
+def index():
+    return HeuristicIndex([
+        make_heuristic("warranty premium", {
+            "category": "electronics",
+            "location": "Lagos",
+            "price": {"min": 300000},
+        }),
+        make_heuristic("official store bonus", {"category": ["electronics", "appliances"], "platform": "Jumia"}),
+        make_heuristic("too cheap to be real", {"price": {"max": 5000}}),
+        make_heuristic("furniture delivery", {"category": "furniture"}),
+    ])
+
+def names(heuristics):
+    return [h.name for h in heuristics]
+
+def test_matches_discrete_and_range_conditions(index):
+    context = {"category": "Electronics", "price": 450000, "platform": "jumia", "location": "Lagos"}
+    assert names(index.match(context)) == ["warranty premium", "official store bonus"]
+
+def test_range_bounds_and_missing_context_fields(index):
+    assert names(index.match({"category": "electronics", "price": 100000, "location": "Lagos"})) == []
+    # No price in the context means range conditions cannot hold
+    assert names(index.match({"category": "electronics", "location": "Lagos"})) == []
+    assert names(index.match({"category": "appliances", "price": 5000, "platform": "Jumia"})) == [
+        "official store bonus",
+        "too cheap to be real",
+    ]
+
+def test_list_context_values_match_any(index):
+    context = {"category": "electronics", "price": 300000, "location": ["Abuja", "Lagos"]}
+    assert names(index.match(context)) == ["warranty premium"]
+
+def test_match_many_returns_one_result_per_context(index):
+    contexts = [
+        {"category": "electronics", "price": price, "location": "Lagos", "platform": "Konga"}
+        for price in (1000, 200000, 350000)
+    ]
+    assert [names(r) for r in index.match_many(contexts)] == [
+        ["too cheap to be real"],
+        [],
+        ["warranty premium"],
+    ]
+
+def test_add_replaces_heuristic_with_same_id(index):
+    original = index.match({"category": "furniture"})[0]
+    updated = original.model_copy(update={"applicability": {"category": "outdoor"}})
+
+    index.add(updated)
+
+    assert len(index) == 4
+    assert index.match({"category": "furniture"}) == []
+    assert index.match({"category": "outdoor"}) == [updated]
+
+def test_memory_service_matches_stored_heuristics(tmp_path):
+    service = MemoryService(str(tmp_path / "memory.db"))
+    service.add_heuristic(make_heuristic("lagos", {"category": "electronics", "location": "Lagos"}))
+    assert names(service.match_heuristics({"category": "electronics", "location": "Lagos"})) == ["lagos"]
+
+    # Heuristics added after the index is built are picked up incrementally
+    service.add_heuristic(make_heuristic("any electronics", {"category": "electronics"}))
+    results = service.match_heuristics_batch([
+        {"category": "electronics", "location": "Lagos"},
+        {"category": "electronics", "location": "Abuja"},
+    ])
+    assert [names(r) for r in results] == [["lagos", "any electronics"], ["any electronics"]]
+    service.db.close()
@@ -0,0 +1,133 @@
+import asyncio
+from datetime import datetime
+
+import httpx
+import pytest
+from app.agents.vendor_discovery.listing_cache import CachedVendorDiscovery, ListingCache, normalize_listing_url
+from app.agents.vendor_discovery.pipeline import JSONListingAdapter, VendorDiscoveryPipeline
+from app.schemas.product import VendorOfferings
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def offering(vendor, price, url, product_id=1):
+    return VendorOfferings(
+        id=product_id,
+        vendor_name=vendor,
+        price=price,
+        listing_url=url,
+        availability="in_stock",
+        timestamp=datetime(2025, 1, 1, 9, 30),
+    )
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    cache = ListingCache(str(tmp_path / "listings.db"), ttls={"jumia": 60, "konga": 600}, max_stale=3600, clock=clock)
+    yield cache
+    cache.close()
+
+def test_normalize_listing_url():
+    assert normalize_listing_url("HTTPS://www.Jumia.com.ng/lg-27/?utm_source=x&b=2&a=1#reviews") == (
+        "https://jumia.com.ng/lg-27?a=1&b=2"
+    )
+    # Only exact tracking names are dropped, not parameters that merely start like them
+    assert normalize_listing_url("https://konga.com/p?ref=home&ref_=nav&refurbished=1&gclid=9") == (
+        "https://konga.com/p?refurbished=1"
+    )
+
+def test_lookups_keep_original_timestamp(cache):
+    cache.put(1, "jumia", [offering("GadgetDepot", 250000, "https://www.jumia.com.ng/lg-27/?utm_source=ad")])
+
+    entry = cache.get("https://jumia.com.ng/lg-27")
+    assert entry.offering.timestamp == datetime(2025, 1, 1, 9, 30)
+    assert entry.stale is False
+    assert [e.offering.price for e in cache.find(1, "GadgetDepot")] == [250000]
+
+def test_per_platform_ttl_and_max_stale(cache, clock):
+    cache.put(1, "jumia", [offering("A", 100, "https://jumia.test/a")])
+    cache.put(1, "konga", [offering("B", 200, "https://konga.test/b")])
+
+    clock.now += 120
+    assert {e.platform: e.stale for e in cache.get_product(1)} == {"jumia": True, "konga": False}
+
+    clock.now += 3600
+    assert cache.get_product(1) == []
+
+def test_refetch_replaces_platform_listings(cache):
+    cache.put(1, "jumia", [offering("A", 100, "https://jumia.test/a"), offering("B", 120, "https://jumia.test/b")])
+    cache.put(1, "jumia", [offering("A", 90, "https://jumia.test/a")])
+
+    assert [(e.offering.vendor_name, e.offering.price) for e in cache.get_product(1)] == [("A", 90)]
+
+def test_listing_shared_by_two_products_stays_with_both(cache, clock):
+    cache.put(1, "jumia", [offering("A", 100, "https://jumia.test/bundle")])
+    clock.now += 1
+    cache.put(2, "jumia", [offering("A", 95, "https://jumia.test/bundle", product_id=2)])
+
+    assert [e.offering.price for e in cache.get_product(1)] == [100]
+    assert [e.offering.price for e in cache.get_product(2)] == [95]
+    assert cache.get("https://jumia.test/bundle").offering.price == 95
+
+def test_evicts_least_recently_read_fetches(tmp_path, clock):
+    cache = ListingCache(str(tmp_path / "listings.db"), max_bytes=350, clock=clock)
+    for product_id in (1, 2, 3):
+        clock.now += 1
+        cache.put(product_id, "jumia", [offering("A", 100, f"https://jumia.test/{product_id}", product_id)])
+        clock.now += 1
+        cache.get_product(1)
+
+    assert cache.size_bytes() <= 350
+    assert cache.get_product(1) != []
+    assert cache.get_product(2) == []
+    cache.close()
+
+def test_stale_while_revalidate(cache, clock):
+    calls = []
+    prices = {"jumia": 100, "konga": 200}
+
+    def handler(request):
+        platform = request.url.host.split(".")[0]
+        calls.append(platform)
+        return httpx.Response(200, json=[
+            {"vendor_name": platform, "price": prices[platform], "listing_url": f"https://{platform}.test/1"}
+        ])
+
+    async def scenario():
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        pipeline = VendorDiscoveryPipeline(
+            [JSONListingAdapter("jumia", "https://jumia.test/search"), JSONListingAdapter("konga", "https://konga.test/search")],
+            client=client,
+        )
+        discovery = CachedVendorDiscovery(pipeline, cache)
+
+        first = await discovery.discover(1, "monitor")
+        assert sorted(calls) == ["jumia", "konga"]
+
+        # Within both TTLs: served entirely from cache
+        calls.clear()
+        second = await discovery.discover(1, "monitor")
+        assert calls == [] and second == first
+
+        # Jumia is stale: the old price is served now, the refresh lands in the background
+        clock.now += 120
+        prices["jumia"] = 95
+        third = await discovery.discover(1, "monitor")
+        assert [o.price for o in third] == [100, 200]
+        await discovery.wait_for_refreshes()
+        assert calls == ["jumia"]
+
+        fourth = await discovery.discover(1, "monitor")
+        assert [o.price for o in fourth] == [95, 200]
+        await client.aclose()
+
+    asyncio.run(scenario())
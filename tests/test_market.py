@@ -0,0 +1,112 @@
+import random
+import statistics
+from datetime import datetime, timedelta
+
+import pytest
+from app.agents.vendor_discovery.market import MarketAggregator, PriceSketch, StreamingMedian
+from app.schemas.product import VendorOfferings
+
+NOW = datetime(2025, 6, 1, 12, 0)
+
+
+def offering(vendor, price, hours_ago=0, url=None):
+    return VendorOfferings(
+        id=1,
+        vendor_name=vendor,
+        price=price,
+        listing_url=url or f"https://example.com/{vendor}",
+        availability="in_stock",
+        timestamp=NOW - timedelta(hours=hours_ago),
+    )
+
+def test_streaming_median_matches_statistics_under_adds_and_removes():
+    rng = random.Random(3)
+    median = StreamingMedian()
+    values = []
+    for _ in range(2000):
+        if values and rng.random() < 0.4:
+            value = values.pop(rng.randrange(len(values)))
+            median.remove(value)
+        else:
+            value = float(rng.randrange(1000))
+            values.append(value)
+            median.add(value)
+        if values:
+            assert median.median() == statistics.median(values)
+            assert len(median) == len(values)
+
+def test_aggregator_snapshot_matches_full_recompute():
+    rng = random.Random(5)
+    aggregator = MarketAggregator()
+    prices = {}
+    for i in range(300):
+        vendor = f"vendor-{rng.randrange(60)}"
+        price = float(rng.randrange(150_000, 400_000))
+        aggregator.add(offering(vendor, price))
+        prices[vendor] = price
+
+    stats = aggregator.snapshot(NOW).price_stats
+    assert stats.median_price == statistics.median(prices.values())
+    assert stats.average_price == pytest.approx(statistics.fmean(prices.values()))
+    assert stats.min_price == min(prices.values())
+    assert stats.max_price == max(prices.values())
+    assert aggregator.snapshot(NOW).vendors_count == len(prices)
+
+def test_expire_drops_stale_offerings_only():
+    aggregator = MarketAggregator()
+    aggregator.add(offering("old", 100_000, hours_ago=72))
+    aggregator.add(offering("fresh", 200_000, hours_ago=1))
+    aggregator.add(offering("refreshed", 50_000, hours_ago=72))
+    # A newer observation of the same listing replaces the stale one
+    aggregator.add(offering("refreshed", 300_000, hours_ago=2))
+
+    removed = aggregator.expire(NOW - timedelta(hours=24))
+
+    assert removed == 1
+    summary = aggregator.snapshot(NOW)
+    assert summary.vendors_count == 2
+    assert summary.price_stats.min_price == 200_000
+    assert summary.price_stats.median_price == 250_000
+
+def test_confidence_grows_with_vendors_and_decays_with_age():
+    few = MarketAggregator()
+    few.add(offering("a", 100))
+    many = MarketAggregator()
+    many.add_many(offering(f"v{i}", 100) for i in range(10))
+    stale = MarketAggregator()
+    stale.add_many(offering(f"v{i}", 100, hours_ago=24 * 6) for i in range(10))
+
+    assert few.confidence(NOW) < many.confidence(NOW) <= 1.0
+    assert stale.confidence(NOW) == pytest.approx(many.confidence(NOW) / 4, rel=1e-3)
+
+def test_sketch_mode_stays_within_relative_accuracy():
+    rng = random.Random(11)
+    sketch = PriceSketch(relative_accuracy=0.01)
+    values = [rng.uniform(10_000, 2_000_000) for _ in range(5000)]
+    for v in values:
+        sketch.add(v)
+    for v in values[:1000]:
+        sketch.remove(v)
+
+    exact = statistics.median(values[1000:])
+    assert abs(sketch.median() - exact) / exact < 0.02
+
+    aggregator = MarketAggregator(mode="sketch")
+    aggregator.add_many(offering(f"v{i}", v) for i, v in enumerate(values))
+    stats = aggregator.price_stats()
+    assert stats.min_price == pytest.approx(min(values), rel=0.01)
+    assert stats.max_price == pytest.approx(max(values), rel=0.01)
+
+def test_aggregator_keeps_only_price_and_time_per_listing():
+    aggregator = MarketAggregator(mode="sketch")
+    for i in range(1000):
+        aggregator.add(offering("v1", 100_000 + i))
+
+    assert len(aggregator) == 1
+    assert aggregator.offerings[("v1", "https://example.com/v1")][0] == 100_999
+    # Entries left behind by replaced observations are compacted away
+    assert len(aggregator.expiry) <= 2 * len(aggregator) + 64
+
+def test_empty_aggregator_cannot_snapshot():
+    with pytest.raises(ValueError):
+        MarketAggregator().snapshot()
@@ -0,0 +1,29 @@
+from benchmarks.memory_bench import generate_history, run_case, run_suite
+
+
+def test_generate_history_shape():
+    history = generate_history(200)
+
+    assert len(history["episodes"]) == 200
+    assert len(history["preferences"]) == 20
+    assert len(history["heuristics"]) == 2
+    assert sum(doc["status"]["state"] == "active" for doc in history["episodes"]) == 1
+
+def test_suite_reports_every_method_for_each_backend():
+    report = run_suite(["tinydb", "sqlite"], [50], iterations=3, isolate=False)
+
+    assert [r["backend"] for r in report["results"]] == ["tinydb", "sqlite"]
+    for result in report["results"]:
+        assert result["file_bytes"] > 0
+        assert result["cold_open_ms"] > 0
+        assert result["peak_rss_kb"] > 0
+        assert result["rss_increase_kb"] >= 0
+        assert "create_episode" in result["methods"]
+        assert result["methods"]["get_episode_by_id"]["n"] == 3
+
+def test_isolated_case_measures_in_a_separate_process():
+    result = run_case("sqlite", 50, iterations=2, isolate=True)
+
+    assert result["records"]["episodes"] == 50
+    assert result["load_seconds"] >= 0
+    assert result["methods"]["get_preferences"]["n"] == 2
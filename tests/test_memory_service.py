@@ -3,10 +3,10 @@ from app.memory.service import MemoryService
 from app.schemas.memory import Preference, Heuristic
 
 
-@pytest.fixture
-def memory_service(tmp_path):
-    # Use a temporary directory for the test database
-    db_path = tmp_path / "test_memory.json"
+@pytest.fixture(params=["test_memory.json", "test_memory.db"])
+def memory_service(tmp_path, request):
+    # Use a temporary directory for the test database, once per storage backend
+    db_path = tmp_path / request.param
     service = MemoryService(str(db_path))
     yield service
     service.db.close()
@@ -41,6 +41,52 @@ def test_episode_transition_logic(memory_service):
     assert ep1_doc.status.state == "paused"
     assert ep1_doc.status.last_transition_reason == "New episode started"
 
+def test_resuming_an_episode_pauses_the_active_one(memory_service):
+    """Resuming a paused episode keeps a single active one."""
+    ep1 = memory_service.create_episode(category="Monitors", initial_query="Looking for a 27 inch monitor")
+    ep2 = memory_service.create_episode(category="Inverters", initial_query="How much for a 3kVA inverter?")
+
+    resumed = memory_service.get_episode_by_id(ep1.id)
+    resumed.status.state = "active"
+    memory_service.update_episode(resumed)
+
+    assert memory_service.get_active_episode().id == ep1.id
+    assert memory_service.get_episode_by_id(ep2.id).status.last_transition_reason == "Another episode resumed"
+
+def test_stale_active_copy_does_not_pause_a_newer_episode(memory_service):
+    """A copy loaded before its episode was paused (e.g. by another worker) keeps the pause."""
+    ep1 = memory_service.create_episode(category="Monitors", initial_query="Looking for a 27 inch monitor")
+    ep2 = memory_service.create_episode(category="Inverters", initial_query="How much for a 3kVA inverter?")
+
+    ep1.extracted_constraints = {"size_inches": 27}
+    memory_service.update_episode(ep1)
+
+    # The caller's copy is left as it was
+    assert ep1.status.state == "active"
+    assert memory_service.get_active_episode().id == ep2.id
+    saved = memory_service.get_episode_by_id(ep1.id)
+    assert saved.status.state == "paused"
+    assert saved.extracted_constraints == {"size_inches": 27}
+
+def test_status_changed_on_a_stale_copy_is_saved(memory_service):
+    """Completing a copy loaded before the episode was paused records the completion."""
+    ep1 = memory_service.create_episode(category="Monitors", initial_query="Looking for a 27 inch monitor")
+    ep2 = memory_service.create_episode(category="Inverters", initial_query="How much for a 3kVA inverter?")
+
+    ep1.status.state = "completed"
+    memory_service.update_episode(ep1)
+
+    assert ep1.status.state == "completed"
+    assert memory_service.get_episode_by_id(ep1.id).status.state == "completed"
+    assert memory_service.get_active_episode().id == ep2.id
+
+    # Saved again unchanged after another worker reopened it: the reopening stands
+    reopened = memory_service.get_episode_by_id(ep1.id)
+    reopened.status.state = "paused"
+    memory_service.update_episode(reopened)
+    memory_service.update_episode(ep1)
+    assert memory_service.get_episode_by_id(ep1.id).status.state == "paused"
+
 def test_preference_upsert_logic(memory_service):
     """Test that adding the same preference twice updates evidence count and confidence."""
     pref = Preference(category="Monitors", feature="brand", value="LG", preference_type="like")
@@ -81,3 +127,21 @@ def test_heuristic_storage_and_retrieval(memory_service):
     # Verify non-matching category returns empty
     empty_results = memory_service.get_heuristics("furniture")
     assert len(empty_results) == 0
+
+def test_heuristics_with_a_list_of_categories(memory_service):
+    """A list category applies to each listed category and is indexed like any other heuristic."""
+    memory_service.get_heuristics("phones")
+    shared = Heuristic(
+        name="Official Store Warranty",
+        rule="Official stores honour manufacturer warranties",
+        applicability={"category": ["electronics", "phones"]},
+        logic_hint="Prefer official stores for high ticket items"
+    )
+    ranged = Heuristic(name="Odd", rule="r", applicability={"category": {"min": 1}}, logic_hint="l")
+    memory_service.add_heuristic(shared)
+    memory_service.add_heuristic(ranged)
+
+    assert [h.name for h in memory_service.get_heuristics("phones")] == ["Official Store Warranty"]
+    assert [h.name for h in memory_service.get_heuristics("electronics")] == ["Official Store Warranty"]
+    assert memory_service.get_heuristics("furniture") == []
+    assert [h.name for h in memory_service.match_heuristics({"category": "phones"})] == ["Official Store Warranty"]
@@ -0,0 +1,180 @@
+import json
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from app.memory.service import MemoryService
+from app.schemas.memory import Preference
+from app.utils.metrics import Telemetry, telemetry
+
+
+@pytest.fixture
+def metrics():
+    telemetry.reset()
+    telemetry.configure(enabled=True, sample_rate=1.0)
+    yield telemetry
+    telemetry.configure(enabled=False, sample_rate=1.0)
+    telemetry.rng = random.random
+    telemetry.reset()
+
+
+@pytest.fixture(params=["memory.json", "memory.db"])
+def service(tmp_path, request):
+    service = MemoryService(str(tmp_path / request.param))
+    yield service
+    service.db.close()
+
+
+def test_disabled_records_nothing(service):
+    telemetry.reset()
+    service.create_episode(category="Monitors", initial_query="27 inch monitor")
+    service.get_active_episode()
+
+    assert telemetry.calls == {}
+    assert telemetry.operations == {}
+
+
+def test_spans_time_memory_calls_with_records_and_bytes(metrics, service):
+    service.create_episode(category="Monitors", initial_query="27 inch monitor")
+    service.create_episode(category="Inverters", initial_query="3kVA inverter")
+    service.get_episodes_by_category("Monitors")
+
+    ops = metrics.operations
+    assert ops["memory.create_episode"].count == 2
+    # Nested calls are spans of their own, and their work rolls up into the caller
+    assert ops["memory.pause_all_active_episodes"].count == 2
+    assert ops["memory.commit"].bytes_written > 0
+    assert ops["memory.create_episode"].bytes_written == ops["memory.commit"].bytes_written
+    assert ops["memory.get_episodes_by_category"].records_scanned >= 1
+    assert all(s.seconds >= 0 for s in ops.values())
+
+
+def test_spans_are_aggregated_per_episode_and_turn(metrics, service):
+    episode = service.create_episode(category="Monitors", initial_query="27 inch monitor")
+
+    with metrics.bind(episode_id=episode.id, turn_id="turn-1"):
+        service.get_episode_by_id(episode.id)
+        service.upsert_preference(Preference(category="Monitors", feature="brand", value="LG"))
+    with metrics.bind(turn_id="turn-2"):
+        service.get_preferences("Monitors")
+
+    assert set(metrics.episodes[episode.id]) == {"memory.get_episode_by_id", "memory.upsert_preference", "memory.commit"}
+    assert metrics.turns["turn-1"]["memory.upsert_preference"].bytes_written > 0
+    assert set(metrics.turns["turn-2"]) == {"memory.get_preferences"}
+
+
+def test_unsampled_roots_only_count_calls(metrics, service):
+    metrics.configure(sample_rate=0.5)
+    metrics.rng = lambda: 0.9
+
+    service.create_episode(category="Monitors", initial_query="27 inch monitor")
+
+    assert metrics.calls["memory.create_episode"] == 1
+    assert metrics.calls["memory.pause_all_active_episodes"] == 1
+    assert metrics.operations == {}
+    assert not metrics.spans
+
+
+def test_failed_calls_are_marked_as_errors(metrics, service):
+    with pytest.raises(ValueError):
+        service.archive_episodes()
+
+    assert metrics.operations["memory.archive_episodes"].errors == 1
+
+
+def test_only_recent_episodes_and_turns_are_kept():
+    metrics = Telemetry(enabled=True, max_tracked_keys=2)
+    for turn in ("turn-1", "turn-2", "turn-1", "turn-3"):
+        metrics.finish(metrics.start("agent.orchestrator_agent", episode_id="episode", turn_id=turn))
+
+    assert list(metrics.turns) == ["turn-1", "turn-3"]
+    assert metrics.turns["turn-1"]["agent.orchestrator_agent"].count == 2
+    assert metrics.episodes["episode"]["agent.orchestrator_agent"].count == 4
+
+
+def test_export_prometheus_and_jsonl(metrics, service, tmp_path):
+    service.create_episode(category="Monitors", initial_query="27 inch monitor")
+
+    metrics.export_prometheus(str(tmp_path / "metrics.prom"))
+    text = (tmp_path / "metrics.prom").read_text()
+    assert 'product_hunt_calls_total{op="memory.create_episode"} 1' in text
+    assert "# TYPE product_hunt_bytes_written_total counter" in text
+
+    written = metrics.export_jsonl(str(tmp_path / "spans.jsonl"))
+    lines = [json.loads(line) for line in (tmp_path / "spans.jsonl").read_text().splitlines()]
+    assert written == len(lines) == 3
+    assert {line["name"] for line in lines} == {"memory.create_episode", "memory.pause_all_active_episodes", "memory.commit"}
+    assert metrics.export_jsonl(str(tmp_path / "spans.jsonl")) == 0
+
+
+def run_callbacks(callbacks, context):
+    # ADK stops at the first callback that returns something
+    for callback in callbacks:
+        if result := callback(context):
+            return result
+    return None
+
+
+def test_agent_runs_are_spans_for_the_turn(metrics, service):
+    from app.agents.agent import root_agent
+
+    context = SimpleNamespace(invocation_id="invocation-1", agent_name=root_agent.name)
+    run_callbacks(root_agent.canonical_before_agent_callbacks, context)
+    service.get_preferences("Monitors")
+    run_callbacks(root_agent.canonical_after_agent_callbacks, context)
+
+    assert set(metrics.turns["invocation-1"]) == {"agent.orchestrator_agent", "memory.get_preferences"}
+    assert metrics.operations["agent.orchestrator_agent"].count == 1
+
+
+def test_instrumenting_keeps_existing_callbacks(metrics):
+    from google.adk.agents import LlmAgent
+    from app.agents.agent import instrument_agent
+
+    seen = []
+    agent = instrument_agent(LlmAgent(
+        name="guarded",
+        model="",
+        before_agent_callback=lambda context: seen.append("before") or "skipped",
+        after_agent_callback=lambda context: seen.append("after"),
+    ))
+    context = SimpleNamespace(invocation_id="invocation-1", agent_name=agent.name)
+
+    # The existing callback skips the agent, so no span is opened for it
+    assert run_callbacks(agent.canonical_before_agent_callbacks, context) == "skipped"
+    run_callbacks(agent.canonical_after_agent_callbacks, context)
+
+    assert seen == ["before", "after"]
+    assert "agent.guarded" not in metrics.operations
+    assert metrics.current() is None
+
+
+def test_spans_of_failed_agent_runs_are_closed_as_errors(metrics):
+    from google.adk.agents import LlmAgent
+    from app.agents.agent import instrument_agent
+
+    parent = instrument_agent(LlmAgent(name="parent", model="", sub_agents=[LlmAgent(name="child", model="")]))
+    child = parent.sub_agents[0]
+
+    def context(invocation_id, agent):
+        return SimpleNamespace(invocation_id=invocation_id, agent_name=agent.name)
+
+    # The child raises, which ADK reports without calling its after callback
+    run_callbacks(parent.canonical_before_agent_callbacks, context("invocation-1", parent))
+    run_callbacks(child.canonical_before_agent_callbacks, context("invocation-1", child))
+    run_callbacks(parent.canonical_after_agent_callbacks, context("invocation-1", parent))
+
+    assert metrics.operations["agent.child"].errors == 1
+    assert metrics.operations["agent.parent"].errors == 0
+    assert metrics.current() is None
+
+    # This time the error escapes the whole turn; the next turn starts a fresh root span
+    run_callbacks(parent.canonical_before_agent_callbacks, context("invocation-2", parent))
+    run_callbacks(parent.canonical_before_agent_callbacks, context("invocation-3", parent))
+
+    assert metrics.operations["agent.parent"].errors == 1
+    assert metrics.current().parent is None
+    run_callbacks(parent.canonical_after_agent_callbacks, context("invocation-3", parent))
+    assert metrics.current() is None
+    assert metrics.operations["agent.parent"].count == 3
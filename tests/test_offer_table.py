@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from app.agents.vendor_discovery.offer_table import OfferTable
+from app.schemas.product import VendorOfferings
+
+
+def offering(i: int, **overrides) -> VendorOfferings:
+    fields = dict(
+        id=i % 3,
+        vendor_name=f"vendor-{i % 2}",
+        price=100_000.0 + i * 1_000.5,
+        listing_url=f"https://shop.example/{i}",
+        availability=("in_stock", "out_of_stock", "pre_order")[i % 3],
+        warranty=None if i % 2 else "1 year",
+        timestamp=datetime(2025, 1, 1, 12, 30) + timedelta(seconds=i, microseconds=i),
+    )
+    fields.update(overrides)
+    return VendorOfferings(**fields)
+
+
+def test_round_trip_is_lossless():
+    offers = [offering(i) for i in range(10)]
+    offers.append(offering(10, timestamp=datetime(2025, 3, 1, 9, 0, tzinfo=timezone(timedelta(hours=1)))))
+
+    table = OfferTable.from_offerings(offers)
+
+    restored = table.to_offerings()
+    assert restored == offers
+    assert restored[-1].timestamp.utcoffset() == timedelta(hours=1)
+    assert restored[0].timestamp.tzinfo is None
+
+
+def test_strings_are_dictionary_encoded():
+    table = OfferTable.from_offerings(offering(i) for i in range(100))
+
+    assert len(table.vendors) == 2
+    assert len(table.warranties) == 1
+    assert table.vendor_codes.dtype == np.int32
+    assert table.availability_codes.dtype == np.int8
+
+
+def test_row_view_reads_through_to_columns():
+    table = OfferTable.from_offerings(offering(i) for i in range(5))
+    row = table[3]
+
+    assert not hasattr(row, "__dict__")
+    assert (row.id, row.vendor_name, row.price, row.availability, row.warranty) == (0, "vendor-1", 103_001.5, "in_stock", None)
+    assert row.to_model() == offering(3)
+    assert table[-1].listing_url == "https://shop.example/4"
+    with pytest.raises(IndexError):
+        table[5]
+
+
+def test_column_views_are_zero_copy():
+    table = OfferTable.from_offerings(offering(i) for i in range(5))
+
+    prices = table.prices
+    assert np.shares_memory(prices, table._prices)
+    assert np.shares_memory(table.prices, prices)
+    assert table.in_stock().tolist() == [True, False, False, True, False]
+    assert table.to_offerings(np.flatnonzero(table.in_stock())) == [offering(0), offering(3)]
+
+
+def test_append_grows_past_capacity():
+    table = OfferTable(capacity=2)
+    for i in range(9):
+        table.append(offering(i))
+
+    assert len(table) == 9
+    assert table.product_ids.tolist() == [i % 3 for i in range(9)]
+    assert [row.to_model() for row in table] == [offering(i) for i in range(9)]
+
+
+def test_append_grows_from_zero_capacity():
+    table = OfferTable(capacity=0)
+    table.extend(offering(i) for i in range(3))
+
+    assert [row.to_model() for row in table] == [offering(i) for i in range(3)]
+
+
+def test_lowest_prices_per_product():
+    table = OfferTable.from_offerings(offering(i) for i in range(9))
+
+    ids, prices = table.lowest_prices()
+    assert ids.tolist() == [0]
+    assert prices.tolist() == [100_000.0]
+
+    ids, prices = table.lowest_prices(in_stock_only=False)
+    assert ids.tolist() == [0, 1, 2]
+    assert prices.tolist() == [100_000.0, 101_000.5, 102_001.0]
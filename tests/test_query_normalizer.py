@@ -0,0 +1,79 @@
+import json
+
+import pytest
+from app.agents.product_intelligence.query_normalizer import GRAMMAR_VERSION, QueryNormalizer
+
+
+@pytest.fixture
+def normalizer(tmp_path):
+    return QueryNormalizer(str(tmp_path / "query_memo.json"))
+
+@pytest.mark.parametrize("query, category, constraints", [
+    ("27 inch monitor under 200k", "Monitors", {"size_inches": 27.0, "max_price": 200000.0}),
+    ('LG 27" monitor in Lagos below ₦250,000', "Monitors", {"size_inches": 27.0, "brand": "LG", "location": "Lagos", "max_price": 250000.0}),
+    ("How much for a 3kVA inverter?", "Inverters", {"capacity_kva": 3.0}),
+    ("samsung phone 8gb 256gb storage between 150k and 300k", "Phones", {
+        "brand": "Samsung", "memory_gb": 8.0, "storage_gb": 256.0, "min_price": 150000.0, "max_price": 300000.0,
+    }),
+    ("32 inch tv around N180,000 abuja", "Televisions", {"size_inches": 32.0, "target_price": 180000.0, "location": "Abuja"}),
+    ("laptop 1.5m", "Laptops", {"max_price": 1500000.0}),
+    ("monitor no more than 200k", "Monitors", {"max_price": 200000.0}),
+    ("monitor not more than 200k", "Monitors", {"max_price": 200000.0}),
+    ("phone not over 150k", "Phones", {"max_price": 150000.0}),
+    ("inverter not above 300k", "Inverters", {"max_price": 300000.0}),
+    ("generator not less than 500k", "Generators", {"min_price": 500000.0}),
+])
+def test_grammar_extracts_structured_intent(normalizer, query, category, constraints):
+    intent = normalizer.normalize(query)
+
+    assert intent.category == category
+    assert intent.constraints == constraints
+    assert intent.source == "grammar"
+
+def test_unconfident_queries_fall_through(normalizer):
+    assert normalizer.normalize("something nice for my mum") is None
+    # A category alone is not enough when most of the query is unexplained
+    assert normalizer.normalize("monitor that won't strain my eyes after long coding sessions") is None
+    assert normalizer.stats()["fallbacks"] == 2
+
+def test_memo_hits_on_equivalent_phrasing(normalizer):
+    normalizer.normalize("27 inch monitor under 200k")
+    again = normalizer.normalize("  27 Inch Monitor   under 200K? ")
+
+    assert again.source == "memo"
+    assert again.constraints == {"size_inches": 27.0, "max_price": 200000.0}
+    assert normalizer.stats() == {
+        "lookups": 2, "memo_hits": 1, "parsed": 1, "fallbacks": 0, "hit_rate": 0.5, "fallback_rate": 0.0,
+    }
+
+def test_llm_answers_are_remembered_and_persisted(tmp_path, normalizer):
+    query = "monitor that won't strain my eyes after long coding sessions"
+    assert normalizer.normalize(query) is None
+    normalizer.remember(query, "Monitors", {"flicker_free": True, "blue_light_filter": True})
+    normalizer.normalize("27 inch monitor under 200k")
+    normalizer.save()
+
+    reloaded = QueryNormalizer(str(tmp_path / "query_memo.json"))
+    intent = reloaded.normalize(query)
+    assert intent.source == "memo"
+    assert intent.constraints == {"flicker_free": True, "blue_light_filter": True}
+    assert reloaded.normalize("27 inch monitor under 200k").source == "memo"
+
+def test_grammar_results_from_an_older_grammar_are_dropped(tmp_path):
+    path = tmp_path / "query_memo.json"
+    path.write_text(json.dumps({"grammar_version": GRAMMAR_VERSION - 1, "entries": [
+        ["monitor no more than 200k", {"category": "Monitors", "constraints": {"min_price": 200000.0}, "confidence": 0.75, "source": "grammar"}],
+        ["quiet fridge", {"category": "Refrigerators", "constraints": {"quiet": True}, "confidence": 1.0, "source": "llm"}],
+    ]}))
+
+    normalizer = QueryNormalizer(str(path))
+    assert normalizer.normalize("monitor no more than 200k").constraints == {"max_price": 200000.0}
+    assert normalizer.normalize("quiet fridge").source == "memo"
+
+def test_memo_is_bounded(tmp_path):
+    normalizer = QueryNormalizer(memo_size=2)
+    for size in (24, 27, 32):
+        normalizer.normalize(f"{size} inch monitor")
+
+    assert normalizer.normalize("24 inch monitor").source == "grammar"
+    assert normalizer.memo.evictions >= 1
@@ -0,0 +1,134 @@
+import random
+from datetime import datetime
+
+import pytest
+from app.agents.ranking_tradeoff.scoring import build_score_matrix, rank_comparison, rank_products
+from app.schemas.memory import Preference
+from app.schemas.ranking import ComparisonCriterion, NormalizedFeature, ProductComparison
+
+
+@pytest.fixture
+def monitors():
+    criteria = [
+        ComparisonCriterion(name="Price", weight=0.5, intent="minimize"),
+        ComparisonCriterion(name="Refresh Rate", weight=0.3, intent="maximize"),
+        ComparisonCriterion(name="Size", weight=0.2, intent="target", target_value=27),
+    ]
+    grid = [
+        NormalizedFeature(feature_name="price", unit="NGN", values={1: 250000, 2: 180000, 3: 320000}),
+        NormalizedFeature(feature_name="refresh rate", unit="Hz", values={1: 144, 2: 75, 3: 165}),
+        NormalizedFeature(feature_name="size", unit="inch", values={1: 27, 2: 24, 3: 32}),
+    ]
+    return criteria, grid, [1, 2, 3]
+
+def test_scores_follow_intents(monitors):
+    matrix = build_score_matrix(*monitors)
+    columns = [c.name for c in matrix.criteria]
+
+    price = matrix.scores[:, columns.index("Price")]
+    refresh = matrix.scores[:, columns.index("Refresh Rate")]
+    size = matrix.scores[:, columns.index("Size")]
+
+    assert price.tolist() == pytest.approx([0.5, 1.0, 0.0])
+    assert refresh.tolist() == pytest.approx([69 / 90, 0.0, 1.0])
+    assert size.tolist() == pytest.approx([1.0, 0.4, 0.0])
+    assert matrix.weights.sum() == pytest.approx(1.0)
+
+def test_ranking_is_byte_identical_regardless_of_input_order(monitors):
+    criteria, grid, ids = monitors
+    expected = [r.model_dump_json() for r in rank_products(criteria, grid, ids)]
+
+    rng = random.Random(7)
+    for _ in range(5):
+        shuffled_grid = [
+            f.model_copy(update={"values": dict(rng.sample(list(f.values.items()), len(f.values)))}) for f in grid
+        ]
+        result = rank_products(rng.sample(criteria, 3), rng.sample(shuffled_grid, 3), rng.sample(ids, 3))
+        assert [r.model_dump_json() for r in result] == expected
+
+def test_ranks_and_tradeoffs(monitors):
+    ranked = rank_products(*monitors)
+
+    assert [r.product_id for r in ranked] == [1, 2, 3]
+    assert [r.rank for r in ranked] == [1, 2, 3]
+    assert ranked[0].total_score > ranked[1].total_score > ranked[2].total_score
+
+    # The cheaper 24" monitor trades refresh rate for price against the leader
+    tradeoff = ranked[1].key_tradeoffs[0]
+    assert tradeoff.advantage == "Price 180000 NGN vs Price 250000 NGN"
+    assert tradeoff.sacrificed == "Refresh Rate 75 Hz vs Refresh Rate 144 Hz"
+    assert -1.0 <= tradeoff.impact_score <= 1.0
+
+def test_ties_break_on_product_id():
+    criteria = [ComparisonCriterion(name="price", weight=1.0, intent="minimize")]
+    grid = [NormalizedFeature(feature_name="price", values={9: 100, 4: 100, 7: 50})]
+
+    ranked = rank_products(criteria, grid, [9, 4, 7])
+
+    assert [r.product_id for r in ranked] == [7, 4, 9]
+
+def test_missing_values_and_categorical_targets():
+    criteria = [
+        ComparisonCriterion(name="panel", weight=0.5, intent="target", target_value="IPS"),
+        ComparisonCriterion(name="warranty months", weight=0.5, intent="maximize"),
+    ]
+    grid = [
+        NormalizedFeature(feature_name="panel", values={1: "VA", 2: "ips", 3: "IPS"}),
+        NormalizedFeature(feature_name="warranty months", values={1: 24, 2: 12}),
+    ]
+
+    ranked = rank_products(criteria, grid, [1, 2, 3])
+
+    # Product 3 has no warranty data, which scores as the worst value, so all three tie
+    assert [r.total_score for r in ranked] == [0.5, 0.5, 0.5]
+    assert [r.product_id for r in ranked] == [1, 2, 3]
+
+def test_target_intent_requires_target_value():
+    criteria = [ComparisonCriterion(name="size", weight=1.0, intent="target")]
+    grid = [NormalizedFeature(feature_name="size", values={1: 27})]
+
+    with pytest.raises(ValueError):
+        rank_products(criteria, grid, [1])
+
+def test_preferences_shift_weights(monitors):
+    criteria, grid, ids = monitors
+    baseline = build_score_matrix(criteria, grid, ids)
+    weighted = build_score_matrix(criteria, grid, ids, [Preference(category="Monitors", feature="price", value="low", confidence=1.0)])
+
+    price = [c.name for c in baseline.criteria].index("Price")
+    assert weighted.weights[price] > baseline.weights[price]
+
+def test_only_the_strongest_liking_preference_weights_a_criterion(monitors):
+    criteria, grid, ids = monitors
+    price = [c.name for c in build_score_matrix(criteria, grid, ids).criteria].index("Price")
+
+    def price_weight(*prefs):
+        return build_score_matrix(criteria, grid, ids, list(prefs)).weights[price]
+
+    like = Preference(category="Monitors", feature="price", value="low", confidence=0.8)
+    assert price_weight(Preference(category="Monitors", feature="price", value="high", preference_type="dislike", confidence=1.0)) == price_weight()
+    assert price_weight(Preference(category="Monitors", feature="price", value=500000, preference_type="dealbreaker")) == price_weight()
+    assert price_weight(like, Preference(category="Monitors", feature="price", value="under 200k", confidence=0.4)) == price_weight(like)
+    assert price_weight(like, Preference(category="Monitors", feature="price", value="cheap", preference_type="must_have", confidence=0.9)) > price_weight(like)
+
+def test_rank_comparison_fills_ranked_results(monitors):
+    criteria, grid, ids = monitors
+    comparison = ProductComparison(
+        id="cmp-1",
+        timestamp=datetime(2025, 1, 1),
+        criteria=criteria,
+        product_ids=ids,
+        feature_grid=grid,
+        ranked_results=[],
+        summary_verdict="",
+    )
+
+    ranked = rank_comparison(comparison)
+
+    assert [r.product_id for r in ranked.ranked_results] == [1, 2, 3]
+    assert comparison.ranked_results == []
+    assert len(rank_products(criteria, grid, ids, limit=1)) == 1
+
+def test_impact_matrix_is_antisymmetric(monitors):
+    impact = build_score_matrix(*monitors).impact_matrix()
+    assert (impact == -impact.T).all()
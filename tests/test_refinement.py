@@ -0,0 +1,134 @@
+from datetime import timedelta
+
+import pytest
+
+from app.memory.refinement import CONFIDENCE_STEP, PreferenceRefiner, reinforce
+from app.memory.service import MemoryService
+from app.schemas.memory import EpisodeStatus, Preference
+
+
+@pytest.fixture(params=["memory.json", "memory.db"])
+def service(tmp_path, request):
+    service = MemoryService(str(tmp_path / request.param))
+    yield service
+    service.db.close()
+
+
+def close_episode(service: MemoryService, category: str, constraints: dict, state: str = "completed"):
+    episode = service.create_episode(category=category, initial_query=f"looking for {category}")
+    episode.extracted_constraints = constraints
+    episode.status = EpisodeStatus(state=state, last_transition_reason="test")
+    service.update_episode(episode)
+    return episode
+
+
+def confidences(service: MemoryService, category: str) -> dict:
+    return {(p.feature, str(p.value)): p.confidence for p in service.get_preferences(category)}
+
+
+def test_reinforce_matches_repeated_upserts():
+    confidence = 0.3
+    for _ in range(4):
+        confidence = min(1.0, confidence + (1.0 - confidence) * 0.1)
+
+    assert reinforce(0.3, 4) == pytest.approx(confidence)
+    assert reinforce(0.8, -2) == pytest.approx(0.8 * CONFIDENCE_STEP ** 2)
+    assert reinforce(0.8, 0) == 0.8
+
+
+def test_outcomes_create_reinforce_and_weaken_preferences(service):
+    service.upsert_preference(Preference(category="Monitors", feature="panel", value="VA", confidence=0.6))
+    for _ in range(3):
+        close_episode(service, "Monitors", {"brand": "LG", "size": 27})
+    close_episode(service, "Monitors", {"panel": "VA"}, state="abandoned")
+    # Still in progress: not evidence yet
+    in_progress = service.create_episode(category="Monitors", initial_query="curved monitor")
+    in_progress.extracted_constraints = {"brand": "Samsung"}
+    service.update_episode(in_progress)
+
+    now = max(e.updated_at for e in service.get_episodes_by_category("Monitors"))
+    report = PreferenceRefiner(service).run(now=now)
+
+    brand = next(p for p in service.get_preferences("Monitors") if p.feature == "brand")
+    assert brand.value == "LG"
+    assert brand.evidence_count == 3
+    assert brand.confidence == pytest.approx(reinforce(0.5, 2))
+    assert confidences(service, "Monitors")[("panel", "VA")] < 0.6
+    assert report["episodes_read"] == 5
+    assert report["evidence"] == 3
+    assert {(e["feature"], e["value"]) for e in report["diff"]["added"]} == {("brand", "LG"), ("size", 27)}
+    assert [e["feature"] for e in report["diff"]["weakened"]] == ["panel"]
+    assert set(report["timings_ms"]) == {"read", "derive", "apply", "commit", "total"}
+
+
+def test_runs_only_read_episodes_changed_since_checkpoint(service):
+    first = close_episode(service, "Monitors", {"brand": "LG"})
+    refiner = PreferenceRefiner(service)
+    assert refiner.run(now=first.updated_at)["episodes_read"] == 1
+
+    report = refiner.run(now=first.updated_at)
+    assert report["episodes_read"] == 0
+    assert report["checkpoint"]["episodes_updated_at"] == first.updated_at.isoformat()
+
+    second = close_episode(service, "Monitors", {"brand": "LG"})
+    assert refiner.run(now=second.updated_at)["episodes_read"] == 1
+    brand = service.get_preferences("Monitors")[0]
+    assert brand.evidence_count == 2
+
+
+def test_decay_is_not_applied_twice(tmp_path):
+    def refined(path, run_days):
+        service = MemoryService(str(tmp_path / path))
+        service.upsert_preference(Preference(category="Monitors", feature="brand", value="LG", confidence=0.8))
+        start = service.get_preferences("Monitors")[0].last_updated
+        refiner = PreferenceRefiner(service, half_life_days=30)
+        for days in run_days:
+            refiner.run(now=start + timedelta(days=days))
+        confidence = service.get_preferences("Monitors")[0].confidence
+        service.db.close()
+        return confidence
+
+    assert refined("once.json", [60]) == pytest.approx(0.2)
+    assert refined("nightly.json", range(1, 61)) == pytest.approx(0.2)
+
+
+def test_dry_run_reports_without_writing(service):
+    episode = close_episode(service, "Monitors", {"brand": "LG"})
+
+    report = PreferenceRefiner(service).run(now=episode.updated_at, dry_run=True)
+
+    assert len(report["diff"]["added"]) == 1
+    assert service.get_preferences("Monitors") == []
+    assert service.db.get("checkpoints", "preference_refinement") is None
+
+
+def test_resaved_episodes_are_credited_once(service):
+    episode = close_episode(service, "Monitors", {"brand": "LG"})
+    refiner = PreferenceRefiner(service)
+    refiner.run(now=episode.updated_at)
+
+    # A copy loaded before the run is saved again: same outcome, nothing new to credit
+    episode.extracted_constraints["size"] = 27
+    service.update_episode(episode)
+    report = refiner.run(now=episode.updated_at)
+    assert report["episodes_read"] == 1
+    assert report["episodes_credited"] == 0
+    assert service.get_preferences("Monitors")[0].evidence_count == 1
+    assert service.get_episode_by_id(episode.id).refined_state == "completed"
+
+
+def test_outcome_changes_apply_only_the_difference(service):
+    episode = close_episode(service, "Monitors", {"brand": "LG"})
+    refiner = PreferenceRefiner(service)
+    refiner.run(now=episode.updated_at)
+    credited = service.get_preferences("Monitors")[0].confidence
+
+    episode = service.get_episode_by_id(episode.id)
+    episode.status = EpisodeStatus(state="abandoned", last_transition_reason="test")
+    service.update_episode(episode)
+    report = refiner.run(now=episode.updated_at)
+
+    brand = service.get_preferences("Monitors")[0]
+    assert report["episodes_credited"] == 1
+    assert brand.evidence_count == 0
+    assert brand.confidence == pytest.approx(reinforce(credited, -1.5))
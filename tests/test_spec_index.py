@@ -0,0 +1,50 @@
+import pytest
+from app.agents.product_intelligence.spec_index import SpecIndex, normalize_spec_key, normalize_spec_value
+from app.schemas.product import ProductSnapshot, Specifications
+
+
+def snapshot(name, brand, **data):
+    return ProductSnapshot(name=name, brand=brand, specifications=Specifications(source="manufacturer", data=data))
+
+@pytest.fixture
+def index():
+    index = SpecIndex()
+    index.add(1, snapshot("LG 27GP850", "LG", panel="Nano IPS", chipset="Scaler A", size='27"', refresh_rate="165 Hz"))
+    index.add(2, snapshot("Dell S2721DGF", "Dell", **{"Panel Type": "nano ips", "Screen Size": "27 inch", "refresh": "165hz"}))
+    index.add(3, snapshot("Samsung Odyssey G5", "Samsung", panel="VA", chipset="Scaler A", size="27in"))
+    index.add(4, snapshot("AOC 24G2", "AOC", panel="IPS", size=24))
+    return index
+
+def test_normalizes_keys_and_values():
+    assert normalize_spec_key("Panel Type") == "panel_type"
+    assert normalize_spec_key("CPU") == "chipset"
+    assert normalize_spec_value('27"') == normalize_spec_value("27 Inches") == normalize_spec_value("27in") == "27in"
+    assert normalize_spec_value(27.0) == "27"
+    assert normalize_spec_value("  Nano   IPS™ ") == "nano ips"
+
+def test_lookup_is_an_index_hit(index):
+    assert index.lookup("panel", "NANO IPS") == {1, 2}
+    assert index.lookup("Screen Size", "27 inch") == {1, 2, 3}
+    assert index.lookup("panel", "OLED") == set()
+
+def test_group_by(index):
+    assert index.group_by("panel_type") == {"nano ips": {1, 2}, "va": {3}, "ips": {4}}
+
+def test_equivalents_use_blocking_keys(index):
+    # Shares the panel with 2 and the chipset with 3; 2 also shares size and refresh rate
+    assert index.equivalents(1) == [(2, ["panel_type"]), (3, ["chipset"])]
+    assert index.equivalents(4) == []
+
+def test_min_shared(index):
+    index.add(5, snapshot("LG 27GP850 rev B", "LG", panel="Nano IPS", chipset="Scaler A", generation="2022"))
+    assert index.equivalents(1, min_shared=2) == [(5, ["panel_type", "chipset"])]
+
+def test_reindexing_replaces_previous_specs(index):
+    index.add(2, snapshot("Dell S2721DGF", "Dell", panel="VA"))
+
+    assert index.lookup("panel", "nano ips") == {1}
+    assert index.lookup("panel", "va") == {2, 3}
+    assert len(index) == 4
+
+    index.remove(2)
+    assert index.lookup("panel", "va") == {3}
@@ -0,0 +1,130 @@
+from datetime import datetime
+
+import pytest
+from app.memory import codec
+from app.memory.service import MemoryService
+from app.memory.storage import SQLiteStore, TinyDBStore, migrate_tinydb_to_sqlite, open_store
+from app.schemas.memory import Episode, Preference, Heuristic
+
+
+def test_open_store_picks_backend_from_extension(tmp_path):
+    json_store = open_store(str(tmp_path / "memory.json"))
+    sqlite_store = open_store(str(tmp_path / "memory.db"))
+
+    assert isinstance(json_store, TinyDBStore)
+    assert isinstance(sqlite_store, SQLiteStore)
+
+    json_store.close()
+    sqlite_store.close()
+
+def test_sqlite_lookups_use_indexes(tmp_path):
+    """Point lookups and category/state filters should never fall back to a table scan."""
+    store = SQLiteStore(str(tmp_path / "memory.db"))
+
+    queries = [
+        ("SELECT doc FROM episodes WHERE key = ?", ("x",)),
+        ("SELECT doc FROM episodes WHERE category = ?", ("Monitors",)),
+        ("SELECT doc FROM episodes WHERE state = ?", ("active",)),
+        ("SELECT doc FROM preferences WHERE category = ? AND feature = ? AND value = ?", ("a", "b", "c")),
+        ("SELECT doc FROM heuristics WHERE category = ?", ("electronics",)),
+    ]
+    for sql, params in queries:
+        plan = " ".join(str(row[-1]) for row in store.conn.execute("EXPLAIN QUERY PLAN " + sql, params))
+        assert "USING" in plan, plan
+
+    store.close()
+
+def test_write_batch_deletes_and_replaces(tmp_path):
+    store = SQLiteStore(str(tmp_path / "memory.db"))
+    doc = {"id": "h1", "name": "n", "rule": "r", "applicability": {"category": "tv"}, "logic_hint": "l"}
+
+    store.put("heuristics", doc)
+    store.put("heuristics", {**doc, "name": "renamed"})
+    assert store.get("heuristics", "h1")["name"] == "renamed"
+    assert len(store.find("heuristics")) == 1
+
+    store.delete("heuristics", "h1")
+    assert store.get("heuristics", "h1") is None
+    store.close()
+
+def test_migrate_tinydb_to_sqlite(tmp_path):
+    source = tmp_path / "memory.json"
+    target = tmp_path / "memory.db"
+
+    legacy = MemoryService(str(source))
+    ep = legacy.create_episode(category="Monitors", initial_query="27 inch monitor")
+    legacy.create_episode(category="Inverters", initial_query="3kVA inverter")
+    legacy.upsert_preference(Preference(category="Monitors", feature="brand", value="LG"))
+    legacy.upsert_preference(Preference(category="global", feature="warranty", value={"min_months": 12}))
+    legacy.add_heuristic(Heuristic(name="h", rule="r", applicability={"category": "Monitors"}, logic_hint="l"))
+    legacy.db.close()
+
+    counts = migrate_tinydb_to_sqlite(str(source), str(target))
+    assert counts == {"episodes": 2, "preferences": 2, "heuristics": 1, "vendors": 0, "checkpoints": 0}
+
+    migrated = MemoryService(str(target))
+    assert migrated.get_episode_by_id(ep.id).status.state == "paused"
+    assert migrated.get_active_episode().category == "Inverters"
+    assert len(migrated.get_preferences("Monitors")) == 2
+    assert len(migrated.get_heuristics("Monitors")) == 1
+
+    # Upserting after migration still finds the migrated record through the compound key
+    migrated.upsert_preference(Preference(category="global", feature="warranty", value={"min_months": 12}))
+    warranty = [p for p in migrated.get_preferences("Monitors") if p.feature == "warranty"]
+    assert warranty[0].evidence_count == 2
+    migrated.db.close()
+
+def test_migrate_requires_existing_source(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        migrate_tinydb_to_sqlite(str(tmp_path / "missing.json"), str(tmp_path / "memory.db"))
+
+@pytest.mark.parametrize("filename", ["memory.json", "memory.db"])
+def test_projection_and_model_reads_agree_across_backends(tmp_path, filename):
+    service = MemoryService(str(tmp_path / filename))
+    service.create_episode(category="Monitors", initial_query="27 inch monitor")
+    active = service.create_episode(category="Inverters", initial_query="3kVA inverter")
+    service.upsert_preference(Preference(category="Monitors", feature="brand", value="LG"))
+
+    assert service.get_active_episode_state() == {"id": active.id, "category": "Inverters", "state": "active"}
+    assert service.get_active_episode_state("Monitors") is None
+    assert service.db.project("episodes", ["state"]) == [{"state": "paused"}, {"state": "active"}]
+    assert service.db.project("preferences", ["feature", "value"]) == [{"feature": "brand", "value": '"LG"'}]
+
+    assert service.db.get_model("episodes", active.id, Episode) == active
+    assert service.db.find_models("episodes", Episode, state="active") == [active]
+    assert service.db.get_model("episodes", "missing", Episode) is None
+    service.db.close()
+
+@pytest.mark.parametrize("filename", ["memory.json", "memory.db"])
+def test_find_models_updated_since(tmp_path, filename):
+    service = MemoryService(str(tmp_path / filename))
+    old = service.create_episode(category="Monitors", initial_query="27 inch monitor")
+    checkpoint = old.updated_at.isoformat()
+    new = service.create_episode(category="Inverters", initial_query="3kVA inverter")
+    service.update_episode(old)
+
+    changed = service.db.find_models_updated_since("episodes", Episode, checkpoint)
+    assert {e.id for e in changed} == {old.id, new.id}
+    assert [e.id for e in service.db.find_models_updated_since("episodes", Episode, checkpoint, category="Inverters")] == [new.id]
+    assert len(service.db.find_models_updated_since("episodes", Episode, None)) == 2
+    assert service.db.find_models_updated_since("episodes", Episode, datetime.max.isoformat()) == []
+    service.db.close()
+
+def test_codec_falls_back_to_stdlib_json(tmp_path, monkeypatch):
+    path = str(tmp_path / "memory.json")
+    store = TinyDBStore(path)
+    store.put("heuristics", {"id": "h1", "name": "₦ premium", "rule": "r", "applicability": {"category": "tv"}, "logic_hint": "l"})
+    store.close()
+
+    monkeypatch.setattr(codec, "orjson", None)
+    assert codec.loads(codec.dumps({"a": [1, 2.5, None]})) == {"a": [1, 2.5, None]}
+
+    reopened = TinyDBStore(path)
+    assert reopened.get("heuristics", "h1")["name"] == "₦ premium"
+    reopened.put("heuristics", {**reopened.get("heuristics", "h1"), "rule": "changed"})
+    reopened.close()
+
+    monkeypatch.undo()
+    store = TinyDBStore(path)
+    assert store.get("heuristics", "h1")["rule"] == "changed"
+    store.close()
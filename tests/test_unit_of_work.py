@@ -0,0 +1,184 @@
+import asyncio
+import threading
+
+import pytest
+from app.memory.service import MemoryService
+from app.memory.storage import SQLiteStore
+from app.schemas.memory import Preference, Heuristic
+from app.schemas.vendor import VendorTrustSignal
+
+
+class CountingStore(SQLiteStore):
+    """SQLite store that records how many batches reach the disk."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.batches = []
+
+    def write_batch(self, ops):
+        ops = list(ops)
+        self.batches.append(ops)
+        super().write_batch(ops)
+
+
+@pytest.fixture
+def counting_service(tmp_path):
+    store = CountingStore(str(tmp_path / "memory.db"))
+    service = MemoryService(store=store)
+    yield service, store
+    store.close()
+
+def test_create_episode_is_a_single_write(counting_service):
+    service, store = counting_service
+    service.create_episode(category="Monitors", initial_query="27 inch monitor")
+    service.create_episode(category="Inverters", initial_query="3kVA inverter")
+
+    # The second call pauses the first episode and inserts the new one in one batch
+    assert len(store.batches) == 2
+    assert len(store.batches[1]) == 2
+
+def test_transaction_flushes_once_and_coalesces(counting_service):
+    service, store = counting_service
+    pref = Preference(category="Monitors", feature="brand", value="LG")
+
+    with service.transaction():
+        ep = service.create_episode(category="Monitors", initial_query="27 inch monitor")
+        ep.extracted_constraints = {"size_inches": 27}
+        service.update_episode(ep)
+        service.upsert_preference(pref)
+        service.upsert_preference(pref)
+        service.add_heuristic(Heuristic(name="h", rule="r", applicability={"category": "Monitors"}, logic_hint="l"))
+
+        # Reads inside the transaction see the buffered writes
+        assert service.get_active_episode().extracted_constraints == {"size_inches": 27}
+        assert service.get_preferences("Monitors")[0].evidence_count == 2
+        assert store.batches == []
+
+    assert len(store.batches) == 1
+    # One op per record: the episode, the preference and the heuristic
+    assert len(store.batches[0]) == 3
+    assert service.get_episode_by_id(ep.id).extracted_constraints == {"size_inches": 27}
+    assert service.get_preferences("Monitors")[0].evidence_count == 2
+
+def test_transaction_rolls_back_on_error(counting_service):
+    service, store = counting_service
+    kept = service.create_episode(category="Monitors", initial_query="27 inch monitor")
+
+    with pytest.raises(RuntimeError):
+        with service.transaction():
+            service.create_episode(category="Inverters", initial_query="3kVA inverter")
+            service.upsert_preference(Preference(category="Inverters", feature="brand", value="Luminous"))
+            raise RuntimeError("task failed")
+
+    assert len(store.batches) == 1
+    assert service.get_active_episode().id == kept.id
+    assert service.get_episodes_by_category("Inverters") == []
+    assert service.get_preferences("Inverters") == []
+
+def test_nested_transactions_join_the_outer_one(counting_service):
+    service, store = counting_service
+
+    with service.transaction():
+        with service.transaction():
+            service.create_episode(category="Monitors", initial_query="27 inch monitor")
+        assert store.batches == []
+        service.create_episode(category="Inverters", initial_query="3kVA inverter")
+
+    assert len(store.batches) == 1
+    assert service.get_active_episode().category == "Inverters"
+    assert service.get_episodes_by_category("Monitors")[0].status.state == "paused"
+
+def test_other_threads_do_not_join_a_transaction(counting_service):
+    service, store = counting_service
+    started, created = threading.Event(), []
+
+    def other_thread():
+        started.wait()
+        created.append(service.create_episode(category="Inverters", initial_query="3kVA inverter"))
+
+    worker = threading.Thread(target=other_thread)
+    worker.start()
+    with pytest.raises(RuntimeError):
+        with service.transaction():
+            service.create_episode(category="Monitors", initial_query="27 inch monitor")
+            started.set()
+            # The other thread waits for the store lock instead of writing into this buffer
+            worker.join(timeout=0.5)
+            assert worker.is_alive()
+            raise RuntimeError("task failed")
+    worker.join()
+
+    assert service.get_episode_by_id(created[0].id) is not None
+    assert service.get_episodes_by_category("Monitors") == []
+
+@pytest.mark.parametrize("db_name", ["memory.json", "memory.db"])
+def test_other_tasks_on_the_thread_cannot_write_into_a_transaction(tmp_path, db_name):
+    service = MemoryService(str(tmp_path / db_name))
+    pref = Preference(category="Monitors", feature="brand", value="LG")
+
+    async def long_transaction():
+        with service.transaction():
+            service.upsert_preference(pref)
+            await asyncio.sleep(0.05)
+            service.upsert_preference(pref)
+
+    async def other_task():
+        await asyncio.sleep(0.01)
+        service.upsert_preference(pref)
+
+    async def main():
+        return await asyncio.gather(long_transaction(), other_task(), return_exceptions=True)
+
+    results = asyncio.run(main())
+
+    assert results[0] is None
+    assert isinstance(results[1], RuntimeError)
+    assert service.get_preferences("Monitors")[0].evidence_count == 2
+    # Once the transaction is over the task can write again
+    service.upsert_preference(pref)
+    assert service.get_preferences("Monitors")[0].evidence_count == 3
+    service.db.close()
+
+def test_uncommitted_reads_do_not_reach_other_threads(counting_service):
+    service, store = counting_service
+    seen = []
+
+    def other_thread():
+        seen.append(service.get_preferences("Monitors"))
+
+    with pytest.raises(RuntimeError):
+        with service.transaction():
+            service.upsert_preference(Preference(category="Monitors", feature="brand", value="LG"))
+            assert len(service.get_preferences("Monitors")) == 1
+            worker = threading.Thread(target=other_thread)
+            worker.start()
+            worker.join()
+            raise RuntimeError("task failed")
+
+    assert seen == [[]]
+    assert service.get_preferences("Monitors") == []
+
+def test_rolled_back_vendor_signals_leave_the_registry_alone(counting_service):
+    service, store = counting_service
+    assert service.get_vendor("GadgetDepot", "Jumia") is None
+
+    with pytest.raises(RuntimeError):
+        with service.transaction():
+            service.record_vendor_signal("GadgetDepot", "Jumia", VendorTrustSignal(source="User Feedback", score=0.9, evidence="on time"))
+            assert service.get_vendor("GadgetDepot", "Jumia") is not None
+            raise RuntimeError("task failed")
+
+    assert service.get_vendor("GadgetDepot", "Jumia") is None
+    service.record_vendor_signal("GadgetDepot", "Jumia", VendorTrustSignal(source="User Feedback", score=0.9, evidence="on time"))
+    assert len(service.get_vendor("GadgetDepot", "Jumia").observations) == 1
+
+def test_cached_results_are_copies(counting_service):
+    service, store = counting_service
+    service.upsert_preference(Preference(category="Monitors", feature="brand", value="LG"))
+    service.add_heuristic(Heuristic(name="h", rule="r", applicability={"category": "Monitors"}, logic_hint="l"))
+
+    service.get_preferences("Monitors")[0].confidence = 0.0
+    service.get_heuristics("Monitors")[0].applicability["category"] = "Inverters"
+
+    assert service.get_preferences("Monitors")[0].confidence > 0.0
+    assert service.get_heuristics("Monitors")[0].applicability == {"category": "Monitors"}
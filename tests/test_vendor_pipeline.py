@@ -0,0 +1,154 @@
+import asyncio
+import json
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+import pytest
+from app.agents.vendor_discovery.pipeline import JSONListingAdapter, TokenBucket, VendorDiscoveryPipeline
+from app.schemas.product import MarketSummary, PriceStats, Product
+
+
+class StubPlatform(BaseHTTPRequestHandler):
+    """Local stand-in for vendor platforms, one path per behaviour."""
+
+    calls: dict[str, int] = {}
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        StubPlatform.calls[path] = StubPlatform.calls.get(path, 0) + 1
+        name = path.strip("/")
+
+        if name == "flaky" and StubPlatform.calls[path] == 1:
+            return self.respond(503, {"error": "busy"})
+        if name == "slow":
+            time.sleep(0.3)
+        if name == "hang":
+            time.sleep(1)
+        if name == "broken":
+            return self.respond(404, {"error": "not found"})
+        if name == "odd":
+            return self.respond(200, {"error": {"code": 7, "message": "quota"}})
+
+        self.respond(200, [
+            {"vendor_name": f"{name}-store", "price": 100000 + len(name), "listing_url": f"https://{name}.test/1"},
+        ])
+
+    def respond(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+@pytest.fixture(scope="module")
+def stub_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubPlatform)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+@pytest.fixture(autouse=True)
+def reset_calls():
+    StubPlatform.calls = {}
+
+def adapter(stub_url, name, **kwargs):
+    return JSONListingAdapter(name, f"{stub_url}/{name}", **kwargs)
+
+def test_streams_fast_platforms_before_slow_ones(stub_url):
+    pipeline = VendorDiscoveryPipeline([adapter(stub_url, "slow"), adapter(stub_url, "jumia"), adapter(stub_url, "konga")])
+
+    async def collect():
+        return [r.platform async for r in pipeline.stream({1: "27 inch monitor"})]
+
+    order = asyncio.run(collect())
+    assert order[-1] == "slow"
+    assert sorted(order) == ["jumia", "konga", "slow"]
+
+def test_retries_transient_failures_and_reports_hard_ones(stub_url):
+    pipeline = VendorDiscoveryPipeline(
+        [adapter(stub_url, "flaky"), adapter(stub_url, "broken"), adapter(stub_url, "hang")],
+        timeout=0.2,
+        retries=1,
+        backoff=0.01,
+    )
+
+    async def collect():
+        return {r.platform: r async for r in pipeline.stream({1: "monitor"})}
+
+    results = asyncio.run(collect())
+    assert results["flaky"].error is None
+    assert results["flaky"].attempts == 2
+    assert len(results["flaky"].offerings) == 1
+    # 4xx responses are not retried
+    assert results["broken"].attempts == 1
+    assert "404" in results["broken"].error
+    assert results["hang"].attempts == 2
+    assert "TimeoutError" in results["hang"].error
+
+def test_unexpected_payload_fails_only_that_platform(stub_url):
+    pipeline = VendorDiscoveryPipeline([adapter(stub_url, "odd"), adapter(stub_url, "slow"), adapter(stub_url, "jumia")])
+
+    async def collect():
+        return {r.platform: r async for r in pipeline.stream({1: "monitor"})}
+
+    results = asyncio.run(collect())
+    assert results["odd"].offerings == []
+    assert results["odd"].attempts == 1
+    assert results["odd"].error
+    assert len(results["slow"].offerings) == len(results["jumia"].offerings) == 1
+
+def test_global_concurrency_is_bounded(stub_url):
+    pipeline = VendorDiscoveryPipeline(
+        [adapter(stub_url, "slow", rate_per_second=100, burst=10)],
+        max_concurrency=2,
+    )
+
+    async def run():
+        started = time.monotonic()
+        results = [r async for r in pipeline.stream({i: "monitor" for i in range(4)})]
+        return results, time.monotonic() - started
+
+    results, elapsed = asyncio.run(run())
+    assert len(results) == 4
+    # Four 0.3s requests through two slots need at least two rounds
+    assert elapsed >= 0.6
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=20, capacity=1)
+
+    async def take(n):
+        started = time.monotonic()
+        for _ in range(n):
+            await bucket.acquire()
+        return time.monotonic() - started
+
+    assert asyncio.run(take(5)) >= 0.19
+
+def test_attach_feeds_product_vendor_offerings(stub_url):
+    pipeline = VendorDiscoveryPipeline([adapter(stub_url, "jumia"), adapter(stub_url, "konga")])
+    product = Product(
+        id=7,
+        snapshot=[],
+        market_summary=MarketSummary(
+            price_stats=PriceStats(average_price=0, median_price=0, min_price=0, max_price=0),
+            vendors_count=0,
+            confidence_score=0,
+        ),
+        vendor_offerings=None,
+        timestamp=datetime(2025, 1, 1),
+    )
+
+    updated = asyncio.run(pipeline.attach(product, "monitor"))
+
+    assert [o.vendor_name for o in updated.vendor_offerings] == ["jumia-store", "konga-store"]
+    assert all(o.id == 7 for o in updated.vendor_offerings)
+    assert product.vendor_offerings is None
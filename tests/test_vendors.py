@@ -0,0 +1,157 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.memory.service import MemoryService
+from app.memory.vendors import NEUTRAL_TRUST, TrustAggregate, VendorRegistry
+from app.schemas.memory import Preference
+from app.schemas.vendor import VendorProfile, VendorTrustSignal
+
+NOW = datetime(2026, 3, 1, 12, 0)
+DAY = 86400
+
+
+def signal(score: float, days_ago: float = 0, evidence: str = "order") -> VendorTrustSignal:
+    return VendorTrustSignal(source="User Feedback", score=score, evidence=evidence, timestamp=NOW - timedelta(days=days_ago))
+
+
+@pytest.fixture(params=["memory.json", "memory.db"])
+def db_path(tmp_path, request):
+    return str(tmp_path / request.param)
+
+
+def test_trust_aggregate_matches_full_recomputation():
+    half_life = 10 * DAY
+    events = [(0.9, 0), (0.2, 3 * DAY), (0.7, 8 * DAY), (0.4, 5 * DAY), (1.0, 20 * DAY)]
+    aggregate = TrustAggregate()
+    for score, at in events:
+        aggregate.add(score, at, half_life)
+
+    now = 30 * DAY
+    weights = [0.5 ** ((now - at) / half_life) for _, at in events]
+    expected = (sum(w * s for w, (s, _) in zip(weights, events)) + NEUTRAL_TRUST) / (sum(weights) + 1)
+    assert aggregate.value(now, half_life) == pytest.approx(expected)
+    assert aggregate.as_of == 20 * DAY
+
+
+def test_trust_decays_back_to_neutral():
+    registry = VendorRegistry(half_life_days=30)
+    for _ in range(5):
+        registry.observe("GadgetDepot", "Jumia", signal(1.0))
+
+    fresh = registry.trust_score("GadgetDepot", "Jumia", now=NOW)
+    stale = registry.trust_score("GadgetDepot", "Jumia", now=NOW + timedelta(days=365))
+    assert fresh > 0.9
+    assert NEUTRAL_TRUST < stale < 0.51
+    assert registry.trust_score("Unknown", "Jumia") == NEUTRAL_TRUST
+
+
+def test_observations_are_bounded_and_keys_case_insensitive():
+    registry = VendorRegistry(max_observations=3)
+    for i in range(10):
+        registry.observe("GadgetDepot", "Jumia", signal(0.8, days_ago=10 - i, evidence=f"order {i}"))
+    registry.observe("gadgetdepot ", "JUMIA", signal(0.8, evidence="order 10"))
+
+    profile = registry.get("GADGETDEPOT", "jumia")
+    assert len(registry) == 1
+    assert profile.name == "GadgetDepot"
+    assert [s.evidence for s in profile.observations] == ["order 8", "order 9", "order 10"]
+    assert profile.last_seen == NOW
+
+
+def test_find_uses_location_and_platform_indexes():
+    registry = VendorRegistry()
+    registry.observe("GadgetDepot", "Jumia", signal(0.9), locations=["Abuja", "Lagos"])
+    registry.observe("PhoneHub", "Konga", signal(0.95), locations=["abuja"])
+    registry.observe("CheapCell", "Jumia", signal(0.1), locations=["Abuja"])
+    registry.upsert(VendorProfile(name="LagosOnly", platform="Jumia", operating_locations={"Lagos"}))
+
+    trusted = registry.find(location="ABUJA", min_trust=0.7)
+    assert [p.name for p in trusted] == ["PhoneHub", "GadgetDepot"]
+    assert [p.name for p in registry.find(location="Abuja", platform="jumia")] == ["GadgetDepot", "CheapCell"]
+    assert [p.name for p in registry.find(platform="Jumia", location="Lagos")] == ["GadgetDepot", "LagosOnly"]
+    assert registry.find(location="Kano") == []
+    assert len(registry.find()) == 4
+
+
+def test_upsert_merges_details_and_replays_observations():
+    registry = VendorRegistry()
+    registry.observe("GadgetDepot", "Jumia", signal(0.9))
+    registry.upsert(VendorProfile(
+        name="GadgetDepot",
+        platform="Jumia",
+        domain_url="https://gadgetdepot.example",
+        delivery_reliability="fast",
+        operating_locations={"Abuja"},
+        observations=[signal(0.5, days_ago=1)],
+        last_seen=NOW - timedelta(days=1),
+    ))
+    registry.upsert(VendorProfile(name="GadgetDepot", platform="Jumia", last_seen=NOW - timedelta(days=2)))
+
+    profile = registry.get("GadgetDepot", "Jumia")
+    assert profile.domain_url == "https://gadgetdepot.example"
+    assert profile.delivery_reliability == "fast"
+    assert profile.operating_locations == {"Abuja"}
+    assert len(profile.observations) == 2
+    assert profile.last_seen == NOW
+
+
+def test_service_persists_vendors(db_path):
+    service = MemoryService(db_path)
+    service.record_vendor_signal("GadgetDepot", "Jumia", signal(0.9), locations=["Abuja"])
+    service.record_vendor_signal("GadgetDepot", "Jumia", signal(0.8, days_ago=2))
+    service.upsert_vendor(VendorProfile(name="PhoneHub", platform="Konga", operating_locations={"Abuja"}))
+    expected = service.get_vendor("GadgetDepot", "Jumia", now=NOW)
+    service.db.close()
+
+    reopened = MemoryService(db_path)
+    profile = reopened.get_vendor("gadgetdepot", "jumia", now=NOW)
+    assert profile.trust_score == pytest.approx(expected.trust_score)
+    assert profile.operating_locations == {"Abuja"}
+    assert len(profile.observations) == 2
+    assert [p.name for p in reopened.find_vendors(location="Abuja", min_trust=0.6, now=NOW)] == ["GadgetDepot"]
+    assert len(reopened.db.find("vendors")) == 2
+    reopened.db.close()
+
+
+def test_naive_and_aware_timestamps_can_be_mixed(db_path):
+    service = MemoryService(db_path)
+    service.record_vendor_signal("GadgetDepot", "Jumia", signal(0.9))
+    aware = signal(0.8).model_copy(update={"timestamp": datetime(2026, 3, 2, 12, 0).astimezone()})
+    service.record_vendor_signal("GadgetDepot", "Jumia", aware)
+    service.upsert_vendor(VendorProfile.model_validate_json(
+        '{"name": "GadgetDepot", "platform": "Jumia", "last_seen": "2026-03-03T12:00:00Z"}'
+    ))
+
+    profile = service.get_vendor("GadgetDepot", "Jumia")
+    assert profile.last_seen.tzinfo is None
+    assert profile.last_seen == datetime(2026, 3, 3, 12, 0, tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+    service.db.close()
+
+
+def test_registry_is_rebuilt_only_after_vendor_writes(db_path):
+    reader, writer = MemoryService(db_path), MemoryService(db_path)
+    writer.record_vendor_signal("GadgetDepot", "Jumia", signal(0.9))
+    registry = reader._get_vendor_registry()
+    assert len(registry) == 1
+
+    # Another process writing other tables leaves the loaded vendors in place
+    writer.upsert_preference(Preference(category="Monitors", feature="brand", value="LG"))
+    assert reader.get_preferences("Monitors")
+    assert reader._get_vendor_registry() is registry
+
+    writer.record_vendor_signal("PhoneHub", "Konga", signal(0.7))
+    assert reader.get_vendor("PhoneHub", "Konga") is not None
+    assert reader._get_vendor_registry() is not registry
+    reader.db.close()
+    writer.db.close()
+
+
+def test_scores_decay_to_the_present_by_default(db_path):
+    service = MemoryService(db_path)
+    service.record_vendor_signal("GadgetDepot", "Jumia", signal(1.0, days_ago=1000), locations=["Abuja"])
+
+    assert service.get_vendor("GadgetDepot", "Jumia", now=NOW - timedelta(days=1000)).trust_score == pytest.approx(0.75)
+    assert service.get_vendor("GadgetDepot", "Jumia").trust_score < 0.51
+    assert service.find_vendors(location="Abuja", min_trust=0.7) == []
+    service.db.close()